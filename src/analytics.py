@@ -0,0 +1,219 @@
+"""
+Офлайн-аналитика по хранилищу бота: лидерборды, участие, итоги по дням, экспорт в CSV.
+Хранилище читается потоково — память ограничена размером топа и числом дней.
+
+    python analytics.py --data pushups_bot_data.json --top 20 --csv-dir reports/
+"""
+import argparse
+import csv
+import datetime
+import heapq
+import logging
+import os
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+from pydantic import ValidationError
+
+from config import load_env_file
+from models.bot_models import ActivityStatus, BotConfig, ChallengePeriod, UserInfo
+from services.data_service import Storage
+from services.rollups import day_key
+from utils.logger import setup_logger, get_named_logger, LogMode
+
+logger = get_named_logger()
+
+
+class ChallengeReport:
+    """Накопители отчёта: обновляются по одной записи, ничего не хранят целиком"""
+
+    def __init__(self, config: BotConfig, top_n: int, as_of: datetime.datetime, rollups=None):
+        self.config = config
+        self.period = ChallengePeriod(start_date=config.challenge_start_date, end_date=config.challenge_end_date)
+        self.top_n = top_n
+        self.as_of = as_of
+
+        self.users = 0
+        self.skipped = 0
+        self.ever_reported = 0
+        self.total_pushups = 0
+        self.statuses: Counter = Counter()
+        # По последнему отчёту каждого пользователя: дата → (участники, отжимания).
+        # Точны только для незакрытого дня — закрытие обнуляет pushups_today,
+        # поэтому дни из сводок (RollupStore) берутся оттуда.
+        self.day_reporters: Counter = Counter()
+        self.day_pushups: Counter = Counter()
+        self.rollup_days: Dict[datetime.date, Tuple[int, int]] = (
+            {day: (reporters, pushups) for day, reporters, pushups in rollups.days()} if rollups is not None else {}
+        )
+
+        self._top_total: List[Tuple[int, int, str]] = []
+        self._top_day: List[Tuple[int, int, str]] = []
+        # Топ дня из сводок известен заранее — по записям собираем только имена
+        self._rollup_top_day: List[Tuple[int, int]] = (
+            rollups.top(day_key(as_of.date()), top_n)[0] if as_of.date() in self.rollup_days else []
+        )
+        self._names: Dict[int, str] = {uid: str(uid) for uid, _ in self._rollup_top_day}
+
+    def add(self, user_id: int, user: UserInfo) -> None:
+        self.users += 1
+        self.total_pushups += user.total_pushups
+        self.statuses[user.activity_status(
+            current_date=self.as_of,
+            inactivity_days=self.config.inactivity_days,
+            warning_days=self.config.warning_days,
+        )] += 1
+
+        if user.last_report_date:
+            self.ever_reported += 1
+            self.day_reporters[user.last_report_date] += 1
+            self.day_pushups[user.last_report_date] += user.pushups_today
+            if user.last_report_date == self.as_of.date():
+                self._push(self._top_day, (user.pushups_today, user_id, user.username))
+        if user_id in self._names:
+            self._names[user_id] = user.username
+
+        self._push(self._top_total, (user.total_pushups, user_id, user.username))
+
+    def _push(self, heap: List[Tuple[int, int, str]], item: Tuple[int, int, str]) -> None:
+        if len(heap) < self.top_n:
+            heapq.heappush(heap, item)
+        elif item > heap[0]:
+            heapq.heapreplace(heap, item)
+
+    def top_total(self) -> List[Tuple[int, int, str]]:
+        return sorted(self._top_total, reverse=True)
+
+    def top_day(self) -> List[Tuple[int, int, str]]:
+        if self._rollup_top_day:
+            return [(count, uid, self._names[uid]) for uid, count in self._rollup_top_day]
+        return sorted(self._top_day, reverse=True)
+
+    def day_totals(self, day: datetime.date) -> Tuple[int, int]:
+        """(участников, отжиманий) за день: из сводок, а без них — по последним отчётам"""
+        return self.rollup_days.get(day) or (self.day_reporters[day], self.day_pushups[day])
+
+    def daily_rows(self) -> List[Tuple[datetime.date, int, int, int]]:
+        return [
+            (day, self.period.get_day_info(day)[0], *self.day_totals(day))
+            for day in sorted(self.day_reporters.keys() | self.rollup_days.keys())
+        ]
+
+    def summary(self) -> Dict[str, object]:
+        reported_on_day = self.day_totals(self.as_of.date())[0]
+        return {
+            "as_of": self.as_of.isoformat(timespec="minutes"),
+            "challenge_day": self.period.get_day_info(self.as_of.date())[0],
+            "users": self.users,
+            "skipped_records": self.skipped,
+            "total_pushups": self.total_pushups,
+            "ever_reported": self.ever_reported,
+            "ever_reported_rate": _rate(self.ever_reported, self.users),
+            "reported_on_day": reported_on_day,
+            "reported_on_day_rate": _rate(reported_on_day, self.users),
+            **{f"status_{status.value}": self.statuses[status] for status in ActivityStatus},
+        }
+
+
+def _rate(part: int, whole: int) -> float:
+    return round(part / whole, 4) if whole else 0.0
+
+
+def build_report(storage: Storage, top_n: int, as_of: datetime.datetime) -> ChallengeReport:
+    header: Dict = {}
+    report: Optional[ChallengeReport] = None
+    rollups = storage.open_rollups()
+
+    for user_id, raw in storage.iter_raw_users(header):
+        # Конфиг идёт в хранилище первым — к первой записи header уже заполнен
+        if report is None:
+            report = ChallengeReport(_config_from(header), top_n, as_of, rollups)
+        try:
+            user = UserInfo.model_validate(raw)
+        except ValidationError as e:
+            report.skipped += 1
+            logger.warning(f"Пропущена запись {user_id}: {e.error_count()} ошибок валидации")
+            continue
+        report.add(user_id, user)
+
+    return report or ChallengeReport(_config_from(header), top_n, as_of, rollups)
+
+
+def _config_from(header: Dict) -> BotConfig:
+    try:
+        return BotConfig.model_validate(header.get("config", {}))
+    except ValidationError:
+        logger.warning("Конфиг в хранилище повреждён — используется конфигурация по умолчанию.")
+        return Storage.default_config()
+
+
+def export_csv(report: ChallengeReport, directory: str) -> None:
+    os.makedirs(directory, exist_ok=True)
+
+    def write(name: str, head: List[str], rows) -> None:
+        with open(os.path.join(directory, name), "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(head)
+            writer.writerows(rows)
+
+    write("leaderboard.csv", ["rank", "user_id", "username", "total_pushups"],
+          ((i, uid, name, total) for i, (total, uid, name) in enumerate(report.top_total(), 1)))
+    write("leaderboard_day.csv", ["rank", "user_id", "username", "pushups"],
+          ((i, uid, name, count) for i, (count, uid, name) in enumerate(report.top_day(), 1)))
+    write("daily.csv", ["date", "challenge_day", "reporters", "pushups"],
+          ((day.isoformat(), challenge_day, reporters, pushups)
+           for day, challenge_day, reporters, pushups in report.daily_rows()))
+    write("summary.csv", ["metric", "value"], report.summary().items())
+
+    logger.info(f"CSV выгружены в {directory}")
+
+
+def print_report(report: ChallengeReport) -> None:
+    summary = report.summary()
+    print(f"📊 Отчёт на {summary['as_of']} (день челленджа #{summary['challenge_day']})")
+    print(f"Участников: {summary['users']}, всего отжиманий: {summary['total_pushups']}")
+    print(
+        f"Отчитывались хоть раз: {summary['ever_reported']} ({summary['ever_reported_rate']:.1%}), "
+        f"в этот день: {summary['reported_on_day']} ({summary['reported_on_day_rate']:.1%})"
+    )
+    print(", ".join(f"{status.value}: {report.statuses[status]}" for status in ActivityStatus))
+
+    print("\n🏆 Топ по всем временам:")
+    for i, (total, _, name) in enumerate(report.top_total(), 1):
+        print(f"{i}. @{name}: {total}")
+
+    print("\n🔥 Топ за день:")
+    for i, (count, _, name) in enumerate(report.top_day(), 1):
+        print(f"{i}. @{name}: {count}")
+
+    print("\n📅 По дням:")
+    for day, challenge_day, reporters, pushups in report.daily_rows():
+        print(f"{day} (#{challenge_day}): {reporters} уч., {pushups} отж.")
+
+
+def main() -> None:
+    load_env_file()
+    parser = argparse.ArgumentParser(description="Офлайн-аналитика челленджа по хранилищу бота")
+    parser.add_argument("--data", default=os.getenv("DATA_PATH", "pushups_bot_data.json"),
+                        help="путь к хранилищу (*.json или *.ndjson)")
+    parser.add_argument("--top", type=int, default=10, help="размер лидербордов")
+    parser.add_argument("--as-of", type=datetime.date.fromisoformat, default=None,
+                        help="дата отчёта YYYY-MM-DD (по умолчанию сегодня)")
+    parser.add_argument("--csv-dir", default=None, help="каталог для выгрузки CSV")
+    args = parser.parse_args()
+
+    setup_logger(mode=LogMode.NAMED, level=logging.INFO)
+
+    as_of = (
+        datetime.datetime.combine(args.as_of, datetime.time.max)
+        if args.as_of else datetime.datetime.now()
+    )
+    report = build_report(Storage(args.data), args.top, as_of)
+    print_report(report)
+
+    if args.csv_dir:
+        export_csv(report, args.csv_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Резервные копии хранилища: список, внеплановая копия, проверка и восстановление.
+
+    python backup.py list
+    python backup.py run
+    python backup.py verify
+    python backup.py restore --out restored.json [--at ИМЯ_ФАЙЛА]
+"""
+import argparse
+import datetime
+import json
+import logging
+import os
+import sys
+
+from config import load_env_file
+from models.bot_models import BotConfig
+from services.backup import BackupManager
+from services.data_service import _USER_RECORD_ADAPTER
+from services.shared_store import open_storage
+from utils.logger import setup_logger, get_named_logger, LogMode
+
+logger = get_named_logger()
+
+
+def _restore(manager: BackupManager, out: str, at: str, force: bool) -> None:
+    if os.path.exists(out) and not force:
+        raise SystemExit(f"{out} уже существует — укажите другой путь или --force")
+
+    chain = manager.chain_until(at)
+    if not chain:
+        raise SystemExit(f"В {manager.backup_dir} нет резервных копий")
+    try:
+        state = manager.replay(chain)
+    except ValueError as e:
+        raise SystemExit(f"Копия повреждена: {e}")
+
+    config = BotConfig.model_validate(state.config)
+    users = {uid: _USER_RECORD_ADAPTER.validate_json(body) for uid, body in state.users.items()}
+    periods = {
+        key: {int(uid): count for uid, count in json.loads(body).items()}
+        for key, body in state.rollups.items()
+    }
+    closed_until = state.rollups_closed_until
+    if force and os.path.exists(out):
+        os.remove(out)
+    storage = open_storage(out)
+    storage.save(config, users)
+    storage.open_rollups().restore(datetime.date.fromisoformat(closed_until) if closed_until else None, periods)
+    logger.info(
+        f"Восстановлено из {os.path.basename(chain[-1].path)} ({len(chain) - 1} дельт): "
+        f"{len(users)} пользователей, {len(periods)} периодов сводок → {out}"
+    )
+
+
+def main() -> None:
+    load_env_file()
+    parser = argparse.ArgumentParser(description="Резервные копии хранилища бота")
+    parser.add_argument("command", choices=["list", "run", "verify", "restore"])
+    parser.add_argument("--data", default=os.getenv("DATA_PATH", "pushups_bot_data.json"),
+                        help="хранилище бота (*.json, *.ndjson или *.sqlite)")
+    parser.add_argument("--dir", default=os.getenv("BACKUP_DIR", "backups"), help="каталог копий")
+    parser.add_argument("--out", help="куда восстановить (формат — по расширению)")
+    parser.add_argument("--at", default=None, help="восстановить на момент этой копии (имя файла)")
+    parser.add_argument("--force", action="store_true", help="перезаписать --out, если он существует")
+    args = parser.parse_args()
+
+    setup_logger(mode=LogMode.NAMED, level=logging.INFO)
+    manager = BackupManager(
+        open_storage(args.data), args.dir,
+        full_every=int(os.getenv("BACKUP_FULL_EVERY", "24")),
+        keep_full=int(os.getenv("BACKUP_KEEP_FULL", "7")),
+    )
+
+    if args.command == "list":
+        for chain in manager.chains():
+            for backup in chain:
+                size = os.path.getsize(backup.path)
+                print(f"{'  ' if backup.kind == 'delta' else ''}{os.path.basename(backup.path)}  {size} байт")
+
+    elif args.command == "run":
+        path = manager.run_once()
+        print(path or "Данные не менялись с последней копии")
+
+    elif args.command == "verify":
+        failed = 0
+        for backup, error in manager.verify():
+            print(f"{'OK ' if error is None else 'ERR'} {os.path.basename(backup.path)}{'' if error is None else f' — {error}'}")
+            failed += error is not None
+        sys.exit(1 if failed else 0)
+
+    elif args.command == "restore":
+        if not args.out:
+            parser.error("restore требует --out")
+        _restore(manager, args.out, args.at, args.force)
+
+
+if __name__ == "__main__":
+    main()
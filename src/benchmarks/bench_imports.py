@@ -0,0 +1,49 @@
+"""
+Время импорта модулей бота (по данным python -X importtime) — чтобы держать холодный старт коротким.
+
+Запуск из каталога src:
+    python -m benchmarks.bench_imports [модуль] [--top N]
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+
+def measure(module: str) -> list:
+    """[(модуль, self мкс, cumulative мкс)] по выводу -X importtime в чистом процессе"""
+    env = dict(os.environ, TELEGRAM_BOT_TOKEN=os.getenv("TELEGRAM_BOT_TOKEN", "benchmark"))
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, env=env, check=True,
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        rows.append((name, int(self_us), int(cumulative_us)))
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Время импорта модулей")
+    parser.add_argument("module", nargs="?", default="main")
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    rows = measure(args.module)
+    total = next((cumulative for name, _, cumulative in rows if name == args.module), 0)
+    print(f"import {args.module}: {total / 1000:.0f} мс, модулей: {len(rows)}")
+
+    print(f"\n{'модуль':<48} {'своё, мс':>9} {'всего, мс':>10}")
+    for name, self_us, cumulative_us in sorted(rows, key=lambda r: r[1], reverse=True)[:args.top]:
+        print(f"{name:<48} {self_us / 1000:>9.1f} {cumulative_us / 1000:>10.1f}")
+
+    heavy = ("openai", "apscheduler", "colorlog")
+    loaded = sorted({name.split(".")[0] for name, _, _ in rows} & set(heavy))
+    print(f"\nТяжёлые пакеты при импорте: {', '.join(loaded) if loaded else 'нет'}")
+
+
+if __name__ == "__main__":
+    main()
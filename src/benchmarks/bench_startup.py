@@ -0,0 +1,79 @@
+"""
+Замер времени старта: загрузка хранилища в зависимости от числа пользователей.
+
+Запуск из каталога src:
+    python -m benchmarks.bench_startup 1000 10000 100000
+"""
+import datetime
+import json
+import os
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("TELEGRAM_BOT_TOKEN", "benchmark")
+
+from models.bot_models import BotConfig, UserInfo, UserRecord  # noqa: E402
+from services.data_service import Storage  # noqa: E402
+from utils.logger import setup_logger, LogMode  # noqa: E402
+
+DEFAULT_SIZES = (1_000, 10_000, 100_000)
+
+
+def make_users(count: int) -> dict:
+    now = datetime.datetime(2025, 3, 20, 12, 0)
+    return {
+        100_000 + i: UserRecord(
+            username=f"user{i}",
+            last_activity=now - datetime.timedelta(hours=i % 96),
+            pushups_today=i % 150,
+            reported_today=bool(i % 3),
+            last_report_date=(now - datetime.timedelta(days=i % 5)).date(),
+            total_pushups=i * 7 % 10_000,
+        )
+        for i in range(count)
+    }
+
+
+def legacy_load(path: str) -> int:
+    """Прежний путь загрузки: model_validate на каждого пользователя"""
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    users = {int(uid): UserInfo.model_validate(info) for uid, info in data["user_data"].items()}
+    return len(users)
+
+
+def timed(fn) -> float:
+    started = time.perf_counter()
+    fn()
+    return (time.perf_counter() - started) * 1000
+
+
+def run(sizes) -> None:
+    config = BotConfig(challenge_start_date=datetime.date(2025, 3, 15), challenge_end_date=datetime.date(2025, 6, 13))
+    print(f"{'users':>8} | {'legacy json':>12} | {'bulk json':>10} | {'ndjson':>8} | {'lazy ndjson':>11} | {'first get':>9}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in sizes:
+            users = make_users(size)
+            json_path = os.path.join(tmp, f"users_{size}.json")
+            ndjson_path = os.path.join(tmp, f"users_{size}.ndjson")
+            Storage(json_path).save(config, users)
+            Storage(ndjson_path).save(config, users)
+
+            legacy_ms = timed(lambda: legacy_load(json_path))
+            bulk_ms = timed(lambda: Storage(json_path).load())
+            ndjson_ms = timed(lambda: Storage(ndjson_path).load())
+
+            lazy_result = {}
+            lazy_ms = timed(lambda: lazy_result.update(Storage(ndjson_path, lazy=True).load()))
+            first_get_ms = timed(lambda: lazy_result["user_data"].get(100_000))
+
+            print(
+                f"{size:>8} | {legacy_ms:>9.1f} ms | {bulk_ms:>7.1f} ms | {ndjson_ms:>5.1f} ms | "
+                f"{lazy_ms:>8.1f} ms | {first_get_ms:>6.3f} ms"
+            )
+
+
+if __name__ == "__main__":
+    setup_logger(mode=LogMode.SILENT)
+    run([int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES)
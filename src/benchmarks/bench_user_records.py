@@ -0,0 +1,59 @@
+"""
+Память на пользователя и стоимость мутаций: UserInfo (BaseModel) против UserRecord (slots).
+
+Запуск из каталога src:
+    python -m benchmarks.bench_user_records 100000
+"""
+import datetime
+import sys
+import time
+import tracemalloc
+
+from models.bot_models import UserInfo, UserRecord
+
+DEFAULT_COUNT = 100_000
+MUTATIONS = 1_000_000
+
+
+def build(cls, count: int) -> list:
+    now = datetime.datetime(2025, 3, 20, 12, 0)
+    return [
+        cls(username=f"user{i}", last_activity=now, pushups_today=i % 150, total_pushups=i)
+        for i in range(count)
+    ]
+
+
+def memory_per_user(cls, count: int) -> float:
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    users = build(cls, count)
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del users
+    return (after - before) / count
+
+
+def mutation_cost(cls) -> float:
+    """Тот же набор записей, что делает handle_message на каждый отчёт"""
+    user = build(cls, 1)[0]
+    now = datetime.datetime(2025, 3, 21, 9, 0)
+    today = now.date()
+    started = time.perf_counter()
+    for i in range(MUTATIONS):
+        user.username = "user"
+        user.last_activity = now
+        user.pushups_today += 1
+        user.total_pushups += 1
+        user.reported_today = True
+        user.last_report_date = today
+    return (time.perf_counter() - started) / MUTATIONS * 1e9
+
+
+def run(count: int) -> None:
+    print(f"{'model':>10} | {'bytes/user':>10} | {'ns/report':>9}")
+    for cls in (UserInfo, UserRecord):
+        print(f"{cls.__name__:>10} | {memory_per_user(cls, count):>10.0f} | {mutation_cost(cls):>9.0f}")
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_COUNT)
@@ -1,19 +1,33 @@
 import datetime
-from typing import Optional
+from collections import OrderedDict
+from typing import Callable, List, Optional, Tuple
 
 from aiogram import Bot
 from aiogram.exceptions import TelegramForbiddenError
-from aiogram.types import Message
+from aiogram.types import BufferedInputFile, Message
 
-from models.bot_models import BotConfig, UserInfo, ChallengePeriod, CommentContext
+from pydantic import ValidationError
+
+from models.bot_models import (
+    BotConfig, UserRecord, ChallengePeriod, ChatSchedule, CommentContext, RequestPriority
+)
 from services.data_service import Storage
+from services.diagnostics import Diagnostics, format_snapshot
+from services.message_filter import MessageFilter
 from services.openai_service import OpenAIClient
+from services.render_cache import RenderCache, command_key
+from services.rollups import RollupStore, day_key, month_key, week_key
 from services.user_repository import UserRepository
 from services.pushups_parser import PushupsParser
 from utils.logger import get_named_logger
 
 logger = get_named_logger()
 
+# Сколько мест показывать в лидербордах за период
+LEADERBOARD_SIZE = 10
+# Сколько последних отчётов помнить для обработки их редактирования
+RECENT_REPORTS = 1000
+
 
 class BotService:
     def __init__(
@@ -22,20 +36,36 @@ class BotService:
         users: UserRepository,
         storage: Storage,
         openai_client: Optional[OpenAIClient] = None,
+        render_cache: Optional[RenderCache] = None,
+        parser: Optional[PushupsParser] = None,
+        diagnostics: Optional[Diagnostics] = None,
+        prefilter: Optional[MessageFilter] = None,
+        rollups: Optional[RollupStore] = None,
     ):
         self.config = config
         self.users = users
         self.storage = storage
         self.openai = openai_client
-        self.parser = PushupsParser(openai_client)
+        self.render_cache = render_cache or RenderCache()
+        self.parser = parser or PushupsParser(openai_client)
+        self.prefilter = prefilter or MessageFilter()
+        self.rollups = rollups if rollups is not None else RollupStore()
+        self.diagnostics = diagnostics or Diagnostics()
+        self._register_diagnostics()
+        # Подписчики на изменение расписания чата (планировщик перепланирует задачи)
+        self.schedule_listeners: List[Callable[[int], None]] = []
+        # (чат, сообщение) → (день, отжиманий, итог за день, вклад в счётчик) последних отчётов.
+        # В кластере апдейты чата всегда приходят в один воркер — локальной памяти достаточно
+        self._recent_reports: "OrderedDict[Tuple[int, int], Tuple[datetime.date, int, bool, int]]" = OrderedDict()
         self.period = ChallengePeriod(
             start_date=config.challenge_start_date,
             end_date=config.challenge_end_date
         )
 
     async def handle_message(self, message: Message) -> None:
-        if not message.text:
-            logger.debug("Получено пустое сообщение — игнорируем.")
+        reason = self.prefilter.check(message)
+        if reason:
+            logger.debug(f"Сообщение отсеяно префильтром: {reason}")
             return
 
         user_id = message.from_user.id
@@ -46,15 +76,6 @@ class BotService:
 
         logger.debug(f"Сообщение от @{username} ({user_id}): '{text}'")
 
-        user = self.users.get(user_id) or UserInfo(username=username, last_activity=now)
-        if user.last_activity:
-            logger.debug(f"Пользователь найден: @{username} | Последняя активность: {user.last_activity}")
-        else:
-            logger.debug(f"Новый пользователь: @{username}")
-
-        user.username = username
-        user.last_activity = now
-
         pushups, is_total = self.parser.extract_pushups_count(text)
         logger.debug(f"Распознано: {pushups} отжиманий | {'итог за день' if is_total else 'добавление'}")
 
@@ -62,29 +83,37 @@ class BotService:
             logger.debug("Отжиманий не найдено — сообщение проигнорировано.")
             return
 
-        if user.last_report_date != today:
-            logger.debug("Первый отчёт за сегодня — сохраняем как новый.")
-            user.pushups_today = pushups
-            user.total_pushups += pushups
-            user.reported_today = True
-            user.last_report_date = today
-        else:
-            if is_total:
-                delta = pushups - user.pushups_today
-                user.total_pushups += delta
-                user.pushups_today = pushups
+        self.ensure_day(today)
+
+        def apply(user: UserRecord) -> int:
+            if user.last_activity:
+                logger.debug(f"Пользователь найден: @{username} | Последняя активность: {user.last_activity}")
+            else:
+                logger.debug(f"Новый пользователь: @{username}")
+            user.username = username
+            user.last_activity = now
+            if message.chat.type in ("group", "supergroup"):
+                user.join_chat(message.chat.id, self.config.chat_id)
+
+            first_today = not user.reported_on(today)
+            delta = user.apply_report(pushups, is_total, today)
+            if first_today:
+                logger.debug("Первый отчёт за сегодня — сохраняем как новый.")
+            elif is_total:
                 logger.debug(f"Обновлён отчёт: новое значение {pushups} (изменение на {delta})")
             else:
-                user.pushups_today += pushups
-                user.total_pushups += pushups
                 logger.debug(f"Добавлены отжимания: +{pushups} → итого за сегодня: {user.pushups_today}")
+            return delta
 
-        self.users.add_or_update(user_id, user)
+        # Чтение, отчёт и запись — одной операцией: параллельные воркеры не теряют отчёты друг друга
+        user, delta = self.users.modify(user_id, lambda: UserRecord(username=username), apply)
         self.storage.save(self.config, self.users.all())
+        self.rollups.record(user_id, today, delta)
+        self._remember_report(message, today, pushups, is_total, delta)
         logger.debug("Статистика пользователя сохранена.")
 
         comment = "Продолжай в том же духе!"
-        if self.openai:
+        if self.openai and self.openai.is_available():
             try:
                 comment = self.openai.generate_comment(
                     user_prompt=(
@@ -98,7 +127,7 @@ class BotService:
                 logger.warning(f"OpenAI fallback: {e}")
 
 
-        total_today = self.users.total_pushups_today(today)
+        total_today = self.users.total_pushups_today()
         logger.debug(
             f"Ответ пользователю @{user.username}: {user.pushups_today} сегодня, всего по группе: {total_today}"
         )
@@ -108,15 +137,63 @@ class BotService:
             f"💪 Группа: {total_today} сегодня.\n\n{comment}"
         )
 
+    def _remember_report(
+        self, message: Message, day: datetime.date, pushups: int, is_total: bool, delta: int
+    ) -> None:
+        # Храним применённый вклад, а не число из текста: итог за день меняет счётчик на разницу
+        self._recent_reports[(message.chat.id, message.message_id)] = (day, pushups, is_total, delta)
+        self._recent_reports.move_to_end((message.chat.id, message.message_id))
+        if len(self._recent_reports) > RECENT_REPORTS:
+            self._recent_reports.popitem(last=False)
+
+    async def handle_edited_message(self, message: Message) -> None:
+        """
+        Исправление отчёта правкой сообщения: вклад старой версии заменяется новой.
+        Учитываются только недавние отчёты за сегодня — закрытые дни не меняются.
+        """
+        key = (message.chat.id, message.message_id)
+        report = self._recent_reports.get(key)
+        if report is None or not message.text:
+            logger.debug("Отредактировано сообщение, не учтённое как отчёт, — пропуск")
+            return
+
+        day, old_pushups, old_is_total, old_delta = report
+        today = datetime.date.today()
+        if day != today:
+            logger.debug(f"Правка отчёта за {day} — день закрыт, пропуск")
+            return
+
+        pushups, is_total = self.parser.extract_pushups_count(message.text.strip())
+        pushups = max(pushups, 0)
+        if (pushups, is_total) == (old_pushups, old_is_total):
+            return
+
+        def correct(user: UserRecord) -> Tuple[int, int]:
+            # Откатываем ровно тот вклад, что дала старая версия, и учитываем новую как отчёт
+            user.pushups_today -= old_delta
+            user.total_pushups -= old_delta
+            applied = user.apply_report(pushups, is_total, today)
+            return applied - old_delta, applied
+
+        user_id = message.from_user.id
+        username = message.from_user.username or message.from_user.first_name
+        user, (delta, applied) = self.users.modify(user_id, lambda: UserRecord(username=username), correct)
+        self.storage.save(self.config, self.users.all())
+        self.rollups.record(user_id, today, delta)
+        self._remember_report(message, today, pushups, is_total, applied)
+
+        logger.debug(f"Правка отчёта @{user.username}: {old_pushups} ➡️ {pushups} (изменение на {delta})")
+        await message.answer(f"✏️ @{user.username}: отчёт исправлен, {user.pushups_today} отжиманий за сегодня.")
+
     async def handle_mention(self, message: Message) -> None:
         user_id = message.from_user.id
         username = message.from_user.username or message.from_user.first_name
-        today = datetime.date.today()
 
         logger.debug(f"🔔 Упоминание бота от @{username} ({user_id})")
 
+        self.ensure_day(datetime.date.today())
         user = self.users.get(user_id)
-        pushups_today = user.pushups_today if user and user.last_report_date == today else 0
+        pushups_today = user.pushups_today if user else 0
         total_pushups = user.total_pushups if user else 0
 
         logger.debug(f"📊 Статистика @{username}: сегодня {pushups_today}, всего {total_pushups}")
@@ -142,7 +219,10 @@ class BotService:
         try:
             reply = self.openai.generate_comment(
                 user_prompt,
-                system_prompt=system_prompt
+                system_prompt=system_prompt,
+                use_cache=False,
+                fallback=False,
+                priority=RequestPriority.MENTION
             )
             logger.debug(f"💬 Ответ от OpenAI для @{username}: {reply}")
         except Exception as e:
@@ -156,6 +236,8 @@ class BotService:
 
     async def handle_mystats(self, message: Message) -> None:
         user_id = message.from_user.id
+        today = datetime.date.today()
+        self.ensure_day(today)
         user = self.users.get(user_id)
 
         if not user:
@@ -163,12 +245,20 @@ class BotService:
             await message.answer("У вас пока нет статистики. Отправьте отчёт, чтобы начать!")
             return
 
-        today = datetime.date.today()
+        text = self.render_cache.get_or_render(
+            message.chat.id,
+            command_key("mystats", [], user_id),
+            self._render_version(today),
+            lambda: self._render_mystats(user, today),
+        )
+        await message.answer(text)
+
+    def _render_mystats(self, user: UserRecord, today: datetime.date) -> str:
         current_day, days_remaining = self.period.get_day_info(today)
 
         logger.debug(f"@{user.username}: /mystats — {user.pushups_today} сегодня, {user.total_pushups} всего")
 
-        await message.answer(
+        return (
             f"📊 @{user.username}\n"
             f"Сегодня: {user.pushups_today} отжиманий\n"
             f"Всего: {user.total_pushups} отжиманий\n"
@@ -176,26 +266,136 @@ class BotService:
         )
 
     async def handle_stats(self, message: Message) -> None:
+        """
+        /stats — сегодня; /stats week, /stats month — текущая неделя и месяц;
+        /stats day N, /stats days A-B — дни челленджа. Периоды читаются из сводок.
+        """
+        args = (message.text or "").strip().split()[1:]
         today = datetime.date.today()
-        total_today = self.users.total_pushups_today(today)
+        self.ensure_day(today)
+
+        if not args:
+            render = lambda: self._render_stats(today)
+        else:
+            render = self._period_renderer([arg.lower() for arg in args], today)
+            if render is None:
+                await message.answer("Формат: /stats [week | month | day N | days A-B]")
+                return
+
+        text = self.render_cache.get_or_render(
+            message.chat.id,
+            command_key("stats", args, message.from_user.id),
+            self._render_version(today),
+            render,
+        )
+        await message.answer(text)
+
+    def _period_renderer(self, args: List[str], today: datetime.date) -> Optional[Callable[[], str]]:
+        sub = args[0]
+        if sub == "week" and len(args) == 1:
+            monday = today - datetime.timedelta(days=today.weekday())
+            title = f"📅 Неделя {monday:%d.%m}–{monday + datetime.timedelta(days=6):%d.%m}"
+            return lambda: self._render_leaderboard(title, *self.rollups.top(week_key(today), LEADERBOARD_SIZE))
+        if sub == "month" and len(args) == 1:
+            title = f"📅 Месяц {today:%m.%Y}"
+            return lambda: self._render_leaderboard(title, *self.rollups.top(month_key(today), LEADERBOARD_SIZE))
+        if sub == "day" and len(args) == 2 and self._challenge_day(args[1]):
+            day = self.period.day_date(int(args[1]))
+            title = f"📅 День челленджа #{args[1]} ({day:%d.%m})"
+            return lambda: self._render_leaderboard(title, *self.rollups.top(day_key(day), LEADERBOARD_SIZE))
+        if sub == "days" and len(args) == 2:
+            first, _, last = args[1].partition("-")
+            if self._challenge_day(first) and self._challenge_day(last) and int(first) <= int(last):
+                start, end = self.period.day_date(int(first)), self.period.day_date(int(last))
+                title = f"📅 Дни челленджа #{first}–#{last} ({start:%d.%m}–{end:%d.%m})"
+                return lambda: self._render_leaderboard(title, *self.rollups.top_range(start, end, LEADERBOARD_SIZE))
+        return None
+
+    def _challenge_day(self, arg: str) -> bool:
+        """Номер дня в пределах челленджа: иначе day_date переполняется, а диапазон обходит миллионы ключей"""
+        return arg.isdigit() and 1 <= int(arg) <= self.period.length
+
+    def _render_leaderboard(self, title: str, top: List[Tuple[int, int]], total: int) -> str:
+        logger.debug(f"/stats: {title} — всего {total}, в топе {len(top)}")
+
+        lines = [title, f"💪 Группа: {total} отжиманий", ""]
+        if not top:
+            lines.append("Отчётов за этот период нет.")
+        else:
+            lines.append("🔥 Топ:")
+            for i, (user_id, pushups) in enumerate(top, 1):
+                user = self.users.get(user_id)
+                lines.append(f"{i}. @{user.username if user else user_id}: {pushups}")
+        return "\n".join(lines)
+
+    def _render_stats(self, today: datetime.date) -> str:
+        total_today = self.users.total_pushups_today()
         total_all = self.users.total_pushups_all_time()
         current_day, _ = self.period.get_day_info(today)
 
         logger.debug(f"/stats: сегодня {total_today}, всего {total_all}")
 
-        top_today = self.users.sorted_by_pushups_today(today)
-        top_list = ""
+        lines = [
+            f"📈 Сегодня группа сделала: {total_today} отжиманий",
+            f"🏆 Всего: {total_all} отжиманий",
+            f"📅 День челленджа: #{current_day}",
+            "",
+        ]
+
+        top_today = self.users.sorted_by_pushups_today()
         if top_today:
-            top_list += "🔥 Топ за сегодня:\n"
-            for i, (uid, u) in enumerate(top_today, 1):
-                top_list += f"{i}. @{u.username}: {u.pushups_today}\n"
+            lines.append("🔥 Топ за сегодня:")
+            lines.extend(f"{i}. @{u.username}: {u.pushups_today}" for i, (uid, u) in enumerate(top_today, 1))
+            lines.append("")
 
-        await message.answer(
-            f"📈 Сегодня группа сделала: {total_today} отжиманий\n"
-            f"🏆 Всего: {total_all} отжиманий\n"
-            f"📅 День челленджа: #{current_day}\n\n"
-            f"{top_list}"
+        return "\n".join(lines)
+
+    def _render_version(self, today: datetime.date):
+        # Эпоха дня меняется при закрытии дня, дата — для заголовков с номером дня
+        return self.users.version, self.config.day_epoch, today
+
+    def ensure_day(self, today: datetime.date) -> None:
+        """
+        Дневные счётчики — это «сегодня», только пока config.counters_date == today.
+        Если полночный DayRollover ещё не успел, день закрывается по требованию перед чтением.
+        """
+        if self.config.counters_date != today:
+            self.rollover(today)
+
+    def rollover(self, today: Optional[datetime.date] = None) -> bool:
+        """
+        Закрывает прошедшие дни: дописывает дневные итоги в сводки, одним пакетом
+        обнуляет дневные счётчики и увеличивает эпоху. Идемпотентно — повторный
+        запуск (в т.ч. после простоя или сбоя посередине) ничего не задвоит.
+        Возвращает False, если день уже закрыт.
+        """
+        today = today or datetime.date.today()
+        if self.config.counters_date is not None and self.config.counters_date >= today:
+            return False
+
+        closed = self.users.reset_daily(today)
+
+        # Снимок дня: сводки сверяются с итогами счётчиков (дописывается только разница)
+        corrections = []
+        for user_id, (day, pushups) in closed.items():
+            if day is None:
+                continue
+            missing = pushups - self.rollups.value(day_key(day), user_id)
+            if missing:
+                corrections.append((user_id, day, missing))
+        if corrections:
+            self.rollups.record_many(corrections)
+        self.rollups.close_day(today - datetime.timedelta(days=1))
+
+        self.config.counters_date = today
+        self.config.day_epoch += 1
+        self.storage.save(self.config, self.users.all())
+
+        logger.info(
+            f"День закрыт (эпоха {self.config.day_epoch}): сброшено {len(closed)} счётчиков, "
+            f"{sum(p for _, p in closed.values())} отжиманий, поправок в сводках: {len(corrections)}"
         )
+        return True
 
     async def handle_change_stat(self, message: Message) -> None:
         user_id = message.from_user.id
@@ -207,24 +407,29 @@ class BotService:
             return
 
         new_value = int(args[1])
-        user = self.users.get(user_id)
-
-        if not user:
+        if self.users.get(user_id) is None:
             logger.debug("Пользователь не найден при /changemydailystats")
             await message.answer("У вас пока нет статистики. Отправьте отчёт, чтобы начать!")
             return
 
         today = datetime.date.today()
-        old_value = user.pushups_today
-        delta = new_value - old_value
 
-        user.pushups_today = new_value
-        user.total_pushups += delta
-        user.last_report_date = today
-        user.last_activity = datetime.datetime.now()
+        def change(user: UserRecord) -> int:
+            # Счётчик прошлого, ещё не закрытого дня к сегодняшнему не относится
+            old = user.pushups_today if user.reported_on(today) else 0
+            user.pushups_today = new_value
+            user.reported_today = True
+            user.total_pushups += new_value - old
+            user.last_report_date = today
+            user.last_activity = datetime.datetime.now()
+            return old
 
-        self.users.add_or_update(user_id, user)
+        user, old_value = self.users.modify(
+            user_id, lambda: UserRecord(username=message.from_user.username or message.from_user.first_name), change
+        )
+        delta = new_value - old_value
         self.storage.save(self.config, self.users.all())
+        self.rollups.record(user_id, today, delta)
 
         logger.debug(f"/changemydailystats: @{user.username} {old_value} ➡️ {new_value} (+{delta})")
         await message.answer(f"Изменено: {old_value} ➡️ {new_value} отжиманий.")
@@ -234,32 +439,88 @@ class BotService:
             logger.debug("/setgroup вызван не из группы")
             await message.answer("Эта команда работает только в группах.")
             return
-        try:
-            member = await bot.get_chat_member(message.chat.id, message.from_user.id)
-            if member.status not in ("creator", "administrator"):
-                await message.answer("⛔ Эта команда доступна только администраторам.")
-                return
-        except TelegramForbiddenError:
-            await message.answer("Не удалось проверить статус администратора.")
+        if not await self._check_admin(message, bot):
             return
 
         self.config.chat_id = message.chat.id
+        if message.chat.id not in self.config.chats:
+            self.config.chats[message.chat.id] = ChatSchedule(reminder_time=self.config.reminder_time)
         self.storage.save(self.config, self.users.all())
+        self._notify_schedule_changed(message.chat.id)
 
         logger.info(f"Группа настроена как основная: chat_id={self.config.chat_id}")
         await message.answer(f"Группа настроена! chat_id: <code>{self.config.chat_id}</code>")
 
-    async def handle_config(self, message: Message) -> None:
+    async def handle_config(self, message: Message, bot: Bot) -> None:
+        args = (message.text or "").strip().split()
+        if len(args) >= 3:
+            await self._update_schedule(message, bot, args[1].lower(), args[2])
+            return
+
         cfg = self.config
+        schedule = cfg.chats.get(message.chat.id)
         logger.debug(f"/config: {cfg}")
+
+        schedule_text = (
+            f"Часовой пояс: <b>{schedule.timezone or 'время сервера'}</b>\n"
+            f"Напоминание: <b>{schedule.reminder_time}</b>\n"
+            f"Предупреждение в: {schedule.warning_time}\n"
+            f"Исключение в: {schedule.kick_time}\n"
+            if schedule else f"Напоминание: <b>{cfg.reminder_time}</b>\n"
+        )
         await message.answer(
             f"🛠 <b>Текущая конфигурация:</b>\n"
             f"Chat ID: <code>{cfg.chat_id}</code>\n"
-            f"Напоминание: <b>{cfg.reminder_time}</b>\n"
+            f"{schedule_text}"
             f"Предупреждение: {cfg.warning_days} дн\n"
             f"Удаление: {cfg.inactivity_days} дн\n"
-            f"Челлендж: {cfg.challenge_start_date} → {cfg.challenge_end_date}"
+            f"Челлендж: {cfg.challenge_start_date} → {cfg.challenge_end_date}\n\n"
+            f"Изменить: /config reminder|warning|kick ЧЧ:ММ, /config timezone Europe/Moscow"
+        )
+
+    async def _update_schedule(self, message: Message, bot: Bot, key: str, value: str) -> None:
+        fields = {
+            "reminder": "reminder_time",
+            "warning": "warning_time",
+            "kick": "kick_time",
+            "timezone": "timezone",
+        }
+        if key not in fields:
+            await message.answer("Неизвестный параметр. Доступны: reminder, warning, kick, timezone.")
+            return
+        if not await self._check_admin(message, bot):
+            return
+
+        chat_id = message.chat.id
+        current = self.config.chats.get(chat_id) or ChatSchedule(reminder_time=self.config.reminder_time)
+        try:
+            schedule = ChatSchedule.model_validate({**current.model_dump(), fields[key]: value})
+        except (ValidationError, ValueError) as e:
+            logger.debug(f"/config {key} {value}: {e}")
+            await message.answer(f"Некорректное значение: <code>{value}</code>")
+            return
+
+        self.config.chats[chat_id] = schedule
+        self.storage.save(self.config, self.users.all())
+        self._notify_schedule_changed(chat_id)
+
+        logger.info(f"Расписание чата {chat_id} изменено: {key}={value}")
+        await message.answer(f"✅ {key} = <b>{value}</b>. Расписание обновлено.")
+
+    def apply_config(self, config: BotConfig) -> None:
+        """Подменяет конфиг изменённым в другом воркере и перепланирует затронутые чаты"""
+        changed = set(self.config.chats) | set(config.chats)
+        self.config = config
+        self.period = ChallengePeriod(
+            start_date=config.challenge_start_date,
+            end_date=config.challenge_end_date
         )
+        for chat_id in changed:
+            self._notify_schedule_changed(chat_id)
+
+    def _notify_schedule_changed(self, chat_id: int) -> None:
+        for listener in self.schedule_listeners:
+            listener(chat_id)
 
     async def handle_welcome_new(self, message: Message) -> None:
         for member in message.new_chat_members:
@@ -273,42 +534,110 @@ class BotService:
                 f"Команды: /mystats, /stats"
             )
 
-    async def handle_adminstats(self, message: Message, bot: Bot) -> None:
+    async def _check_admin(self, message: Message, bot: Bot) -> bool:
         try:
             member = await bot.get_chat_member(message.chat.id, message.from_user.id)
             if member.status not in ("creator", "administrator"):
                 await message.answer("⛔ Эта команда доступна только администраторам.")
-                return
+                return False
         except TelegramForbiddenError:
             await message.answer("Не удалось проверить статус администратора.")
+            return False
+        return True
+
+    async def handle_adminstats(self, message: Message, bot: Bot) -> None:
+        if not await self._check_admin(message, bot):
             return
 
+        today = datetime.date.today()
+        self.ensure_day(today)
+        text = self.render_cache.get_or_render(
+            message.chat.id,
+            "adminstats",
+            self._render_version(today),
+            self._render_adminstats,
+        )
+        await message.answer(text)
+
+    def _render_adminstats(self) -> str:
         total_users = len(self.users.all())
-        active_today = len(self.users.get_active_today())
+        active_today = self.users.count_active_today()
         inactive_4d = len(self.users.get_inactive_for_days(self.config.inactivity_days))
         never_reported = [
             u.username for u in self.users.all().values()
             if not u.last_report_date
         ]
 
-        top_total = self.users.sorted_by_total_pushups()[:5]
+        top_total = self.users.sorted_by_total_pushups(5)
 
         logger.debug(f"/adminstats: {total_users} участников, {active_today} активны, {inactive_4d} неактивны")
 
-        text = (
+        parts = [
             "<b>📊 Админ-статистика:</b>\n"
             f"Всего участников: <b>{total_users}</b>\n"
             f"Активны сегодня: <b>{active_today}</b>\n"
             f"Неактивны {self.config.inactivity_days}+ дней: <b>{inactive_4d}</b>\n\n"
-        )
+        ]
 
         if never_reported:
-            text += "❗ Никогда не отчитывались:\n"
-            text += "\n".join(f"• @{name}" for name in never_reported[:10]) + "\n\n"
+            parts.append("❗ Никогда не отчитывались:\n")
+            parts.append("\n".join(f"• @{name}" for name in never_reported[:10]) + "\n\n")
 
         if top_total:
-            text += "🏆 Топ-5 по всем временам:\n"
-            for i, (_, user) in enumerate(top_total, 1):
-                text += f"{i}. @{user.username}: {user.total_pushups} отж.\n"
+            parts.append("🏆 Топ-5 по всем временам:\n")
+            parts.extend(
+                f"{i}. @{user.username}: {user.total_pushups} отж.\n"
+                for i, (_, user) in enumerate(top_total, 1)
+            )
+
+        return "".join(parts)
+
+    def _register_diagnostics(self) -> None:
+        diag = self.diagnostics
+        diag.register("пользователей", lambda: len(self.users.all()))
+        diag.register("кеш парсера", lambda: len(self.parser.api_calls_cache))
+        diag.register("префильтр", lambda: dict(self.prefilter.stats))
+        diag.register("уровни парсера", lambda: dict(self.parser.stats))
+        diag.register("кеш статистики", self.render_cache.stats)
+        diag.register("сводки по периодам", lambda: len(self.rollups))
+        if self.openai and self.openai.cache is not None:
+            diag.register("кеш комментариев", self.openai.cache.stats)
+
+    async def handle_diagnostics(self, message: Message, bot: Bot) -> None:
+        """
+        /diag — снимок состояния процесса.
+        /diag mem on|off — включить/выключить tracemalloc.
+        /diag profile [сек] — профиль живого трафика файлом.
+        """
+        if not await self._check_admin(message, bot):
+            return
+
+        args = (message.text or "").strip().split()[1:]
+        sub = args[0].lower() if args else ""
+
+        if sub == "mem" and len(args) > 1 and args[1].lower() in ("on", "off"):
+            enabled = args[1].lower() == "on"
+            self.diagnostics.set_tracemalloc(enabled)
+            logger.info(f"/diag: tracemalloc {'включён' if enabled else 'выключен'}")
+            await message.answer(f"tracemalloc {'включён' if enabled else 'выключен'}.")
+            return
+
+        if sub == "profile":
+            try:
+                seconds = float(args[1]) if len(args) > 1 else 10.0
+            except ValueError:
+                await message.answer("Формат: /diag profile [секунды]")
+                return
+            await message.answer(f"⏱ Профилирую {seconds:.0f} с…")
+            try:
+                report = await self.diagnostics.profile(seconds)
+            except RuntimeError as e:
+                await message.answer(str(e))
+                return
+            await message.answer_document(
+                BufferedInputFile(report.encode("utf-8"), filename=f"profile_{datetime.datetime.now():%Y%m%d_%H%M%S}.txt"),
+                caption="Топ функций по cumulative time",
+            )
+            return
 
-        await message.answer(text)
\ No newline at end of file
+        await message.answer(format_snapshot(self.diagnostics.snapshot(), self.diagnostics.top_allocations()))
@@ -0,0 +1,194 @@
+"""
+Многопроцессный режим: один процесс опрашивает Telegram и раскладывает апдейты
+по воркерам по chat_id, воркеры делят состояние через SQLite (DATA_PATH=*.sqlite),
+ежедневные задачи выполняет только воркер, удерживающий аренду лидера.
+
+    DATA_PATH=pushups.sqlite python cluster.py --workers 4
+"""
+import argparse
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import socket
+from typing import List, Optional
+
+from utils.logger import setup_logger, get_named_logger, LogMode
+
+logger = get_named_logger()
+
+ALLOWED_UPDATES = ["message", "edited_message", "chat_member"]
+
+# Сколько ждать завершения воркера при остановке
+_JOIN_TIMEOUT = 30.0
+
+
+def shard_for(update: dict, workers: int) -> int:
+    """Все апдейты одного чата попадают в один воркер — порядок внутри чата сохраняется"""
+    for key in ALLOWED_UPDATES:
+        event = update.get(key)
+        if event and event.get("chat"):
+            return event["chat"]["id"] % workers
+    return 0
+
+
+# --- воркер ---
+
+def run_worker(index: int, queue: multiprocessing.Queue) -> None:
+    # У каждого воркера свой файл кеша OpenAI — общий файл перезаписывался бы наперегонки
+    cache_path = os.getenv("OPENAI_CACHE_PATH", "openai_cache.json")
+    os.environ["OPENAI_CACHE_PATH"] = f"{cache_path}.w{index}"
+    asyncio.run(_serve(index, queue))
+
+
+async def _serve(index: int, queue: multiprocessing.Queue) -> None:
+    from main import create_app, register_bot_commands
+    from scheduler.leader import LeaderElector
+    from scheduler.reminder import schedule_reminders
+    from scheduler.rollover import DayRollover
+    from services.shared_store import SqliteStorage
+
+    setup_logger(mode=LogMode.NAMED, level=logging.INFO)
+    app = create_app()  # приложение собирается уже в процессе воркера
+    if not isinstance(app.storage, SqliteStorage):
+        raise RuntimeError("Многопроцессный режим требует общего хранилища: DATA_PATH=*.sqlite")
+
+    owner = f"{socket.gethostname()}:{os.getpid()}:w{index}"
+    scheduler = None
+    rollover = DayRollover(app.service, fence=lambda: elector.is_leader)
+
+    async def on_elected() -> None:
+        nonlocal scheduler
+        await register_bot_commands(app.bot)
+        rollover.start()
+        if app.backups:
+            app.backups.start()
+        scheduler = schedule_reminders(app.bot, app.service, fence=lambda: elector.is_leader)
+
+    async def on_demoted() -> None:
+        nonlocal scheduler
+        await rollover.stop()
+        if app.backups:
+            await asyncio.to_thread(app.backups.stop)
+        if scheduler:
+            await scheduler.stop()
+            scheduler = None
+
+    elector = LeaderElector(app.storage, owner, on_elected, on_demoted, ttl=app.settings.LEADER_LEASE_TTL)
+    elector.start()
+    app.service.diagnostics.lag_monitor.start()
+    app.service.diagnostics.register("очередь воркера", queue.qsize)
+    sync_task = asyncio.create_task(_sync_config(app.service, app.storage, app.settings.CONFIG_SYNC_SECONDS))
+
+    loop = asyncio.get_running_loop()
+    tasks = set()
+    app.timer.report()
+    logger.info(f"Воркер {owner} запущен")
+    try:
+        while True:
+            raw = await loop.run_in_executor(None, queue.get)
+            if raw is None:
+                break
+            # Как start_polling: каждый апдейт — отдельная задача
+            task = asyncio.create_task(app.dp.feed_raw_update(app.bot, json.loads(raw)))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+    finally:
+        if tasks:
+            await asyncio.wait(tasks, timeout=_JOIN_TIMEOUT)
+        sync_task.cancel()
+        await app.service.diagnostics.lag_monitor.stop()
+        await elector.stop()
+        if app.openai_client and app.openai_client.cache:
+            app.openai_client.cache.flush()
+        await app.bot.session.close()
+        logger.info(f"Воркер {owner} остановлен")
+
+
+async def _sync_config(service, store, interval: float) -> None:
+    """Подхватывает изменения /config и /setgroup, сделанные в других воркерах"""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            config = store.reload_config_if_changed()
+        except Exception as e:
+            logger.warning(f"Не удалось перечитать конфиг: {e}")
+            continue
+        if config is not None:
+            logger.info("Конфиг изменён другим воркером — применяем")
+            service.apply_config(config)
+
+
+# --- диспетчер ---
+
+class Cluster:
+    def __init__(self, workers: int):
+        self.context = multiprocessing.get_context("spawn")
+        self.queues: List[multiprocessing.Queue] = [self.context.Queue() for _ in range(workers)]
+        self.processes: List[Optional[multiprocessing.Process]] = [None] * workers
+
+    def ensure_workers(self) -> None:
+        """Запускает воркеры и перезапускает упавшие; их очередь переживает рестарт"""
+        for index, process in enumerate(self.processes):
+            if process is not None and process.is_alive():
+                continue
+            if process is not None:
+                logger.error(f"Воркер {index} завершился с кодом {process.exitcode} — перезапуск")
+            process = self.context.Process(target=run_worker, args=(index, self.queues[index]), name=f"worker-{index}")
+            process.start()
+            self.processes[index] = process
+
+    def dispatch(self, update: dict) -> None:
+        self.queues[shard_for(update, len(self.queues))].put(json.dumps(update, ensure_ascii=False))
+
+    def shutdown(self) -> None:
+        for queue in self.queues:
+            queue.put(None)
+        for process in self.processes:
+            if process is not None:
+                process.join(_JOIN_TIMEOUT)
+                if process.is_alive():
+                    process.terminate()
+
+
+async def poll(cluster: Cluster, token: str) -> None:
+    from aiogram import Bot
+
+    bot = Bot(token=token)
+    offset = None
+    try:
+        while True:
+            cluster.ensure_workers()
+            updates = await bot.get_updates(offset=offset, timeout=25, allowed_updates=ALLOWED_UPDATES)
+            for update in updates:
+                offset = update.update_id + 1
+                cluster.dispatch(update.model_dump(mode="json", by_alias=True, exclude_none=True))
+    finally:
+        await bot.session.close()
+
+
+def main() -> None:
+    from config import load_env_file, settings
+
+    # Воркеры читают часть настроек из окружения (OPENAI_CACHE_PATH) — .env наследуется ими
+    load_env_file()
+    parser = argparse.ArgumentParser(description="Бот в несколько процессов")
+    parser.add_argument("--workers", type=int, default=settings.CLUSTER_WORKERS)
+    args = parser.parse_args()
+
+    setup_logger(mode=LogMode.NAMED, level=logging.INFO)
+
+    cluster = Cluster(max(1, args.workers))
+    cluster.ensure_workers()
+    logger.info(f"Кластер запущен: {args.workers} воркеров")
+    try:
+        asyncio.run(poll(cluster, settings.TELEGRAM_TOKEN))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        cluster.shutdown()
+
+
+if __name__ == "__main__":
+    main()
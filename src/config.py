@@ -1,16 +1,76 @@
 # config/settings.py
 from datetime import date
+from functools import lru_cache
 from pathlib import Path
+from typing import Dict, Tuple
 from pydantic import Field, ValidationError
 from pydantic_settings import BaseSettings
-from models.bot_models import BotConfig
+from models.bot_models import BotConfig, ThrottleKind
+
+
+# .env рядом с кодом — его читают Settings и офлайн-инструменты (load_env_file)
+ENV_FILE = Path(__file__).resolve().parent / ".env"
+
+
+def load_env_file() -> None:
+    """
+    Переносит .env в окружение для CLI, которые берут значения по умолчанию
+    из os.getenv и не требуют полной валидации Settings (токена бота и т.п.).
+    Уже заданные переменные окружения не перезаписываются.
+    """
+    from dotenv import load_dotenv
+
+    load_dotenv(ENV_FILE)
 
 
 class Settings(BaseSettings):
     TELEGRAM_TOKEN: str = Field(..., alias="TELEGRAM_BOT_TOKEN")
     OPENAI_API_KEY: str = Field(default="", alias="OPENAI_API_KEY")
 
-    DATA_PATH: str = "pushups_bot_data.json"
+    OPENAI_MODEL: str = Field(default="gpt-3.5-turbo", alias="OPENAI_MODEL")
+    OPENAI_DEADLINE: float = Field(default=4.0, alias="OPENAI_DEADLINE")
+    OPENAI_BREAKER_FAILURES: int = Field(default=3, alias="OPENAI_BREAKER_FAILURES")
+    OPENAI_BREAKER_RESET: float = Field(default=30.0, alias="OPENAI_BREAKER_RESET")
+    OPENAI_RPM: int = Field(default=60, alias="OPENAI_RPM")
+    OPENAI_TPM: int = Field(default=40000, alias="OPENAI_TPM")
+    OPENAI_CACHE_PATH: str = Field(default="openai_cache.json", alias="OPENAI_CACHE_PATH")
+    OPENAI_CACHE_SIZE: int = Field(default=2000, alias="OPENAI_CACHE_SIZE")
+    OPENAI_CACHE_TTL: float = Field(default=86400.0, alias="OPENAI_CACHE_TTL")
+
+    PARSER_CORPUS_PATH: str = Field(default="parser_corpus.jsonl", alias="PARSER_CORPUS_PATH")
+    CLASSIFIER_MODEL_PATH: str = Field(default="report_classifier.json", alias="CLASSIFIER_MODEL_PATH")
+    CLASSIFIER_THRESHOLD: float = Field(default=0.9, alias="CLASSIFIER_THRESHOLD")
+
+    DATA_PATH: str = "pushups_bot_data.json"  # *.ndjson — компактный снимок
+    DATA_LAZY_LOAD: bool = Field(default=False, alias="DATA_LAZY_LOAD")
+
+    # Резервные копии: сжатые снимки + дельты; BACKUP_INTERVAL_SECONDS=0 — выключено
+    BACKUP_DIR: str = Field(default="backups", alias="BACKUP_DIR")
+    BACKUP_INTERVAL_SECONDS: float = Field(default=3600.0, alias="BACKUP_INTERVAL_SECONDS")
+    BACKUP_FULL_EVERY: int = Field(default=24, alias="BACKUP_FULL_EVERY")
+    BACKUP_KEEP_FULL: int = Field(default=7, alias="BACKUP_KEEP_FULL")
+
+    # Многопроцессный режим (cluster.py): нужен DATA_PATH=*.sqlite
+    CLUSTER_WORKERS: int = Field(default=2, alias="CLUSTER_WORKERS")
+    LEADER_LEASE_TTL: float = Field(default=30.0, alias="LEADER_LEASE_TTL")
+    CONFIG_SYNC_SECONDS: float = Field(default=5.0, alias="CONFIG_SYNC_SECONDS")
+
+    # Сторож event loop: при задержке больше порога снимается стек блокировки; 0 — выключен
+    LOOP_STALL_THRESHOLD_MS: float = Field(default=250.0, alias="LOOP_STALL_THRESHOLD_MS")
+
+    PREFILTER_MAX_LENGTH: int = Field(default=300, alias="PREFILTER_MAX_LENGTH")
+
+    # Лимиты входящих запросов на пользователя: всплеск и пополнение в минуту;
+    # лимит чата — в THROTTLE_CHAT_FACTOR раз больше
+    THROTTLE_REPORT_BURST: float = Field(default=5, alias="THROTTLE_REPORT_BURST")
+    THROTTLE_REPORT_PER_MINUTE: float = Field(default=10, alias="THROTTLE_REPORT_PER_MINUTE")
+    THROTTLE_STATS_BURST: float = Field(default=3, alias="THROTTLE_STATS_BURST")
+    THROTTLE_STATS_PER_MINUTE: float = Field(default=4, alias="THROTTLE_STATS_PER_MINUTE")
+    THROTTLE_MENTION_BURST: float = Field(default=2, alias="THROTTLE_MENTION_BURST")
+    THROTTLE_MENTION_PER_MINUTE: float = Field(default=2, alias="THROTTLE_MENTION_PER_MINUTE")
+    THROTTLE_CHAT_FACTOR: float = Field(default=10, alias="THROTTLE_CHAT_FACTOR")
+
+    STATS_COOLDOWN_SECONDS: float = Field(default=3.0, alias="STATS_COOLDOWN_SECONDS")
 
     DEFAULT_REMINDER_TIME: str = Field(default="22:00", alias="DEFAULT_REMINDER_TIME")
     DEFAULT_INACTIVITY_DAYS: int = Field(default=4, alias="DEFAULT_INACTIVITY_DAYS")
@@ -19,6 +79,22 @@ class Settings(BaseSettings):
     CHALLENGE_START: date = Field(default_factory=lambda: date(2025, 3, 15), alias="CHALLENGE_START")
     CHALLENGE_END: date = Field(default_factory=lambda: date(2025, 2, 13), alias="CHALLENGE_END")
 
+    def throttle_rules(self) -> Tuple[Dict[ThrottleKind, "ThrottleRule"], Dict[ThrottleKind, "ThrottleRule"]]:
+        """Правила лимитов (пользователь, чат) по классам запросов"""
+        from services.throttling import ThrottleRule
+
+        user_rules = {
+            ThrottleKind.REPORT: ThrottleRule(self.THROTTLE_REPORT_BURST, self.THROTTLE_REPORT_PER_MINUTE),
+            ThrottleKind.STATS: ThrottleRule(self.THROTTLE_STATS_BURST, self.THROTTLE_STATS_PER_MINUTE),
+            ThrottleKind.MENTION: ThrottleRule(self.THROTTLE_MENTION_BURST, self.THROTTLE_MENTION_PER_MINUTE),
+        }
+        factor = self.THROTTLE_CHAT_FACTOR
+        chat_rules = {
+            kind: ThrottleRule(rule.burst * factor, rule.per_minute * factor)
+            for kind, rule in user_rules.items()
+        }
+        return user_rules, chat_rules
+
     def to_bot_config(self) -> BotConfig:
         """
         Преобразует Settings → BotConfig, с валидацией логики.
@@ -39,15 +115,24 @@ class Settings(BaseSettings):
 
     model_config = {
 
-        "env_file": str(Path(__file__).resolve().parents[0] / ".env"),
+        "env_file": str(ENV_FILE),
 
         "env_file_encoding": "utf-8",
         "populate_by_name": True,
     }
 
 
-# Сразу валидируем настройки
-try:
-    settings = Settings()
-except ValidationError as e:
-    raise RuntimeError(f"\n❌ Ошибка в .env или переменных окружения:\n{e}")
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """Настройки валидируются при первом обращении, а не при импорте модуля"""
+    try:
+        return Settings()
+    except ValidationError as e:
+        raise RuntimeError(f"\n❌ Ошибка в .env или переменных окружения:\n{e}")
+
+
+def __getattr__(name: str):
+    # Совместимость: from config import settings
+    if name == "settings":
+        return get_settings()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
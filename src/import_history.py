@@ -0,0 +1,97 @@
+"""
+Восстановление статистики по истории группы из экспорта Telegram Desktop (result.json).
+
+    python import_history.py result.json --data pushups_bot_data.json --since 2025-03-15
+"""
+import argparse
+import datetime
+import logging
+import os
+
+from config import load_env_file
+from services.history_import import HistoryImporter
+from services.pushups_parser import PushupsParser
+from services.shared_store import SqliteStorage, open_storage
+from utils.logger import setup_logger, get_named_logger, LogMode
+
+logger = get_named_logger()
+
+
+def _openai_client():
+    """Клиент OpenAI из настроек бота — только если ключ задан"""
+    from config import settings
+    from services.openai_budget import OpenAIBudget
+    from services.openai_service import OpenAIClient
+
+    if not settings.OPENAI_API_KEY:
+        return None
+    return OpenAIClient(
+        api_key=settings.OPENAI_API_KEY,
+        model=settings.OPENAI_MODEL,
+        deadline=settings.OPENAI_DEADLINE,
+        budget=OpenAIBudget(requests_per_minute=settings.OPENAI_RPM, tokens_per_minute=settings.OPENAI_TPM),
+    )
+
+
+def main() -> None:
+    load_env_file()
+    parser = argparse.ArgumentParser(description="Импорт истории группы из экспорта Telegram Desktop")
+    parser.add_argument("export", help="путь к result.json")
+    parser.add_argument("--data", default=os.getenv("DATA_PATH", "pushups_bot_data.json"),
+                        help="хранилище бота (*.json, *.ndjson или *.sqlite)")
+    parser.add_argument("--since", type=datetime.date.fromisoformat, default=None,
+                        help="учитывать сообщения с даты YYYY-MM-DD (по умолчанию — начало челленджа)")
+    parser.add_argument("--reset", action="store_true",
+                        help="пересчитать пользователей из экспорта с нуля, а не дописывать новые дни")
+    parser.add_argument("--workers", type=int, default=None, help="процессов для разбора (по умолчанию — по числу ядер)")
+    parser.add_argument("--no-llm", action="store_true", help="не обращаться к OpenAI, только локальные уровни")
+    parser.add_argument("--dry-run", action="store_true", help="посчитать, но не сохранять")
+    args = parser.parse_args()
+
+    setup_logger(mode=LogMode.NAMED, level=logging.INFO)
+
+    storage = open_storage(args.data)
+    loaded = storage.load()
+    config, users = loaded["config"], loaded["user_data"]
+
+    classifier_path = os.getenv("CLASSIFIER_MODEL_PATH", "report_classifier.json")
+    importer = HistoryImporter(
+        PushupsParser(
+            None if args.no_llm else _openai_client(),
+            classifier_threshold=float(os.getenv("CLASSIFIER_THRESHOLD", "0.9")),
+            corpus_path=os.getenv("PARSER_CORPUS_PATH", "parser_corpus.jsonl"),
+        ),
+        classifier_path=classifier_path if os.path.exists(classifier_path) else None,
+        workers=args.workers,
+        use_llm=not args.no_llm,
+    )
+    updated, stats = importer.run(
+        args.export, users,
+        since=args.since or config.challenge_start_date,
+        reset=args.reset,
+    )
+    logger.info(
+        f"Сообщений: {stats.messages} (пропущено {stats.skipped}), отчётов: {stats.reports}, "
+        f"пользователей: {stats.users} | уровни: {stats.tiers}"
+    )
+
+    if args.dry_run:
+        logger.info("Пробный запуск — хранилище не изменено")
+        return
+
+    # Одна запись на весь импорт, а не save на каждое сообщение
+    if isinstance(storage, SqliteStorage):
+        storage.write_users(updated)
+    else:
+        users.update(updated)
+        storage.save(config, users)
+
+    rollups = storage.open_rollups()
+    if args.reset:
+        rollups.reset()
+    rollups.record_many(stats.deltas)
+    logger.info(f"Импорт сохранён в {args.data}")
+
+
+if __name__ == "__main__":
+    main()
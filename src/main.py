@@ -1,136 +1,247 @@
-import asyncio
-import os
-
-import logging
-from aiogram import Bot, Dispatcher
-from aiogram.client.default import DefaultBotProperties
-from aiogram.enums import ParseMode
-from aiogram.filters import Command
-from aiogram.types import Message, ChatMemberUpdated, BotCommand
-from dotenv import load_dotenv
-
-from bot import BotService
-from config import settings
-from scheduler.reminder import schedule_reminders
-from services.openai_service import OpenAIClient
-from services.data_service import Storage
-from services.user_repository import UserRepository
-from utils.logger import setup_logger, get_named_logger, LogMode
-
-setup_logger(mode=LogMode.NAMED, level=logging.INFO)
-logging = get_named_logger()
-
-# Загрузка переменных окружения
-load_dotenv()
-TELEGRAM_TOKEN = settings.TELEGRAM_TOKEN
-OPENAI_KEY = settings.OPENAI_API_KEY
-
-if not TELEGRAM_TOKEN:
-    raise RuntimeError("TELEGRAM_BOT_TOKEN не задан")
-
-# Telegram Bot
-bot = Bot(
-    token=TELEGRAM_TOKEN,
-    default=DefaultBotProperties(parse_mode=ParseMode.HTML)
-)
-dp = Dispatcher()
-
-# Загрузка данных
-storage = Storage(settings.DATA_PATH)
-loaded = storage.load()
-config = loaded["config"]
-users = UserRepository(loaded["user_data"])
-
-# Если конфиг повреждён — заменим на дефолт из settings
-if not isinstance(config, BotService.__init__.__annotations__["config"]):
-    logger.warning("Конфиг повреждён или пуст. Используется дефолтный из settings.")
-    config = settings.to_bot_config()
-
-# Инициализация OpenAI
-openai_client = None
-if OPENAI_KEY:
-    try:
-        openai_client = OpenAIClient(api_key=OPENAI_KEY)
-        logger.info("OpenAI подключен")
-    except Exception as e:
-        logger.warning(f"OpenAI не доступен: {e}")
-
-# Инициализация сервиса
-service = BotService(config, users, storage, openai_client)
-
-
-@dp.message(Command("start"))
-async def start_cmd(message: Message):
-    await message.answer("Привет! Отправь мне количество отжиманий или используй /help.")
-
-@dp.message(Command("help"))
-async def help_cmd(message: Message):
-    await message.answer(
-        "📋 Команды:\n"
-        "/mystats — ваша личная статистика\n"
-        "/stats — статистика всей группы\n"
-        "/changemydailystats N — изменить количество за сегодня\n"
-        "/setgroup — назначить эту группу основной\n"
-        "/config — показать текущую конфигурацию\n"
-        "/adminstats — статистика по группе (только для админов)\n\n"
-        "Пример отчёта: 25+25+25=75"
-    )
-
-@dp.message(Command("mystats"))
-async def mystats_cmd(message: Message):
-    await service.handle_mystats(message)
-
-@dp.message(Command("stats"))
-async def stats_cmd(message: Message):
-    await service.handle_stats(message)
-
-@dp.message(Command("changemydailystats"))
-async def change_stat_cmd(message: Message):
-    await service.handle_change_stat(message)
-
-@dp.message(Command("setgroup"))
-async def setgroup_cmd(message: Message):
-    await service.handle_setgroup(message, bot)
-
-@dp.message(Command("config"))
-async def config_cmd(message: Message):
-    await service.handle_config(message)
-
-@dp.message(Command("adminstats"))
-async def adminstats_cmd(message: Message):
-    await service.handle_adminstats(message, bot)
-
-
-
-@dp.chat_member()
-async def on_new_chat_member(event: ChatMemberUpdated):
-    if event.new_chat_member.status == "member":
-        fake_message = Message(
-            message_id=0,
-            date=event.date,
-            chat=event.chat,
-            from_user=event.new_chat_member.user,
-            message_thread_id=None,
-            text="",
-            new_chat_members=[event.new_chat_member.user],
+import time
+
+_PROCESS_STARTED = time.perf_counter()
+
+import asyncio  # noqa: E402
+import logging  # noqa: E402
+import os  # noqa: E402
+from dataclasses import dataclass  # noqa: E402
+from typing import Optional  # noqa: E402
+
+from aiogram import Bot, Dispatcher  # noqa: E402
+from aiogram.client.default import DefaultBotProperties  # noqa: E402
+from aiogram.enums import ParseMode  # noqa: E402
+from aiogram.filters import Command  # noqa: E402
+from aiogram.types import Message, ChatMemberUpdated, BotCommand  # noqa: E402
+
+from bot import BotService  # noqa: E402
+from config import Settings, get_settings  # noqa: E402
+from models.bot_models import BotConfig  # noqa: E402
+from scheduler.reminder import schedule_reminders  # noqa: E402
+from scheduler.rollover import DayRollover  # noqa: E402
+from services.backup import BackupManager  # noqa: E402
+from services.diagnostics import Diagnostics, LoopLagMonitor  # noqa: E402
+from services.openai_service import OpenAIClient  # noqa: E402
+from services.pushups_parser import PushupsParser  # noqa: E402
+from services.report_classifier import ReportClassifier  # noqa: E402
+from services.render_cache import RenderCache  # noqa: E402
+from services.message_filter import MessageFilter  # noqa: E402
+from services.openai_budget import OpenAIBudget  # noqa: E402
+from services.resilience import CircuitBreaker  # noqa: E402
+from services.response_cache import ResponseCache  # noqa: E402
+from services.shared_store import open_storage  # noqa: E402
+from services.throttling import RateLimiter, ThrottlingMiddleware  # noqa: E402
+from services.user_repository import UserRepository  # noqa: E402
+from utils.logger import setup_logger, get_named_logger, LogMode  # noqa: E402
+from utils.startup_timer import StartupTimer  # noqa: E402
+
+logger = get_named_logger()
+
+
+@dataclass
+class App:
+    settings: Settings
+    bot: Bot
+    dp: Dispatcher
+    storage: object
+    service: BotService
+    openai_client: Optional[OpenAIClient]
+    rate_limiter: RateLimiter
+    timer: StartupTimer
+    backups: Optional[BackupManager] = None
+
+
+def create_app(settings: Optional[Settings] = None, timer: Optional[StartupTimer] = None) -> App:
+    """
+    Собирает приложение: хранилище, клиенты, сервис и диспетчер с хендлерами.
+    Ничего не делает при импорте модуля — только при вызове.
+    """
+    timer = timer or StartupTimer()
+
+    with timer.phase("settings"):
+        settings = settings or get_settings()
+        if not settings.TELEGRAM_TOKEN:
+            raise RuntimeError("TELEGRAM_BOT_TOKEN не задан")
+
+    with timer.phase("storage"):
+        storage = open_storage(settings.DATA_PATH, lazy=settings.DATA_LAZY_LOAD)
+        loaded = storage.load()
+        config = loaded["config"]
+        users = UserRepository(loaded["user_data"])
+
+        # Если конфиг повреждён — заменим на дефолт из settings
+        if not isinstance(config, BotConfig):
+            logger.warning("Конфиг повреждён или пуст. Используется дефолтный из settings.")
+            config = settings.to_bot_config()
+
+    with timer.phase("openai"):
+        openai_client = _create_openai_client(settings)
+
+    with timer.phase("classifier"):
+        # Локальный классификатор отчётов (обучается офлайн: train_classifier.py)
+        classifier = None
+        if os.path.exists(settings.CLASSIFIER_MODEL_PATH):
+            try:
+                classifier = ReportClassifier.load(settings.CLASSIFIER_MODEL_PATH)
+            except Exception as e:
+                logger.warning(f"Классификатор отчётов не загружен: {e}")
+
+    with timer.phase("dispatcher"):
+        bot = Bot(
+            token=settings.TELEGRAM_TOKEN,
+            default=DefaultBotProperties(parse_mode=ParseMode.HTML)
+        )
+        dp = Dispatcher()
+
+        service = BotService(
+            config, users, storage, openai_client,
+            render_cache=RenderCache(cooldown=settings.STATS_COOLDOWN_SECONDS),
+            parser=PushupsParser(
+                openai_client,
+                classifier=classifier,
+                classifier_threshold=settings.CLASSIFIER_THRESHOLD,
+                corpus_path=settings.PARSER_CORPUS_PATH,
+            ),
+            prefilter=MessageFilter(max_length=settings.PREFILTER_MAX_LENGTH),
+            diagnostics=Diagnostics(LoopLagMonitor(stall_threshold=settings.LOOP_STALL_THRESHOLD_MS / 1000)),
+            rollups=storage.open_rollups(),
         )
-        await service.handle_welcome_new(fake_message)
 
+        dp.update.outer_middleware(service.diagnostics.update_middleware)
 
+        # Лимиты частоты: до хендлеров, в том числе для отредактированных сообщений
+        rate_limiter = RateLimiter(*settings.throttle_rules())
+        throttling = ThrottlingMiddleware(rate_limiter, render_cache=service.render_cache, prefilter=service.prefilter)
+        dp.message.middleware(throttling)
+        dp.edited_message.middleware(throttling)
+        service.diagnostics.register("лимиты", lambda: {"bucket'ов": len(rate_limiter), **rate_limiter.stats})
+        service.diagnostics.register("старт, мс", timer.as_dict)
 
-@dp.message()
-async def any_text(message: Message):
-    username = message.from_user.username or message.from_user.first_name
-    user_id = message.from_user.id
-    text = message.text or ""
+        backups = None
+        if settings.BACKUP_INTERVAL_SECONDS > 0:
+            backups = BackupManager(
+                storage,
+                settings.BACKUP_DIR,
+                interval=settings.BACKUP_INTERVAL_SECONDS,
+                full_every=settings.BACKUP_FULL_EVERY,
+                keep_full=settings.BACKUP_KEEP_FULL,
+            )
+            service.diagnostics.register("бэкапы", backups.status)
 
-    logger.debug(f"📩 Сообщение от @{username} ({user_id}): {text}")
+        register_handlers(dp, bot, service)
+
+    return App(settings, bot, dp, storage, service, openai_client, rate_limiter, timer, backups)
+
+
+def _create_openai_client(settings: Settings) -> Optional[OpenAIClient]:
+    if not settings.OPENAI_API_KEY:
+        return None
+    try:
+        openai_client = OpenAIClient(
+            api_key=settings.OPENAI_API_KEY,
+            model=settings.OPENAI_MODEL,
+            cache=ResponseCache(
+                path=settings.OPENAI_CACHE_PATH,
+                max_entries=settings.OPENAI_CACHE_SIZE,
+                ttl=settings.OPENAI_CACHE_TTL,
+            ),
+            deadline=settings.OPENAI_DEADLINE,
+            breaker=CircuitBreaker(
+                failure_threshold=settings.OPENAI_BREAKER_FAILURES,
+                reset_timeout=settings.OPENAI_BREAKER_RESET,
+            ),
+            budget=OpenAIBudget(
+                requests_per_minute=settings.OPENAI_RPM,
+                tokens_per_minute=settings.OPENAI_TPM,
+            ),
+        )
+        logger.info("OpenAI подключен")
+        return openai_client
+    except Exception as e:
+        logger.warning(f"OpenAI не доступен: {e}")
+        return None
+
+
+def register_handlers(dp: Dispatcher, bot: Bot, service: BotService) -> None:
+    @dp.message(Command("start"))
+    async def start_cmd(message: Message):
+        await message.answer("Привет! Отправь мне количество отжиманий или используй /help.")
+
+    @dp.message(Command("help"))
+    async def help_cmd(message: Message):
+        await message.answer(
+            "📋 Команды:\n"
+            "/mystats — ваша личная статистика\n"
+            "/stats — статистика всей группы\n"
+            "/stats week|month, /stats day N, /stats days A-B — топ за неделю, месяц, дни челленджа\n"
+            "/changemydailystats N — изменить количество за сегодня\n"
+            "/setgroup — назначить эту группу основной\n"
+            "/config — показать текущую конфигурацию\n"
+            "/config reminder|warning|kick ЧЧ:ММ, /config timezone Зона — изменить расписание чата\n"
+            "/adminstats — статистика по группе (только для админов)\n"
+            "/diag [mem on|off | profile сек] — диагностика процесса (только для админов)\n\n"
+            "Пример отчёта: 25+25+25=75"
+        )
 
-    if f"@{(await bot.get_me()).username}" in text:
-        logger.debug(f"🔔 Обнаружено упоминание бота в сообщении от @{username}")
-        await service.handle_mention(message)
-    else:
-        await service.handle_message(message)
+    @dp.message(Command("mystats"))
+    async def mystats_cmd(message: Message):
+        await service.handle_mystats(message)
+
+    @dp.message(Command("stats"))
+    async def stats_cmd(message: Message):
+        await service.handle_stats(message)
+
+    @dp.message(Command("changemydailystats"))
+    async def change_stat_cmd(message: Message):
+        await service.handle_change_stat(message)
+
+    @dp.message(Command("setgroup"))
+    async def setgroup_cmd(message: Message):
+        await service.handle_setgroup(message, bot)
+
+    @dp.message(Command("config"))
+    async def config_cmd(message: Message):
+        await service.handle_config(message, bot)
+
+    @dp.message(Command("adminstats"))
+    async def adminstats_cmd(message: Message):
+        await service.handle_adminstats(message, bot)
+
+    @dp.message(Command("diag"))
+    async def diag_cmd(message: Message):
+        await service.handle_diagnostics(message, bot)
+
+    @dp.chat_member()
+    async def on_new_chat_member(event: ChatMemberUpdated):
+        if event.new_chat_member.status == "member":
+            fake_message = Message(
+                message_id=0,
+                date=event.date,
+                chat=event.chat,
+                from_user=event.new_chat_member.user,
+                message_thread_id=None,
+                text="",
+                new_chat_members=[event.new_chat_member.user],
+            )
+            await service.handle_welcome_new(fake_message)
+
+    @dp.edited_message()
+    async def edited_text(message: Message):
+        await service.handle_edited_message(message)
+
+    @dp.message()
+    async def any_text(message: Message):
+        username = message.from_user.username or message.from_user.first_name
+        user_id = message.from_user.id
+        text = message.text or ""
+
+        logger.debug(f"📩 Сообщение от @{username} ({user_id}): {text}")
+
+        if f"@{(await bot.me()).username}" in text:
+            logger.debug(f"🔔 Обнаружено упоминание бота в сообщении от @{username}")
+            await service.handle_mention(message)
+        else:
+            await service.handle_message(message)
 
 
 async def register_bot_commands(bot_instance: Bot):
@@ -141,22 +252,52 @@ async def register_bot_commands(bot_instance: Bot):
         BotCommand(command="setgroup", description="Назначить эту группу основной"),
         BotCommand(command="config", description="Показать конфигурацию"),
         BotCommand(command="adminstats", description="Админ-статистика"),
+        BotCommand(command="diag", description="Диагностика бота"),
     ]
     await bot_instance.delete_my_commands()
     await bot_instance.set_my_commands(commands)
 
 
+async def run(app: App) -> None:
+    service = app.service
+    if not os.path.exists(app.settings.DATA_PATH):
+        app.storage.save(service.config, service.users.all())
 
-async def main():
-    if not os.path.exists(settings.DATA_PATH):
-        storage.save(config, users.users)
-
-    await register_bot_commands(bot)
+    with app.timer.phase("commands"):
+        await register_bot_commands(app.bot)
 
-    schedule_reminders(bot, service)
+    with app.timer.phase("scheduler"):
+        rollover = DayRollover(service)
+        rollover.start()
+        scheduler = schedule_reminders(app.bot, service)
+        service.diagnostics.lag_monitor.start()
+        if app.backups:
+            app.backups.start()
 
+    app.timer.report()
     logger.info("Бот запущен")
-    await dp.start_polling(bot)
+    try:
+        await app.dp.start_polling(app.bot)
+    finally:
+        await scheduler.stop()
+        await rollover.stop()
+        await service.diagnostics.lag_monitor.stop()
+        service.rollups.flush()
+        if app.backups:
+            await asyncio.to_thread(app.backups.stop)
+        if app.openai_client and app.openai_client.cache:
+            app.openai_client.cache.flush()
+
+
+def main() -> None:
+    timer = StartupTimer(started=_PROCESS_STARTED)
+    timer.record("imports", time.perf_counter() - _PROCESS_STARTED)
+
+    with timer.phase("logging"):
+        setup_logger(mode=LogMode.NAMED, level=logging.INFO)
+
+    asyncio.run(run(create_app(timer=timer)))
+
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    main()
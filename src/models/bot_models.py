@@ -1,7 +1,9 @@
-from typing import Optional, Tuple
-from pydantic import BaseModel, field_validator
-from datetime import datetime, date
+from dataclasses import dataclass, field, fields
+from typing import Dict, List, Optional, Tuple
+from pydantic import BaseModel, Field, field_validator
+from datetime import datetime, date, timedelta
 from enum import Enum
+from zoneinfo import ZoneInfo
 
 
 # Тип генерации комментария
@@ -11,6 +13,14 @@ class CommentContext(str, Enum):
     PERSONAL = "personal"
 
 
+# Класс приоритета запроса к OpenAI (по убыванию важности)
+class RequestPriority(str, Enum):
+    EXTRACTION = "extraction"
+    MENTION = "mention"
+    COMMENT = "comment"
+    DAILY_SUMMARY = "daily_summary"
+
+
 # Статус активности пользователя
 class ActivityStatus(str, Enum):
     ACTIVE = "active"
@@ -18,6 +28,67 @@ class ActivityStatus(str, Enum):
     INACTIVE = "inactive"
 
 
+# Состояние circuit breaker вокруг внешних API
+class BreakerState(str, Enum):
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+# Плановые задачи чата
+class ScheduledJob(str, Enum):
+    REMINDER = "reminder"
+    WARNING = "warning"
+    KICK = "kick"
+
+
+# Класс входящего запроса для лимитов частоты
+class ThrottleKind(str, Enum):
+    REPORT = "report"
+    STATS = "stats"
+    MENTION = "mention"
+
+
+def _check_time_format(v: str) -> str:
+    hours, minutes = map(int, v.split(":"))
+    if not (0 <= hours <= 23 and 0 <= minutes <= 59):
+        raise ValueError("Неверный формат времени")
+    return v
+
+
+# Расписание задач отдельного чата (время — локальное для timezone чата)
+class ChatSchedule(BaseModel):
+    timezone: Optional[str] = None  # None — локальное время сервера
+    reminder_time: str = "22:00"
+    warning_time: str = "20:00"
+    kick_time: str = "23:59"
+    last_runs: Dict[ScheduledJob, datetime] = Field(default_factory=dict)
+
+    @field_validator("reminder_time", "warning_time", "kick_time")
+    def check_time_format(v: str) -> str:
+        return _check_time_format(v)
+
+    @field_validator("timezone")
+    def check_timezone(v: Optional[str]) -> Optional[str]:
+        if v is not None:
+            try:
+                ZoneInfo(v)
+            except (KeyError, ValueError):  # ZoneInfoNotFoundError — подкласс KeyError
+                raise ValueError(f"Неизвестный часовой пояс: {v}")
+        return v
+
+    def tzinfo(self):
+        return ZoneInfo(self.timezone) if self.timezone else datetime.now().astimezone().tzinfo
+
+    def time_for(self, job: ScheduledJob) -> str:
+        match job:
+            case ScheduledJob.REMINDER:
+                return self.reminder_time
+            case ScheduledJob.WARNING:
+                return self.warning_time
+        return self.kick_time
+
+
 class BotConfig(BaseModel):
     chat_id: Optional[int] = None
     inactivity_days: int = 4
@@ -25,13 +96,14 @@ class BotConfig(BaseModel):
     warning_days: int = 2
     challenge_start_date: date
     challenge_end_date: date
+    chats: Dict[int, ChatSchedule] = Field(default_factory=dict)
+    # День, к которому относятся pushups_today/reported_today, и счётчик закрытых дней
+    counters_date: Optional[date] = None
+    day_epoch: int = 0
 
     @field_validator("reminder_time")
     def check_time_format(v: str) -> str:
-        hours, minutes = map(int, v.split(":"))
-        if not (0 <= hours <= 23 and 0 <= minutes <= 59):
-            raise ValueError("Неверный формат времени")
-        return v
+        return _check_time_format(v)
 
     @field_validator("warning_days")
     def check_warning_vs_inactive(v, info):
@@ -49,7 +121,83 @@ class BotConfig(BaseModel):
 
 
 
-# Информация о пользователе
+def _activity_status(
+    last_activity: Optional[datetime],
+    current_date: Optional[datetime],
+    inactivity_days: int,
+    warning_days: int
+) -> ActivityStatus:
+    current_date = current_date or datetime.now()
+    if not last_activity:
+        return ActivityStatus.INACTIVE
+    inactive_days_count = (current_date - last_activity).days
+    if inactive_days_count >= inactivity_days:
+        return ActivityStatus.INACTIVE
+    elif inactive_days_count >= warning_days:
+        return ActivityStatus.WARNING
+    return ActivityStatus.ACTIVE
+
+
+# Компактная запись пользователя в памяти.
+# Pydantic-валидация выполняется только на границе ввода-вывода (Storage через TypeAdapter),
+# запись атрибутов в горячем пути — обычный slot без накладных расходов BaseModel.
+@dataclass(slots=True)
+class UserRecord:
+    username: str
+    last_activity: Optional[datetime] = None
+    pushups_today: int = 0
+    reported_today: bool = False
+    last_report_date: Optional[date] = None
+    total_pushups: int = 0
+    # Группы, где пользователь отчитывался: предупреждения и исключения — только там
+    chat_ids: List[int] = field(default_factory=list)
+
+    def activity_status(
+        self,
+        current_date: Optional[datetime] = None,
+        inactivity_days: int = 4,
+        warning_days: int = 2
+    ) -> ActivityStatus:
+        return _activity_status(self.last_activity, current_date, inactivity_days, warning_days)
+
+    def member_of(self, chat_id: int, main_chat_id: Optional[int]) -> bool:
+        """Участник чата; записи, заведённые до учёта групп, относятся к основному чату"""
+        return chat_id in self.chat_ids if self.chat_ids else chat_id == main_chat_id
+
+    def join_chat(self, chat_id: int, main_chat_id: Optional[int]) -> None:
+        if chat_id in self.chat_ids:
+            return
+        if not self.chat_ids and main_chat_id is not None and self.last_report_date is not None:
+            # Отчитывался до учёта групп — значит, в основном чате
+            self.chat_ids.append(main_chat_id)
+        if chat_id not in self.chat_ids:
+            self.chat_ids.append(chat_id)
+
+    def reported_on(self, day: date) -> bool:
+        """Дневной счётчик относится к дню day (единственное определение «отчитался сегодня»)"""
+        return self.last_report_date == day
+
+    def apply_report(self, pushups: int, is_total: bool, day: date) -> int:
+        """
+        Учитывает отчёт за день day: первый отчёт дня задаёт значение,
+        итог за день заменяет его, остальные добавляются. Возвращает изменение total.
+        """
+        if not self.reported_on(day):
+            delta = pushups
+            self.pushups_today = pushups
+            self.reported_today = True
+            self.last_report_date = day
+        elif is_total:
+            delta = pushups - self.pushups_today
+            self.pushups_today = pushups
+        else:
+            delta = pushups
+            self.pushups_today += pushups
+        self.total_pushups += delta
+        return delta
+
+
+# Информация о пользователе (схема хранилища и внешних инструментов)
 class UserInfo(BaseModel):
     username: str
     last_activity: Optional[datetime] = None
@@ -57,6 +205,7 @@ class UserInfo(BaseModel):
     reported_today: bool = False
     last_report_date: Optional[date] = None
     total_pushups: int = 0
+    chat_ids: List[int] = Field(default_factory=list)
 
     def activity_status(
         self,
@@ -64,15 +213,14 @@ class UserInfo(BaseModel):
         inactivity_days: int = 4,
         warning_days: int = 2
     ) -> ActivityStatus:
-        current_date = current_date or datetime.now()
-        if not self.last_activity:
-            return ActivityStatus.INACTIVE
-        inactive_days_count = (current_date - self.last_activity).days
-        if inactive_days_count >= inactivity_days:
-            return ActivityStatus.INACTIVE
-        elif inactive_days_count >= warning_days:
-            return ActivityStatus.WARNING
-        return ActivityStatus.ACTIVE
+        return _activity_status(self.last_activity, current_date, inactivity_days, warning_days)
+
+    @classmethod
+    def from_record(cls, record: UserRecord) -> "UserInfo":
+        return cls.model_construct(**{f.name: getattr(record, f.name) for f in fields(UserRecord)})
+
+    def to_record(self) -> UserRecord:
+        return UserRecord(**{f.name: getattr(self, f.name) for f in fields(UserRecord)})
 
 
 # Период челленджа
@@ -90,3 +238,12 @@ class ChallengePeriod(BaseModel):
         current_day = (today - self.start_date).days + 1
         days_remaining = (self.end_date - today).days
         return current_day, days_remaining
+
+    @property
+    def length(self) -> int:
+        """Число дней челленджа, включая первый и последний"""
+        return (self.end_date - self.start_date).days + 1
+
+    def day_date(self, day: int) -> date:
+        """Дата дня челленджа с номером day (с 1)"""
+        return self.start_date + timedelta(days=day - 1)
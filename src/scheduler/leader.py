@@ -0,0 +1,87 @@
+import asyncio
+import time
+from typing import Awaitable, Callable, Optional
+
+from services.shared_store import SqliteStorage
+from utils.logger import get_named_logger
+
+logger = get_named_logger()
+
+SCHEDULER_LEASE = "scheduler"
+
+
+class LeaderElector:
+    """
+    Выбор лидера среди воркеров через аренду в общем хранилище.
+
+    Аренда продлевается каждые ttl/3 секунд. Лидер, который не смог продлить её
+    до истечения, сам слагает полномочия; остальные подхватывают истёкшую аренду.
+    """
+
+    def __init__(
+        self,
+        store: SqliteStorage,
+        owner: str,
+        on_elected: Callable[[], Awaitable[None]],
+        on_demoted: Callable[[], Awaitable[None]],
+        ttl: float = 30.0,
+        name: str = SCHEDULER_LEASE,
+    ):
+        self.store = store
+        self.owner = owner
+        self.on_elected = on_elected
+        self.on_demoted = on_demoted
+        self.ttl = ttl
+        self.name = name
+        self._leader = False
+        self._expires_at = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def is_leader(self) -> bool:
+        """Лидер, пока аренда заведомо не истекла (с запасом на продление)"""
+        return self._leader and time.monotonic() < self._expires_at
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run(), name=f"lease_{self.name}")
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._leader:
+            await self._demote()
+            # Освобождаем аренду сразу — преемнику не нужно ждать ttl
+            self.store.release_lease(self.name, self.owner)
+
+    async def _run(self) -> None:
+        while True:
+            attempt_started = time.monotonic()
+            unreachable = False
+            try:
+                acquired = self.store.try_acquire_lease(self.name, self.owner, self.ttl)
+            except Exception as e:
+                logger.warning(f"Не удалось продлить аренду {self.name}: {e}")
+                acquired, unreachable = False, True
+
+            if acquired:
+                # Считаем от начала попытки: так локальный срок не переживёт записанный в базе
+                self._expires_at = attempt_started + self.ttl
+                if not self._leader:
+                    self._leader = True
+                    logger.info(f"{self.owner} стал лидером ({self.name})")
+                    await self.on_elected()
+            elif self._leader and (not unreachable or not self.is_leader):
+                # Аренду забрал другой воркер — или база недоступна дольше срока аренды
+                await self._demote()
+
+            await asyncio.sleep(self.ttl / 3)
+
+    async def _demote(self) -> None:
+        self._leader = False
+        logger.warning(f"{self.owner} больше не лидер ({self.name})")
+        await self.on_demoted()
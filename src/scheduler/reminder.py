@@ -1,60 +1,56 @@
-from apscheduler.schedulers.asyncio import AsyncIOScheduler
-from apscheduler.triggers.cron import CronTrigger
 import datetime
+from typing import Callable, Iterator, Optional, Tuple
+
 from aiogram import Bot
 
 from bot import BotService
-from models.bot_models import ActivityStatus
+from models.bot_models import ActivityStatus, ChatSchedule, ScheduledJob, UserRecord
+from scheduler.timer import ChatTimerScheduler
 from utils.logger import get_named_logger
 
 logger = get_named_logger()
-scheduler = AsyncIOScheduler()
 
 
-def schedule_reminders(bot: Bot, service: BotService) -> None:
+def schedule_reminders(
+    bot: Bot, service: BotService, fence: Optional[Callable[[], bool]] = None
+) -> ChatTimerScheduler:
     """
-    Планирует ежедневное напоминание и проверку неактивности.
+    Планирует ежедневное напоминание, предупреждения и проверку неактивности
+    для всех чатов — по их часовым поясам, на одном таймере.
+    fence — проверка лидерства в многопроцессном режиме.
     """
-    reminder_time = service.config.reminder_time  # формат HH:MM
-    hour, minute = map(int, reminder_time.split(":"))
-
-    scheduler.add_job(
-        send_daily_reminder,
-        CronTrigger(hour=hour, minute=minute),
-        args=[bot, service],
-        name="daily_reminder",
-        replace_existing=True,
-    )
-
-    scheduler.add_job(
-        check_inactive_users,
-        CronTrigger(hour=23, minute=59),
-        args=[bot, service],
-        name="kick_inactive_users",
-        replace_existing=True,
+    config = service.config
+    if config.chat_id and config.chat_id not in config.chats:
+        # Основной чат из старого конфига: переносим глобальное время напоминания
+        config.chats[config.chat_id] = ChatSchedule(reminder_time=config.reminder_time)
+
+    scheduler = ChatTimerScheduler(
+        bot,
+        service,
+        handlers={
+            ScheduledJob.REMINDER: send_daily_reminder,
+            ScheduledJob.WARNING: check_inactivity_warnings,
+            ScheduledJob.KICK: check_inactive_users,
+        },
+        fence=fence,
     )
+    scheduler.start()
+    return scheduler
 
-    scheduler.add_job(
-        check_inactivity_warnings,
-        CronTrigger(hour=20, minute=0),
-        args=[bot, service],
-        name="warn_inactive_users",
-        replace_existing=True,
-    )
 
-    scheduler.start()
-    logger.info(
-        f"Планировщик активирован: напоминание в {reminder_time}, "
-        f"предупреждение в 20:00, удаление в 23:59"
-    )
+def _chat_members(service: BotService, chat_id: int) -> Iterator[Tuple[int, UserRecord]]:
+    """Пользователи, отчитывавшиеся в чате chat_id"""
+    main_chat_id = service.config.chat_id
+    return ((uid, u) for uid, u in service.users.all().items() if u.member_of(chat_id, main_chat_id))
 
 
-async def send_daily_reminder(bot: Bot, service: BotService) -> None:
-    chat_id = service.config.chat_id
+async def send_daily_reminder(bot: Bot, service: BotService, chat_id: Optional[int] = None) -> None:
+    chat_id = chat_id or service.config.chat_id
     if not chat_id:
         logger.warning("chat_id не задан — напоминание не отправлено")
         return
 
+    service.ensure_day(datetime.date.today())
     total_today = service.users.total_pushups_today()
     current_day, days_remaining = service.period.get_day_info()
 
@@ -75,25 +71,24 @@ async def send_daily_reminder(bot: Bot, service: BotService) -> None:
         logger.error(f"Ошибка при отправке напоминания: {e}")
 
 
-async def check_inactive_users(bot: Bot, service: BotService) -> None:
-    chat_id = service.config.chat_id
+async def check_inactive_users(bot: Bot, service: BotService, chat_id: Optional[int] = None) -> None:
+    chat_id = chat_id or service.config.chat_id
     if not chat_id:
         logger.warning("chat_id не задан — пропуск удаления неактивных")
         return
 
     now = datetime.datetime.now()
-    to_remove = []
-
-    for user_id, user in service.users.all().items():
-        status = user.activity_status(
+    to_remove = [
+        (user_id, user) for user_id, user in _chat_members(service, chat_id)
+        if user.activity_status(
             current_date=now,
             inactivity_days=service.config.inactivity_days,
             warning_days=service.config.warning_days
-        )
-        if status == ActivityStatus.INACTIVE:
-            to_remove.append((user_id, user.username))
+        ) == ActivityStatus.INACTIVE
+    ]
 
-    for user_id, username in to_remove:
+    for user_id, user in to_remove:
+        username = user.username
         try:
             await bot.ban_chat_member(chat_id, user_id)
             await bot.unban_chat_member(chat_id, user_id)
@@ -101,8 +96,14 @@ async def check_inactive_users(bot: Bot, service: BotService) -> None:
                 chat_id,
                 text=f"⛔ @{username} исключён из группы за неактивность."
             )
-            service.users.remove(user_id)
-            logger.info(f"Удалён @{username} ({user_id}) за неактивность")
+            if chat_id in user.chat_ids:
+                user.chat_ids.remove(chat_id)
+            if user.chat_ids:
+                # Состоит в других группах — исключаем только из этой
+                service.users.add_or_update(user_id, user)
+            else:
+                service.users.remove(user_id)
+            logger.info(f"Удалён @{username} ({user_id}) из чата {chat_id} за неактивность")
         except Exception as e:
             logger.error(f"Ошибка удаления @{username}: {e}")
 
@@ -111,8 +112,8 @@ async def check_inactive_users(bot: Bot, service: BotService) -> None:
         logger.info(f"Сохранено после удаления {len(to_remove)} пользователей")
 
 
-async def check_inactivity_warnings(bot: Bot, service: BotService) -> None:
-    chat_id = service.config.chat_id
+async def check_inactivity_warnings(bot: Bot, service: BotService, chat_id: Optional[int] = None) -> None:
+    chat_id = chat_id or service.config.chat_id
     if not chat_id:
         logger.warning("chat_id не задан — пропуск предупреждений о неактивности")
         return
@@ -120,7 +121,7 @@ async def check_inactivity_warnings(bot: Bot, service: BotService) -> None:
     now = datetime.datetime.now()
     warning_list = []
 
-    for user_id, user in service.users.all().items():
+    for user_id, user in _chat_members(service, chat_id):
         status = user.activity_status(
             current_date=now,
             inactivity_days=service.config.inactivity_days,
@@ -0,0 +1,52 @@
+import asyncio
+import datetime
+from typing import Callable, Optional
+
+from bot import BotService
+from utils.logger import get_named_logger
+
+logger = get_named_logger()
+
+# Верхняя граница сна: страхует от скачков системных часов
+_MAX_SLEEP = 60.0
+
+
+class DayRollover:
+    """
+    Закрывает день в полночь по времени сервера (BotService.rollover).
+    При старте сразу догоняет дни, пропущенные за время простоя.
+    fence — проверка лидерства в многопроцессном режиме.
+    """
+
+    def __init__(self, service: BotService, fence: Optional[Callable[[], bool]] = None):
+        self.service = service
+        self.fence = fence
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        self._tick()
+        self._task = asyncio.create_task(self._run(), name="day_rollover")
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def _tick(self) -> None:
+        if self.fence is not None and not self.fence():
+            return
+        try:
+            self.service.rollover()
+        except Exception as e:
+            logger.error(f"Ошибка закрытия дня: {e}")
+
+    async def _run(self) -> None:
+        while True:
+            now = datetime.datetime.now()
+            midnight = datetime.datetime.combine(now.date() + datetime.timedelta(days=1), datetime.time())
+            await asyncio.sleep(min(_MAX_SLEEP, max(0.0, (midnight - now).total_seconds())))
+            self._tick()
@@ -0,0 +1,173 @@
+import asyncio
+import datetime
+import heapq
+import itertools
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from aiogram import Bot
+
+from bot import BotService
+from models.bot_models import ChatSchedule, ScheduledJob
+from utils.logger import get_named_logger
+
+logger = get_named_logger()
+
+JobHandler = Callable[[Bot, BotService, int], Awaitable[None]]
+
+# Насколько поздно ещё имеет смысл догнать пропущенный запуск после простоя
+DEFAULT_MISFIRE_GRACE = {
+    ScheduledJob.REMINDER: datetime.timedelta(hours=2),
+    ScheduledJob.WARNING: datetime.timedelta(hours=2),
+    ScheduledJob.KICK: datetime.timedelta(hours=1),
+}
+
+# Верхняя граница сна: страхует от скачков системных часов
+_MAX_SLEEP = 60.0
+
+
+def _due_on(schedule: ChatSchedule, job: ScheduledJob, day: datetime.date) -> datetime.datetime:
+    hour, minute = map(int, schedule.time_for(job).split(":"))
+    return datetime.datetime.combine(day, datetime.time(hour, minute), tzinfo=schedule.tzinfo())
+
+
+def next_due(schedule: ChatSchedule, job: ScheduledJob, after: datetime.datetime) -> datetime.datetime:
+    """Ближайший запуск строго после after (aware) по местному времени чата"""
+    local_day = after.astimezone(schedule.tzinfo()).date()
+    due = _due_on(schedule, job, local_day)
+    if due <= after:
+        due = _due_on(schedule, job, local_day + datetime.timedelta(days=1))
+    return due
+
+
+def previous_due(schedule: ChatSchedule, job: ScheduledJob, before: datetime.datetime) -> datetime.datetime:
+    """Последний плановый запуск не позже before"""
+    local_day = before.astimezone(schedule.tzinfo()).date()
+    due = _due_on(schedule, job, local_day)
+    if due > before:
+        due = _due_on(schedule, job, local_day - datetime.timedelta(days=1))
+    return due
+
+
+class ChatTimerScheduler:
+    """
+    Все плановые задачи всех чатов в одной куче (due, seq, chat_id, job),
+    которую обслуживает одна asyncio-задача.
+
+    Перепланирование при смене /config — ленивое: у пары (чат, задача) растёт
+    поколение, устаревшие элементы кучи отбрасываются при извлечении.
+    """
+
+    def __init__(
+        self,
+        bot: Bot,
+        service: BotService,
+        handlers: Dict[ScheduledJob, JobHandler],
+        misfire_grace: Optional[Dict[ScheduledJob, datetime.timedelta]] = None,
+        fence: Optional[Callable[[], bool]] = None,
+    ):
+        self.bot = bot
+        self.service = service
+        self.handlers = handlers
+        self.misfire_grace = misfire_grace or DEFAULT_MISFIRE_GRACE
+        # Проверка лидерства перед запуском: бывший лидер не должен дублировать задачи
+        self.fence = fence
+        self._heap: List[Tuple[datetime.datetime, int, int, ScheduledJob, int]] = []
+        self._generations: Dict[Tuple[int, ScheduledJob], int] = {}
+        self._seq = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    @staticmethod
+    def _now() -> datetime.datetime:
+        return datetime.datetime.now(datetime.timezone.utc)
+
+    def start(self) -> None:
+        now = self._now()
+        for chat_id in list(self.service.config.chats):
+            self._catch_up(chat_id, now)
+            self.reschedule(chat_id)
+        self.service.schedule_listeners.append(self.reschedule)
+        self._task = asyncio.create_task(self._run(), name="chat_timer_scheduler")
+        logger.info(f"Планировщик запущен: {len(self.service.config.chats)} чатов, {len(self._heap)} задач в очереди")
+
+    async def stop(self) -> None:
+        if self.reschedule in self.service.schedule_listeners:
+            self.service.schedule_listeners.remove(self.reschedule)
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def reschedule(self, chat_id: int) -> None:
+        """Пересчитывает задачи чата по текущему расписанию (или снимает, если чата больше нет)"""
+        schedule = self.service.config.chats.get(chat_id)
+        now = self._now()
+        for job in self.handlers:
+            key = (chat_id, job)
+            generation = self._generations.get(key, 0) + 1
+            self._generations[key] = generation
+            if schedule is not None:
+                heapq.heappush(self._heap, (next_due(schedule, job, now), next(self._seq), chat_id, job, generation))
+        self._wakeup.set()
+        logger.debug(f"Расписание чата {chat_id} пересчитано")
+
+    def pending(self) -> int:
+        return len(self._heap)
+
+    def _catch_up(self, chat_id: int, now: datetime.datetime) -> None:
+        """Догоняет запуски, пропущенные за время простоя, если они ещё в пределах grace"""
+        schedule = self.service.config.chats[chat_id]
+        for job in self.handlers:
+            last_run = schedule.last_runs.get(job)
+            if last_run is None:
+                continue
+            due = previous_due(schedule, job, now)
+            if last_run.astimezone(datetime.timezone.utc) < due and now - due <= self.misfire_grace[job]:
+                logger.info(f"Догоняем пропущенный запуск {job.value} для чата {chat_id} (план: {due})")
+                heapq.heappush(self._heap, (now, next(self._seq), chat_id, job, self._generations.get((chat_id, job), 0) + 1))
+
+    async def _run(self) -> None:
+        while True:
+            now = self._now()
+            while self._heap and self._heap[0][0] <= now:
+                due, _, chat_id, job, generation = heapq.heappop(self._heap)
+                if generation < self._generations.get((chat_id, job), 0):
+                    continue
+                await self._fire(chat_id, job, due)
+
+            self._wakeup.clear()
+            timeout = _MAX_SLEEP
+            if self._heap:
+                timeout = min(_MAX_SLEEP, max(0.0, (self._heap[0][0] - self._now()).total_seconds()))
+            # Спим до ближайшего срока или до перепланирования (без wait_for — он глотает cancel)
+            timer = asyncio.get_running_loop().call_later(timeout, self._wakeup.set)
+            try:
+                await self._wakeup.wait()
+            finally:
+                timer.cancel()
+
+    async def _fire(self, chat_id: int, job: ScheduledJob, due: datetime.datetime) -> None:
+        schedule = self.service.config.chats.get(chat_id)
+        if schedule is None:
+            return
+        if self.fence is not None and not self.fence():
+            logger.warning(f"Задача {job.value} для чата {chat_id} пропущена: аренда лидера потеряна")
+            return
+
+        logger.info(f"Задача {job.value} для чата {chat_id} (план: {due})")
+        try:
+            await self.handlers[job](self.bot, self.service, chat_id)
+        except Exception as e:
+            logger.error(f"Ошибка задачи {job.value} для чата {chat_id}: {e}")
+
+        now = self._now()
+        schedule.last_runs[job] = now
+        self.service.storage.save(self.service.config, self.service.users.all())
+
+        # Новое поколение вытесняет дубликаты (например, догнанный запуск + плановый)
+        generation = self._generations.get((chat_id, job), 0) + 1
+        self._generations[(chat_id, job)] = generation
+        heapq.heappush(self._heap, (next_due(schedule, job, now), next(self._seq), chat_id, job, generation))
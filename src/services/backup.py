@@ -0,0 +1,335 @@
+import datetime
+import gzip
+import hashlib
+import io
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+
+from utils.logger import get_named_logger
+
+logger = get_named_logger()
+
+FULL = "full"
+DELTA = "delta"
+
+_dumps = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"), sort_keys=True).encode
+
+# Ключ записи копии: user_id пользователя или период сводок ("d:2026-03-10")
+Key = Union[int, str]
+
+
+def _zstd():
+    """Модуль zstandard, если установлен — иначе снимки сжимаются gzip"""
+    try:
+        import zstandard
+    except ImportError:
+        return None
+    return zstandard
+
+
+def _open_write(path: str):
+    if path.endswith(".zst"):
+        return io.TextIOWrapper(_zstd().ZstdCompressor(level=10).stream_writer(open(path, "wb")), encoding="utf-8")
+    return gzip.open(path, "wt", encoding="utf-8", compresslevel=6)
+
+
+def _open_read(path: str):
+    if path.endswith(".zst"):
+        zstandard = _zstd()
+        if zstandard is None:
+            raise RuntimeError(f"{path}: для чтения нужен пакет zstandard")
+        return io.TextIOWrapper(zstandard.ZstdDecompressor().stream_reader(open(path, "rb")), encoding="utf-8")
+    return gzip.open(path, "rt", encoding="utf-8")
+
+
+def _body_hash(body: str) -> bytes:
+    return hashlib.blake2b(body.encode("utf-8"), digest_size=8).digest()
+
+
+@dataclass
+class BackupFile:
+    path: str
+    kind: str
+    created: str
+
+
+@dataclass
+class BackupState:
+    """
+    Состояние данных на момент резервной копии: конфиг, тела записей пользователей
+    и сводки по периодам ({период: тело {user_id: количество}}).
+    """
+    config: dict = field(default_factory=dict)
+    users: Dict[int, str] = field(default_factory=dict)
+    rollups: Dict[str, str] = field(default_factory=dict)
+    rollups_closed_until: Optional[str] = None
+
+
+def _sort_key(item: Tuple[Key, Optional[str]]) -> Tuple[bool, Key]:
+    # Сначала пользователи по id, затем периоды сводок
+    return isinstance(item[0], str), item[0]
+
+
+def read_backup(path: str) -> Tuple[dict, List[Tuple[Key, Optional[str]]]]:
+    """
+    Читает файл копии и проверяет контрольную сумму.
+    Возвращает заголовок и записи [(user_id или период, тело или None — удалён)].
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    records: List[Tuple[Key, Optional[str]]] = []
+    trailer = None
+    with _open_read(path) as f:
+        header = json.loads(f.readline())
+        for line in f:
+            if line.startswith("{"):
+                trailer = json.loads(line)
+                break
+            digest.update(line.encode("utf-8"))
+            key, body = json.loads(line)
+            records.append((key if isinstance(key, str) else int(key), None if body is None else _dumps(body)))
+    if trailer is None:
+        raise ValueError("файл обрезан (нет завершающей записи)")
+    if trailer.get("records") != len(records) or trailer.get("digest") != digest.hexdigest():
+        raise ValueError("контрольная сумма не совпадает")
+    return header, records
+
+
+class BackupManager:
+    """
+    Резервные копии хранилища: сжатые полные снимки и инкрементальные дельты между ними.
+
+    Цепочка — полный снимок и до full_every дельт (изменённые и удалённые записи
+    пользователей и периоды сводок относительно предыдущей копии); хранится
+    keep_full последних цепочек. Работает в отдельном потоке по расписанию и
+    читает данные так же, как офлайн-инструменты (Storage.iter_raw_users,
+    open_rollups): JSON-файл заменяется атомарно, SQLite в режиме WAL читается
+    без блокировки писателей — горячий путь сохранения не ждёт резервного
+    копирования. Если маркер изменений хранилища (change_marker) с прошлой копии
+    не сдвинулся, данные не читаются вовсе.
+    """
+
+    def __init__(
+        self,
+        storage,
+        backup_dir: str,
+        interval: float = 3600.0,
+        full_every: int = 24,
+        keep_full: int = 7,
+    ):
+        self.storage = storage
+        self.backup_dir = backup_dir
+        self.interval = interval
+        self.full_every = full_every
+        self.keep_full = keep_full
+        self.prefix = os.path.basename(storage.path).split(".", 1)[0]
+        self.suffix = ".ndjson.zst" if _zstd() is not None else ".ndjson.gz"
+        self._hashes: Optional[Dict[Key, bytes]] = None  # состояние последней копии
+        self._header: Optional[dict] = None
+        self._marker = None
+        self._chain_length = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.stats: Dict[str, object] = {"full": 0, "delta": 0, "skipped": 0, "errors": 0}
+
+    # --- фоновый поток ---
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="backup", daemon=True)
+        self._thread.start()
+        logger.info(f"Резервное копирование: каждые {self.interval:.0f} с в {self.backup_dir}")
+
+    def stop(self) -> None:
+        """Останавливает поток, дождавшись текущей копии (из asyncio — через to_thread)"""
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                self.stats["errors"] += 1
+                logger.error(f"Ошибка резервного копирования: {e}")
+            if self._stop.wait(self.interval):
+                break
+
+    # --- копирование ---
+
+    def run_once(self) -> Optional[str]:
+        """Делает полный снимок или дельту; None — данные не менялись с прошлой копии"""
+        with self._lock:
+            if self._hashes is None:
+                self._resume()
+
+            marker = self.storage.change_marker()
+            if self._hashes is not None and marker == self._marker:
+                self.stats["skipped"] += 1
+                return None
+
+            raw: Dict = {}
+            entries: Dict[Key, str] = {uid: _dumps(info) for uid, info in self.storage.iter_raw_users(raw)}
+            closed_until, periods = self.storage.open_rollups().dump()
+            entries.update((key, _dumps(counts)) for key, counts in periods.items())
+            header = {
+                "config": raw.get("config", {}),
+                "rollups_closed_until": closed_until.isoformat() if closed_until else None,
+            }
+
+            if self._hashes is None or self._chain_length >= self.full_every:
+                path = self._write(FULL, header, sorted(entries.items(), key=_sort_key))
+                self._chain_length = 0
+                self._rotate()
+            else:
+                changed: List[Tuple[Key, Optional[str]]] = [
+                    (key, body) for key, body in entries.items()
+                    if self._hashes.get(key) != _body_hash(body)
+                ]
+                changed.extend((key, None) for key in self._hashes.keys() - entries.keys())
+                if not changed and header == self._header:
+                    self._marker = marker
+                    self.stats["skipped"] += 1
+                    return None
+                path = self._write(DELTA, header, sorted(changed, key=_sort_key))
+                self._chain_length += 1
+
+            self._hashes = {key: _body_hash(body) for key, body in entries.items()}
+            self._header = header
+            self._marker = marker
+            return path
+
+    def _write(self, kind: str, header: dict, records: List[Tuple[Key, Optional[str]]]) -> str:
+        os.makedirs(self.backup_dir, exist_ok=True)
+        created = datetime.datetime.now()
+        name = f"{self.prefix}-{created:%Y%m%d-%H%M%S-%f}-{kind}{self.suffix}"
+        path = os.path.join(self.backup_dir, name)
+        tmp_path = f"{path}.tmp"
+
+        started = time.perf_counter()
+        digest = hashlib.blake2b(digest_size=16)
+        with _open_write(tmp_path) as f:
+            f.write(_dumps({"kind": kind, "created": created.isoformat(), "source": self.storage.path, **header}))
+            f.write("\n")
+            for key, body in records:
+                line = f"[{_dumps(key)},{'null' if body is None else body}]\n"
+                digest.update(line.encode("utf-8"))
+                f.write(line)
+            f.write(_dumps({"records": len(records), "digest": digest.hexdigest()}))
+            f.write("\n")
+        os.replace(tmp_path, path)
+
+        self.stats[kind] += 1
+        self.stats["last"] = created.isoformat(timespec="seconds")
+        logger.info(
+            f"Резервная копия {name}: {len(records)} записей, {os.path.getsize(path)} байт "
+            f"за {(time.perf_counter() - started) * 1000:.0f} мс"
+        )
+        return path
+
+    def _resume(self) -> None:
+        """Восстанавливает состояние последней цепочки, чтобы продолжить её дельтами"""
+        chain = self.latest_chain()
+        if not chain:
+            return
+        try:
+            state = self.replay(chain)
+        except Exception as e:
+            logger.warning(f"Последняя цепочка копий не читается ({e}) — начнём новую полным снимком")
+            return
+        self._hashes = {uid: _body_hash(body) for uid, body in state.users.items()}
+        self._hashes.update((key, _body_hash(body)) for key, body in state.rollups.items())
+        self._header = {"config": state.config, "rollups_closed_until": state.rollups_closed_until}
+        self._chain_length = len(chain) - 1
+
+    def _rotate(self) -> None:
+        chains = self.chains()
+        for chain in chains[:-self.keep_full]:
+            for backup in chain:
+                os.remove(backup.path)
+            logger.info(f"Удалена старая цепочка копий: {os.path.basename(chain[0].path)} (+{len(chain) - 1} дельт)")
+
+    # --- чтение ---
+
+    def files(self) -> List[BackupFile]:
+        if not os.path.isdir(self.backup_dir):
+            return []
+        files = []
+        for name in sorted(os.listdir(self.backup_dir)):
+            if not name.startswith(f"{self.prefix}-") or name.endswith(".tmp"):
+                continue
+            stem = name.split(".", 1)[0]
+            parts = stem[len(self.prefix) + 1:].rsplit("-", 1)
+            if len(parts) == 2 and parts[1] in (FULL, DELTA):
+                files.append(BackupFile(os.path.join(self.backup_dir, name), parts[1], parts[0]))
+        return files
+
+    def chains(self) -> List[List[BackupFile]]:
+        """Цепочки [полный снимок, дельты…]; дельты без снимка в начале отбрасываются"""
+        chains: List[List[BackupFile]] = []
+        for backup in self.files():
+            if backup.kind == FULL:
+                chains.append([backup])
+            elif chains:
+                chains[-1].append(backup)
+        return chains
+
+    def latest_chain(self) -> List[BackupFile]:
+        chains = self.chains()
+        return chains[-1] if chains else []
+
+    def chain_until(self, name: Optional[str] = None) -> List[BackupFile]:
+        """Цепочка до копии name включительно (по умолчанию — до самой свежей)"""
+        if name is None:
+            return self.latest_chain()
+        for chain in self.chains():
+            for i, backup in enumerate(chain):
+                if os.path.basename(backup.path) == name:
+                    return chain[:i + 1]
+        raise FileNotFoundError(f"Копия {name} не найдена в {self.backup_dir}")
+
+    @staticmethod
+    def replay(chain: List[BackupFile]) -> BackupState:
+        state = BackupState()
+        for backup in chain:
+            try:
+                header, records = read_backup(backup.path)
+            except ValueError as e:
+                raise ValueError(f"{os.path.basename(backup.path)}: {e}") from e
+            state.config = header.get("config", state.config)
+            state.rollups_closed_until = header.get("rollups_closed_until", state.rollups_closed_until)
+            for key, body in records:
+                target = state.rollups if isinstance(key, str) else state.users
+                if body is None:
+                    target.pop(key, None)
+                else:
+                    target[key] = body
+        return state
+
+    def verify(self) -> Iterator[Tuple[BackupFile, Optional[str]]]:
+        """Проверяет каждый файл: (копия, None) или (копия, описание ошибки)"""
+        seen_full = False
+        for backup in self.files():
+            if backup.kind == FULL:
+                seen_full = True
+            elif not seen_full:
+                yield backup, "дельта без полного снимка"
+                continue
+            try:
+                read_backup(backup.path)
+            except Exception as e:
+                yield backup, str(e)
+                continue
+            yield backup, None
+
+    def status(self) -> Dict[str, object]:
+        return {**self.stats, "цепочка": self._chain_length}
@@ -1,38 +1,210 @@
+import datetime
+import heapq
 import json
 import os
-from typing import Dict
+import time
+from typing import Dict, Iterator, List, MutableMapping, Optional, Tuple, Union
 
-from models.bot_models import BotConfig, UserInfo
+from pydantic import TypeAdapter, ValidationError
+
+from models.bot_models import BotConfig, UserRecord
+from services.rollups import RollupStore
+from utils.json_stream import stream_container
 from utils.logger import get_named_logger
-from config import settings
 
 logger = get_named_logger()
 
+# Компактный формат снимка: первая строка — конфиг, далее по строке на пользователя
+SNAPSHOT_SUFFIX = ".ndjson"
+
+# Одна валидация на всех пользователей вместо model_validate на каждого.
+# Валидация идёт сразу в компактные UserRecord — BaseModel в памяти не держим.
+_USER_DATA_ADAPTER = TypeAdapter(Dict[int, UserRecord])
+_USER_RECORD_ADAPTER = TypeAdapter(UserRecord)
+
+
+def _daily_entry(reported_today: bool, pushups_today: int, last_report_date) -> Optional[Tuple[Optional[datetime.date], int]]:
+    """(день, отжиманий) для несброшенных дневных счётчиков, иначе None"""
+    if not (reported_today or pushups_today):
+        return None
+    if isinstance(last_report_date, str):
+        last_report_date = datetime.date.fromisoformat(last_report_date)
+    return last_report_date, pushups_today
+
+
+class UserCounters:
+    """
+    Бегущие итоги по пользователям: всего отжиманий, участники и отжимания
+    несброшенных дневных счётчиков. Обновляются при каждой записи,
+    поэтому итоги дня и топы не перебирают (и не гидратируют) всех пользователей.
+    """
+
+    def __init__(self):
+        self.totals: Dict[int, int] = {}
+        self.daily: Dict[int, Tuple[Optional[datetime.date], int]] = {}
+        self.total_all = 0
+        self._today = [0, 0]  # [участников, отжиманий] несброшенных счётчиков
+
+    def track(self, user_id: int, total: int, daily: Optional[Tuple[Optional[datetime.date], int]]) -> None:
+        self.untrack(user_id)
+        self.totals[user_id] = total
+        self.total_all += total
+        if daily is not None:
+            self.daily[user_id] = daily
+            self._today[0] += 1
+            self._today[1] += daily[1]
+
+    def untrack(self, user_id: int) -> None:
+        self.total_all -= self.totals.pop(user_id, 0)
+        daily = self.daily.pop(user_id, None)
+        if daily is not None:
+            self._today[0] -= 1
+            self._today[1] -= daily[1]
+
+    def today(self) -> Tuple[int, int]:
+        """(участников, отжиманий) несброшенных счётчиков — после закрытия дня это сегодняшние"""
+        reporters, pushups = self._today
+        return reporters, pushups
+
+    def reporters(self) -> List[int]:
+        return list(self.daily)
+
+    def stale(self, today: datetime.date) -> List[int]:
+        """Пользователи с несброшенными счётчиками прошлых дней"""
+        return [uid for uid, (reported, _) in self.daily.items() if reported != today]
+
+    def top_total(self, limit: int) -> List[int]:
+        return heapq.nlargest(limit, self.totals, key=self.totals.__getitem__)
+
+
+class LazyUserMap(MutableMapping):
+    """
+    Словарь пользователей с ленивой гидратацией.
+    Сырые записи (dict или JSON-строка из снимка) валидируются в UserRecord
+    только при первом обращении.
+    """
+
+    def __init__(self, raw: Optional[Dict[int, Union[dict, str]]] = None):
+        self._raw: Dict[int, Union[dict, str]] = raw or {}
+        self._hydrated: Dict[int, UserRecord] = {}
+        self._counters: Optional[UserCounters] = None
+
+    def __getitem__(self, user_id: int) -> UserRecord:
+        user = self._hydrated.get(user_id)
+        if user is None:
+            raw = self._raw[user_id]
+            try:
+                if isinstance(raw, str):
+                    user = _USER_RECORD_ADAPTER.validate_json(raw)
+                else:
+                    user = _USER_RECORD_ADAPTER.validate_python(raw)
+            except ValidationError:
+                # Сырая запись остаётся в _raw: следующее сохранение не должно потерять пользователя
+                logger.error(f"Повреждённая запись пользователя {user_id} в снимке — оставлена как есть")
+                raise
+            del self._raw[user_id]
+            self._hydrated[user_id] = user
+        return user
+
+    def __setitem__(self, user_id: int, user: UserRecord) -> None:
+        self._raw.pop(user_id, None)
+        self._hydrated[user_id] = user
+        if self._counters is not None:
+            self._counters.track(
+                user_id, user.total_pushups,
+                _daily_entry(user.reported_today, user.pushups_today, user.last_report_date),
+            )
+
+    def __delitem__(self, user_id: int) -> None:
+        if self._hydrated.pop(user_id, None) is None:
+            del self._raw[user_id]
+        if self._counters is not None:
+            self._counters.untrack(user_id)
+
+    def __contains__(self, user_id: object) -> bool:
+        return user_id in self._hydrated or user_id in self._raw
+
+    def __iter__(self) -> Iterator[int]:
+        yield from list(self._hydrated)
+        yield from list(self._raw)
+
+    def __len__(self) -> int:
+        return len(self._hydrated) + len(self._raw)
+
+    @property
+    def hydrated_count(self) -> int:
+        return len(self._hydrated)
+
+    def counters(self) -> UserCounters:
+        """
+        Бегущие итоги. Строятся при первом запросе одним проходом по сырым записям
+        (json.loads без валидации и гидратации), дальше обновляются в __setitem__.
+        """
+        if self._counters is None:
+            counters = UserCounters()
+            for uid, user in self._hydrated.items():
+                counters.track(
+                    uid, user.total_pushups,
+                    _daily_entry(user.reported_today, user.pushups_today, user.last_report_date),
+                )
+            for uid, raw in self._raw.items():
+                info = json.loads(raw) if isinstance(raw, str) else raw
+                counters.track(
+                    uid, info.get("total_pushups", 0),
+                    _daily_entry(info.get("reported_today"), info.get("pushups_today", 0), info.get("last_report_date")),
+                )
+            self._counters = counters
+        return self._counters
+
+    def dump(self) -> Dict[str, Union[dict, str]]:
+        """Сериализует пользователей, не трогая ещё не гидратированные записи"""
+        dumped = _USER_DATA_ADAPTER.dump_python(self._hydrated, mode="json")
+        dumped.update((str(uid), raw) for uid, raw in self._raw.items())
+        return dumped
+
 
 class Storage:
-    def __init__(self, path: str):
+    def __init__(self, path: str, lazy: bool = False):
         self.path = path
+        self.lazy = lazy
+        self.compact = path.endswith(SNAPSHOT_SUFFIX)
 
     def load(self) -> Dict:
-        """Загружает данные из JSON-файла"""
+        """Загружает данные из JSON-файла или компактного снимка"""
         if not os.path.exists(self.path):
             logger.warning(f"Файл {self.path} не найден. Используется конфигурация по умолчанию.")
             return {
                 "config": self.default_config(),
-                "user_data": {}
+                "user_data": LazyUserMap() if self.lazy else {}
             }
 
+        started = time.perf_counter()
         try:
-            with open(self.path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+            if self.compact:
+                config_raw, user_data_raw = self._read_snapshot()
+            else:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                config_raw = data.get("config", {})
+                user_data_raw = {int(uid): info for uid, info in data.get("user_data", {}).items()}
 
-            config = BotConfig.model_validate(data.get("config", {}))
+            config = BotConfig.model_validate(config_raw)
 
-            user_data_raw = data.get("user_data", {})
-            user_data = {
-                int(uid): UserInfo.model_validate(info)
-                for uid, info in user_data_raw.items()
-            }
+            if self.lazy:
+                user_data = LazyUserMap(user_data_raw)
+            elif self.compact:
+                # Склеиваем тела записей в один документ и валидируем его за один проход
+                user_data = _USER_DATA_ADAPTER.validate_json(
+                    "{" + ",".join(f'"{uid}":{body}' for uid, body in user_data_raw.items()) + "}"
+                )
+            else:
+                user_data = _USER_DATA_ADAPTER.validate_python(user_data_raw)
+
+            logger.info(
+                f"Загружено {len(user_data)} пользователей за "
+                f"{(time.perf_counter() - started) * 1000:.1f} мс"
+                f"{' (ленивая гидратация)' if self.lazy else ''}"
+            )
 
             return {
                 "config": config,
@@ -43,28 +215,108 @@ class Storage:
             logger.error(f"Ошибка при загрузке данных: {e}")
             return {
                 "config": self.default_config(),
-                "user_data": {}
+                "user_data": LazyUserMap() if self.lazy else {}
             }
 
-    def save(self, config: BotConfig, user_data: Dict[int, UserInfo]) -> None:
-        """Сохраняет данные в JSON-файл"""
+    def save(self, config: BotConfig, user_data: MutableMapping[int, UserRecord]) -> None:
+        """Сохраняет данные в JSON-файл или компактный снимок"""
         try:
-            serializable_data = {
-                "config": config.model_dump(mode="json"),
-                "user_data": {
-                    str(uid): user.model_dump(mode="json")
-                    for uid, user in user_data.items()
+            if isinstance(user_data, LazyUserMap):
+                users_dumped = user_data.dump()
+            else:
+                users_dumped = _USER_DATA_ADAPTER.dump_python(user_data, mode="json")
+
+            # Пишем во временный файл и подменяем атомарно: читатели (резервное
+            # копирование, офлайн-инструменты) никогда не видят файл наполовину
+            tmp_path = f"{self.path}.tmp"
+            if self.compact:
+                self._write_snapshot(tmp_path, config.model_dump(mode="json"), users_dumped)
+            else:
+                serializable_data = {
+                    "config": config.model_dump(mode="json"),
+                    "user_data": {
+                        uid: json.loads(info) if isinstance(info, str) else info
+                        for uid, info in users_dumped.items()
+                    }
                 }
-            }
 
-            with open(self.path, 'w', encoding='utf-8') as f:
-                json.dump(serializable_data, f, indent=4) # qo
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(serializable_data, f, indent=4) # qo
+            os.replace(tmp_path, self.path)
 
             logger.info("Данные успешно сохранены")
 
         except Exception as e:
             logger.error(f"Ошибка при сохранении данных: {e}")
 
+    def iter_raw_users(self, header: Optional[Dict] = None) -> Iterator[Tuple[int, dict]]:
+        """
+        Потоково отдаёт сырые записи пользователей, не загружая хранилище целиком.
+        Конфиг и прочие ключи верхнего уровня попадают в header.
+        """
+        header = header if header is not None else {}
+        with open(self.path, 'r', encoding='utf-8') as f:
+            if self.compact:
+                header.update(json.loads(f.readline() or "{}"))
+                for line in f:
+                    if line.strip():
+                        uid, info = json.loads(line)
+                        yield int(uid), info
+            else:
+                for uid, info in stream_container(f, "user_data", header):
+                    yield int(uid), info
+
+    def _read_snapshot(self):
+        """
+        Читает снимок: строка конфига, затем строки вида [user_id,{...}].
+        Тело записи остаётся JSON-строкой — разбор откладывается до валидации.
+        """
+        user_data_raw = {}
+        with open(self.path, 'r', encoding='utf-8') as f:
+            header = json.loads(f.readline() or "{}")
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                uid, _, body = line[1:-1].partition(",")
+                user_data_raw[int(uid)] = body
+        return header.get("config", {}), user_data_raw
+
+    @staticmethod
+    def _write_snapshot(path: str, config_dumped: dict, users_dumped: Dict[str, Union[dict, str]]) -> None:
+        dumps = json.JSONEncoder(ensure_ascii=False, separators=(",", ":")).encode
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(dumps({"config": config_dumped}))
+            f.write("\n")
+            f.writelines(
+                f"[{uid},{info if isinstance(info, str) else dumps(info)}]\n"
+                for uid, info in users_dumped.items()
+            )
+
+    def open_rollups(self) -> RollupStore:
+        """Сводки по периодам — в соседнем файле рядом с данными"""
+        return RollupStore(self.rollups_path)
+
+    @property
+    def rollups_path(self) -> str:
+        return f"{self.path}.rollups.json"
+
+    def change_marker(self) -> Tuple[Optional[Tuple[int, int]], ...]:
+        """
+        Меняется при каждой записи данных или сводок (время изменения и размер файлов):
+        резервное копирование пропускает неизменённое хранилище, не читая его.
+        """
+        markers = []
+        for path in (self.path, self.rollups_path, f"{self.rollups_path}.journal"):
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                markers.append(None)
+            else:
+                markers.append((stat.st_mtime_ns, stat.st_size))
+        return tuple(markers)
+
     @staticmethod
     def default_config() -> BotConfig:
+        from config import settings  # настройки нужны только для дефолта — офлайн-инструменты работают без .env
         return settings.to_bot_config()  # ✅ Используем единый источник правды
@@ -0,0 +1,321 @@
+import asyncio
+import cProfile
+import html
+import io
+import os
+import pstats
+import resource
+import sys
+import threading
+import time
+import traceback
+import tracemalloc
+from collections import Counter, deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from utils.logger import get_named_logger
+
+logger = get_named_logger()
+
+# Верхняя граница профилирования по команде — чтобы не забыть профайлер включённым
+MAX_PROFILE_SECONDS = 60.0
+
+# Каталог исходников бота: место блокировки — самый глубокий кадр из нашего кода
+_SOURCE_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def rss_bytes() -> int:
+    """Текущий RSS процесса (Linux: /proc), иначе пиковый из getrusage"""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _call_site(stack: traceback.StackSummary) -> str:
+    """'файл:строка функция' самого глубокого кадра из кода бота (иначе — самого глубокого вообще)"""
+    for frame in reversed(stack):
+        if frame.filename.startswith(_SOURCE_ROOT) and frame.filename != __file__:
+            return f"{os.path.relpath(frame.filename, _SOURCE_ROOT)}:{frame.lineno} {frame.name}"
+    frame = stack[-1]
+    return f"{os.path.basename(frame.filename)}:{frame.lineno} {frame.name}"
+
+
+class LoopWatchdog:
+    """
+    Поток-сторож event loop. Раз в poll секунд сверяет часы со сроком
+    ближайшего пробуждения LoopLagMonitor; если цикл опаздывает больше чем
+    на threshold, снимает стек потока цикла (sys._current_frames) — то есть
+    код, который держит цикл прямо сейчас, — пишет его в лог и считает
+    блокировки по месту вызова. В обычном режиме это одно сравнение чисел
+    за опрос, поэтому сторож можно держать включённым постоянно.
+    """
+
+    def __init__(self, monitor: "LoopLagMonitor", threshold: float = 0.25, poll: float = 0.05, stack_limit: int = 12):
+        self.monitor = monitor
+        self.threshold = threshold
+        self.poll = poll
+        self.stack_limit = stack_limit
+        self.stalls = 0
+        self.sites: Counter = Counter()
+        self.blocked_ms: Counter = Counter()
+        self._loop_thread_id: Optional[int] = None
+        self._captured: Optional[Tuple[float, str]] = None  # (срок пробуждения, место) текущей блокировки
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """Вызывается из потока event loop"""
+        self._loop_thread_id = threading.get_ident()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="loop_watchdog", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join(timeout=self.poll * 4)
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.poll):
+            deadline = self.monitor.deadline
+            if deadline is None or (self._captured is not None and self._captured[0] == deadline):
+                continue
+            overdue = time.monotonic() - deadline
+            if overdue >= self.threshold:
+                self._capture(deadline, overdue)
+
+    def _capture(self, deadline: float, overdue: float) -> None:
+        frame = sys._current_frames().get(self._loop_thread_id)
+        if frame is None:
+            return
+        stack = traceback.extract_stack(frame)
+        del frame
+        # Кадры самого asyncio до вызова колбэка ничего не говорят о блокировке
+        dispatch = max(
+            (i for i, f in enumerate(stack) if f.filename.endswith(os.path.join("asyncio", "events.py"))),
+            default=-1,
+        )
+        stack = traceback.StackSummary.from_list((stack[dispatch + 1:] or stack)[-self.stack_limit:])
+        site = _call_site(stack)
+        self._captured = (deadline, site)
+        self.stalls += 1
+        self.sites[site] += 1
+        logger.warning(
+            f"Event loop заблокирован уже {overdue * 1000:.0f} мс: {site}\n"
+            + "".join(traceback.format_list(stack)).rstrip()
+        )
+
+    def finish(self, deadline: float, lag: float) -> None:
+        """Цикл снова работает: записываем полную длительность пойманной блокировки"""
+        captured = self._captured
+        if captured is None or captured[0] != deadline:
+            return
+        self.blocked_ms[captured[1]] += lag * 1000
+        logger.warning(f"Блокировка event loop длилась {lag * 1000:.0f} мс: {captured[1]}")
+
+    def top_sites(self, limit: int = 5) -> List[Tuple[str, int, float]]:
+        """[(место, сколько раз, суммарно мс)] по числу блокировок"""
+        return [(site, count, round(self.blocked_ms[site], 1)) for site, count in self.sites.most_common(limit)]
+
+
+class LoopLagMonitor:
+    """
+    Задержка event loop: задача просыпается каждые interval секунд,
+    опоздание пробуждения — время, на которое цикл был занят чужим кодом.
+    С stall_threshold > 0 заодно работает LoopWatchdog, ловящий стек блокировки.
+    """
+
+    def __init__(self, interval: float = 0.1, window: int = 1200, stall_threshold: float = 0.25):
+        self.interval = interval
+        self.samples: Deque[float] = deque(maxlen=window)
+        self.max_lag = 0.0
+        # Срок ближайшего пробуждения (loop.time() == time.monotonic()) — его читает сторож
+        self.deadline: Optional[float] = None
+        self.watchdog = LoopWatchdog(self, threshold=stall_threshold) if stall_threshold > 0 else None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run(), name="loop_lag_monitor")
+        if self.watchdog is not None:
+            self.watchdog.start()
+
+    async def stop(self) -> None:
+        if self.watchdog is not None:
+            self.watchdog.stop()
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self.deadline = None
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            self.deadline = expected
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - expected)
+            self.samples.append(lag)
+            self.max_lag = max(self.max_lag, lag)
+            if self.watchdog is not None:
+                self.watchdog.finish(expected, lag)
+
+    def snapshot(self) -> Dict[str, float]:
+        samples = list(self.samples)
+        return {
+            "last_ms": round(samples[-1] * 1000, 1) if samples else 0.0,
+            "p50_ms": round(_percentile(samples, 0.5) * 1000, 1),
+            "p95_ms": round(_percentile(samples, 0.95) * 1000, 1),
+            "p99_ms": round(_percentile(samples, 0.99) * 1000, 1),
+            "max_ms": round(self.max_lag * 1000, 1),
+            "stalls": self.watchdog.stalls if self.watchdog is not None else 0,
+        }
+
+
+class Diagnostics:
+    """
+    Интроспекция живого процесса для /diag: задержка цикла, апдейты в работе,
+    размеры кешей, RSS, топ аллокаций tracemalloc и профилирование по запросу.
+    """
+
+    def __init__(self, lag_monitor: Optional[LoopLagMonitor] = None):
+        self.lag_monitor = lag_monitor or LoopLagMonitor()
+        self.updates_in_flight = 0
+        self.updates_total = 0
+        self.started_at = time.monotonic()
+        self._profiling = False
+        # Источники размеров кешей: имя -> функция, возвращающая число или словарь
+        self._sources: Dict[str, Callable[[], Any]] = {}
+
+    def register(self, name: str, source: Callable[[], Any]) -> None:
+        self._sources[name] = source
+
+    async def update_middleware(self, handler, event, data):
+        """Внешний middleware диспетчера: считает апдейты в обработке"""
+        self.updates_in_flight += 1
+        self.updates_total += 1
+        try:
+            return await handler(event, data)
+        finally:
+            self.updates_in_flight -= 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        sizes = {}
+        for name, source in self._sources.items():
+            try:
+                sizes[name] = source()
+            except Exception as e:
+                sizes[name] = f"ошибка: {e}"
+        return {
+            "uptime_s": round(time.monotonic() - self.started_at),
+            "loop_lag": self.lag_monitor.snapshot(),
+            "blocking_sites": self.lag_monitor.watchdog.top_sites() if self.lag_monitor.watchdog else [],
+            "updates_in_flight": self.updates_in_flight,
+            "updates_total": self.updates_total,
+            "loop_tasks": len(asyncio.all_tasks()),
+            "rss_mb": round(rss_bytes() / 2 ** 20, 1),
+            "sizes": sizes,
+            "tracemalloc": tracemalloc.is_tracing(),
+        }
+
+    # --- память ---
+
+    @staticmethod
+    def set_tracemalloc(enabled: bool, frames: int = 1) -> None:
+        if enabled and not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+        elif not enabled and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+    @staticmethod
+    def top_allocations(limit: int = 10) -> List[str]:
+        """Строки вида 'файл:строка — размер (блоков)'; пусто, если tracemalloc выключен"""
+        if not tracemalloc.is_tracing():
+            return []
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        ))
+        lines = []
+        for stat in snapshot.statistics("lineno")[:limit]:
+            frame = stat.traceback[0]
+            lines.append(
+                f"{os.path.basename(frame.filename)}:{frame.lineno} — "
+                f"{stat.size / 1024:.1f} KiB ({stat.count})"
+            )
+        return lines
+
+    # --- профилирование ---
+
+    async def profile(self, seconds: float, limit: int = 40, sort: str = "cumulative") -> str:
+        """
+        Профилирует живой трафик seconds секунд (cProfile на потоке event loop)
+        и возвращает отчёт pstats по топ-функциям.
+        """
+        if self._profiling:
+            raise RuntimeError("Профилирование уже идёт")
+        seconds = min(max(seconds, 1.0), MAX_PROFILE_SECONDS)
+
+        self._profiling = True
+        profiler = cProfile.Profile()
+        started_updates = self.updates_total
+        logger.info(f"Профилирование запущено на {seconds:.0f} с")
+        try:
+            profiler.enable()
+            await asyncio.sleep(seconds)
+        finally:
+            profiler.disable()
+            self._profiling = False
+
+        out = io.StringIO()
+        out.write(
+            f"Профиль {seconds:.0f} с, апдейтов обработано: {self.updates_total - started_updates}\n"
+            f"Сортировка: {sort}\n\n"
+        )
+        stats = pstats.Stats(profiler, stream=out)
+        stats.strip_dirs().sort_stats(sort).print_stats(limit)
+        return out.getvalue()
+
+
+def format_snapshot(snapshot: Dict[str, Any], allocations: List[str]) -> str:
+    lag = snapshot["loop_lag"]
+    lines = [
+        "<b>🩺 Диагностика</b>",
+        f"Аптайм: {snapshot['uptime_s']} с, RSS: <b>{snapshot['rss_mb']} МБ</b>",
+        f"Задержка цикла: сейчас {lag['last_ms']} мс, p50 {lag['p50_ms']}, p95 {lag['p95_ms']}, "
+        f"p99 {lag['p99_ms']}, макс {lag['max_ms']}, блокировок: {lag['stalls']}",
+        f"Апдейтов в работе: <b>{snapshot['updates_in_flight']}</b> (всего {snapshot['updates_total']}), "
+        f"задач в цикле: {snapshot['loop_tasks']}",
+        "",
+        "<b>Размеры:</b>",
+    ]
+    lines.extend(f"• {name}: {value}" for name, value in snapshot["sizes"].items())
+    lines.append("")
+    if snapshot["blocking_sites"]:
+        lines.append("<b>Где блокируется цикл:</b>")
+        lines.extend(
+            f"<code>{html.escape(site)}</code> — {count} раз, {total_ms:.0f} мс"
+            for site, count, total_ms in snapshot["blocking_sites"]
+        )
+        lines.append("")
+    if allocations:
+        lines.append("<b>Топ аллокаций (tracemalloc):</b>")
+        lines.extend(f"<code>{line}</code>" for line in allocations)
+    else:
+        lines.append("tracemalloc выключен: /diag mem on")
+    return "\n".join(lines)
+
@@ -0,0 +1,214 @@
+import datetime
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, MutableMapping, Optional, Tuple
+
+from models.bot_models import UserRecord
+from services.pushups_parser import LLM_BATCH_SIZE, PushupsParser
+from services.report_classifier import ReportClassifier
+from utils.json_stream import stream_container
+from utils.logger import get_named_logger
+
+logger = get_named_logger()
+
+# Сообщений в одной порции конвейера: разбор → LLM → применение
+CHUNK_SIZE = 2000
+
+
+@dataclass(slots=True)
+class ExportMessage:
+    user_id: int
+    name: str
+    sent_at: datetime.datetime
+    text: str
+
+
+@dataclass
+class ImportStats:
+    messages: int = 0
+    skipped: int = 0
+    reports: int = 0
+    users: int = 0
+    tiers: Dict[str, int] = field(default_factory=dict)
+    # (user_id, день, дельта) применённых отчётов — для сводок по периодам
+    deltas: List[Tuple[int, datetime.date, int]] = field(default_factory=list)
+
+
+def _message_text(raw) -> str:
+    """В экспорте text — строка или список фрагментов (строк и {"type", "text"})"""
+    if isinstance(raw, str):
+        return raw
+    return "".join(part if isinstance(part, str) else part.get("text", "") for part in raw or [])
+
+
+def _user_name(display_name: Optional[str], from_id: str) -> str:
+    """
+    Имя по соглашению бота (@username или first_name). В экспорте есть только
+    отображаемое имя «Имя Фамилия» — берём имя; настоящий @username запишет
+    первый же отчёт в чате (handle_message обновляет username).
+    """
+    return (display_name or "").split(" ", 1)[0] or from_id
+
+
+def iter_export_messages(path: str) -> Iterator[Optional[ExportMessage]]:
+    """
+    Потоково читает result.json из Telegram Desktop.
+    Служебные, пересланные и не пользовательские сообщения отдаются как None —
+    чтобы их можно было посчитать, не держа экспорт в памяти.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        for raw in stream_container(f, "messages"):
+            from_id = raw.get("from_id") or ""
+            text = _message_text(raw.get("text")).strip()
+            if (
+                raw.get("type") != "message"
+                or not from_id.startswith("user")
+                or raw.get("forwarded_from")
+                or raw.get("via_bot")
+                or not text
+            ):
+                yield None
+                continue
+            yield ExportMessage(
+                user_id=int(from_id[4:]),
+                name=_user_name(raw.get("from"), from_id),
+                sent_at=datetime.datetime.fromisoformat(raw["date"]),
+                text=text,
+            )
+
+
+# --- детерминированные уровни в пуле процессов ---
+
+_worker_parser: Optional[PushupsParser] = None
+
+
+def _init_worker(classifier_path: Optional[str], classifier_threshold: float) -> None:
+    global _worker_parser
+    classifier = ReportClassifier.load(classifier_path) if classifier_path else None
+    _worker_parser = PushupsParser(None, classifier=classifier, classifier_threshold=classifier_threshold)
+
+
+def _parse_local(texts: List[str]) -> List[Tuple[Optional[int], bool, int]]:
+    """(количество или None, итог за день, резервное значение) для каждого текста"""
+    results = []
+    for text in texts:
+        count, is_total = _worker_parser.extract_local(text)
+        fallback = _worker_parser.fallback_extract_pushups_count(text.lower()) if count is None else 0
+        results.append((count, is_total, fallback))
+    return results
+
+
+class HistoryImporter:
+    """
+    Восстанавливает статистику по экспорту истории группы.
+
+    Тексты разбираются пачками: regex и классификатор — в пуле процессов,
+    оставшиеся — пакетными запросами к LLM (или резервным методом).
+    Отчёты применяются в хронологическом порядке по дате сообщения с той же
+    семантикой, что и в handle_message (UserRecord.apply_report).
+    """
+
+    def __init__(
+        self,
+        parser: PushupsParser,
+        classifier_path: Optional[str] = None,
+        workers: Optional[int] = None,
+        use_llm: bool = True,
+    ):
+        self.parser = parser
+        self.classifier_path = classifier_path
+        self.workers = workers or os.cpu_count() or 1
+        self.use_llm = use_llm
+
+    def run(
+        self,
+        export_path: str,
+        users: MutableMapping[int, UserRecord],
+        since: Optional[datetime.date] = None,
+        reset: bool = False,
+    ) -> Tuple[Dict[int, UserRecord], ImportStats]:
+        """
+        Возвращает изменённых пользователей (записать одной операцией) и статистику.
+        Без reset сообщения за дни, уже учтённые у пользователя, пропускаются.
+        """
+        stats = ImportStats()
+        updated: Dict[int, UserRecord] = {}
+        # Граница уже учтённых дней фиксируется до импорта — новые отчёты её не сдвигают
+        covered_until: Dict[int, Optional[datetime.date]] = {}
+
+        with ProcessPoolExecutor(
+            max_workers=self.workers,
+            initializer=_init_worker,
+            initargs=(self.classifier_path, self.parser.classifier_threshold),
+        ) as pool:
+            for chunk in self._chunks(export_path, since, stats):
+                for message, (count, is_total) in zip(chunk, self._parse_chunk(pool, chunk)):
+                    if count <= 0:
+                        continue
+                    user = updated.get(message.user_id)
+                    if user is None:
+                        existing = None if reset else users.get(message.user_id)
+                        covered_until[message.user_id] = existing.last_report_date if existing else None
+                        user = existing or UserRecord(username=message.name)
+                        updated[message.user_id] = user
+
+                    day = message.sent_at.date()
+                    covered = covered_until[message.user_id]
+                    if covered is not None and day <= covered:
+                        continue
+                    stats.deltas.append((message.user_id, day, user.apply_report(count, is_total, day)))
+                    if user.last_activity is None or message.sent_at > user.last_activity:
+                        user.last_activity = message.sent_at
+                    stats.reports += 1
+
+        stats.users = len(updated)
+        stats.tiers = dict(self.parser.stats)
+        return updated, stats
+
+    def _chunks(self, export_path: str, since: Optional[datetime.date], stats: ImportStats) -> Iterator[List[ExportMessage]]:
+        chunk: List[ExportMessage] = []
+        for message in iter_export_messages(export_path):
+            stats.messages += 1
+            if message is None or (since and message.sent_at.date() < since):
+                stats.skipped += 1
+                continue
+            chunk.append(message)
+            if len(chunk) >= CHUNK_SIZE:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    def _parse_chunk(self, pool: ProcessPoolExecutor, chunk: List[ExportMessage]) -> List[Tuple[int, bool]]:
+        # Одинаковые тексты («=100», «+50») разбираем один раз
+        unique = list(dict.fromkeys(message.text for message in chunk))
+        step = max(1, len(unique) // (self.workers * 4) + 1)
+        parts = [unique[i:i + step] for i in range(0, len(unique), step)]
+
+        resolved: Dict[str, Tuple[int, bool]] = {}
+        pending: Dict[str, Tuple[bool, int]] = {}
+        for part, results in zip(parts, pool.map(_parse_local, parts)):
+            for text, (count, is_total, fallback) in zip(part, results):
+                if count is not None:
+                    resolved[text] = (count, is_total)
+                    self.parser.stats["local"] += 1
+                else:
+                    pending[text] = (is_total, fallback)
+
+        texts = list(pending)
+        for start in range(0, len(texts), LLM_BATCH_SIZE):
+            batch = texts[start:start + LLM_BATCH_SIZE]
+            counts = self.parser.extract_batch_llm(batch) if self.use_llm else [None] * len(batch)
+            for text, count in zip(batch, counts):
+                is_total, fallback = pending[text]
+                if count is None:
+                    self.parser.stats["fallback"] += 1
+                    count = fallback
+                resolved[text] = (count, is_total)
+
+        logger.info(
+            f"Порция: {len(chunk)} сообщений, {len(unique)} уникальных, "
+            f"локально {len(unique) - len(texts)}, LLM/резерв {len(texts)}"
+        )
+        return [resolved[message.text] for message in chunk]
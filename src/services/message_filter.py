@@ -0,0 +1,68 @@
+import re
+from collections import Counter
+from typing import Optional
+
+from aiogram.types import Message
+
+from utils.logger import get_named_logger
+
+logger = get_named_logger()
+
+# Один проход по тексту: цифры, знаки отчёта, числительные и ключевые слова.
+# Ключевые слова — те же, что у резервного метода парсера; текст приводится к нижнему регистру.
+_SIGNAL_RE = re.compile(
+    r"\d|[=+]"
+    r"|отжим|отжал|сделал|подход|выполнил|осилил|пуш|push"
+    r"|надцат|дцать|десят|девяност|двест|трист|сот\b|тысяч|сотн|полтинник|сотк"
+    r"|\b(?:од(?:ин|на)|дв[ае]|три|четыре|пять|шесть|семь|восемь|девять|сто|сорок)\b"
+)
+
+
+class MessageFilter:
+    """
+    Дешёвый префильтр перед парсером: до PushupsParser (а значит, и до LLM)
+    доходят только сообщения, похожие на отчёт.
+
+    Стадии по порядку, счётчик у каждой: no_text, bot, forwarded,
+    reply_to_other, too_long, no_signal; прошедшие — passed.
+    """
+
+    def __init__(self, max_length: int = 300):
+        self.max_length = max_length
+        self.stats: Counter = Counter()
+
+    def check(self, message: Message) -> Optional[str]:
+        """Причина отсева (название стадии) или None, если сообщение стоит разбирать"""
+        reason = self.reason(message)
+        self.stats[reason or "passed"] += 1
+        return reason
+
+    def reason(self, message: Message) -> Optional[str]:
+        """То же, что check, но без счётчиков"""
+        text = message.text
+        if not text or not text.strip():
+            return "no_text"
+
+        author = message.from_user
+        if author is None or author.is_bot:
+            return "bot"
+
+        if getattr(message, "forward_origin", None) or getattr(message, "forward_date", None):
+            return "forwarded"
+
+        reply = message.reply_to_message
+        if reply is not None and message.is_topic_message and reply.message_id == message.message_thread_id:
+            # В теме форума каждое сообщение ссылается на её корень — это не ответ собеседнику
+            reply = None
+        # Ответ самому себе (уточнение отчёта) и боту — допустимы
+        if reply is not None and reply.from_user is not None:
+            if reply.from_user.id != author.id and not reply.from_user.is_bot:
+                return "reply_to_other"
+
+        if len(text) > self.max_length:
+            return "too_long"
+
+        if not _SIGNAL_RE.search(text.lower()):
+            return "no_signal"
+
+        return None
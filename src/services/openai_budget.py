@@ -0,0 +1,139 @@
+import asyncio
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict
+
+from models.bot_models import RequestPriority
+from utils.logger import get_named_logger
+from utils.token_bucket import TokenBucket
+
+logger = get_named_logger()
+
+# Доля ёмкости bucket'ов, которую класс не имеет права тратить:
+# низкоприоритетные запросы отступают первыми и оставляют квоту извлечению отчётов
+_RESERVE = {
+    RequestPriority.EXTRACTION: 0.0,
+    RequestPriority.MENTION: 0.1,
+    RequestPriority.COMMENT: 0.3,
+    RequestPriority.DAILY_SUMMARY: 0.5,
+}
+
+# Сколько секунд класс готов подождать пополнения, прежде чем запрос будет сброшен
+# (только вне event loop — офлайн-импорт истории)
+_MAX_WAIT = {
+    RequestPriority.EXTRACTION: 1.0,
+    RequestPriority.MENTION: 0.5,
+    RequestPriority.COMMENT: 0.0,
+    RequestPriority.DAILY_SUMMARY: 0.0,
+}
+
+
+def _in_event_loop() -> bool:
+    """Вызов идёт из потока работающего event loop (синхронный код внутри обработчика)"""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
+
+
+class BudgetExceededError(RuntimeError):
+    """Запрос сброшен планировщиком квоты OpenAI"""
+
+
+@dataclass(slots=True)
+class _PriorityMetrics:
+    requested: int = 0
+    granted: int = 0
+    dropped: int = 0
+    degraded: int = 0
+    tokens_spent: int = 0
+    queue_delay_total: float = 0.0
+    queue_delay_max: float = 0.0
+
+
+class OpenAIBudget:
+    """
+    Планировщик квоты OpenAI: bucket'ы запросов и токенов в минуту
+    и классы приоритета extraction > mention > comment > daily_summary.
+    """
+
+    def __init__(self, requests_per_minute: int = 60, tokens_per_minute: int = 40_000):
+        self._lock = threading.Lock()
+        self.requests = TokenBucket(requests_per_minute, requests_per_minute / 60)
+        self.tokens = TokenBucket(tokens_per_minute, tokens_per_minute / 60)
+        self.metrics: Dict[RequestPriority, _PriorityMetrics] = {p: _PriorityMetrics() for p in RequestPriority}
+
+    def acquire(self, priority: RequestPriority, estimated_tokens: int) -> bool:
+        """
+        Резервирует один запрос и estimated_tokens токенов.
+        Ждёт пополнения не дольше лимита класса; False — запрос сброшен.
+        В потоке event loop не ждёт вовсе: сон остановил бы обработку всех
+        апдейтов, поэтому запрос, которому не хватает квоты, сбрасывается сразу.
+        Порядок классов в этом случае обеспечивают только резервы.
+        """
+        metrics = self.metrics[priority]
+        request_reserve = self.requests.capacity * _RESERVE[priority]
+        token_reserve = self.tokens.capacity * _RESERVE[priority]
+        started = time.monotonic()
+        deadline = started + (0.0 if _in_event_loop() else _MAX_WAIT[priority])
+
+        with self._lock:
+            metrics.requested += 1
+
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                wait = max(
+                    self.requests.time_until(1, request_reserve, now),
+                    self.tokens.time_until(estimated_tokens, token_reserve, now),
+                )
+                if wait == 0:
+                    self.requests.try_consume(1, request_reserve, now)
+                    self.tokens.try_consume(estimated_tokens, token_reserve, now)
+                    delay = now - started
+                    metrics.granted += 1
+                    metrics.queue_delay_total += delay
+                    metrics.queue_delay_max = max(metrics.queue_delay_max, delay)
+                    return True
+                if now + wait > deadline:
+                    metrics.dropped += 1
+                    logger.debug(f"Квота OpenAI: запрос {priority.value} сброшен (нужно ждать {wait:.2f} с)")
+                    return False
+            time.sleep(wait)
+
+    def max_tokens(self, priority: RequestPriority, requested: int) -> int:
+        """Деградация: при тесной квоте второстепенные ответы становятся короче"""
+        if priority in (RequestPriority.EXTRACTION, RequestPriority.MENTION):
+            return requested
+        with self._lock:
+            if self.tokens.available() >= self.tokens.capacity / 2:
+                return requested
+            self.metrics[priority].degraded += 1
+        return max(20, requested // 2)
+
+    def settle(self, priority: RequestPriority, estimated_tokens: int, actual_tokens: int) -> None:
+        """Сверяет резерв с фактическим расходом из response.usage"""
+        with self._lock:
+            self.tokens.adjust(estimated_tokens - actual_tokens)
+            self.metrics[priority].tokens_spent += actual_tokens
+
+    def snapshot(self) -> Dict[str, object]:
+        with self._lock:
+            return {
+                "requests_available": round(self.requests.available()),
+                "tokens_available": round(self.tokens.available()),
+                "classes": {
+                    priority.value: {
+                        "requested": m.requested,
+                        "granted": m.granted,
+                        "dropped": m.dropped,
+                        "degraded": m.degraded,
+                        "tokens_spent": m.tokens_spent,
+                        "queue_delay_avg": round(m.queue_delay_total / m.granted, 3) if m.granted else 0.0,
+                        "queue_delay_max": round(m.queue_delay_max, 3),
+                    }
+                    for priority, m in self.metrics.items()
+                },
+            }
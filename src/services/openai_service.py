@@ -1,19 +1,42 @@
-from typing import Optional
-from openai import OpenAI
+import time
+from typing import Dict, Optional
 
-from models.bot_models import CommentContext
+from models.bot_models import CommentContext, RequestPriority
+from services.openai_budget import BudgetExceededError, OpenAIBudget
+from services.resilience import CircuitBreaker, CircuitOpenError
+from services.response_cache import ResponseCache
 from utils.logger import get_named_logger
 
 logger = get_named_logger()
 
+FALLBACK_COMMENT = "Сила в постоянстве."
+MAX_TOKENS = 100
+
 
 class OpenAIClient:
-    def __init__(self, api_key: Optional[str] = None):
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        model: str = "gpt-3.5-turbo",
+        cache: Optional[ResponseCache] = None,
+        deadline: float = 4.0,
+        breaker: Optional[CircuitBreaker] = None,
+        budget: Optional[OpenAIBudget] = None,
+    ):
         if not api_key:
             raise ValueError("OpenAI API ключ не задан.")
 
+        self.model = model
+        self.cache = cache
+        self.deadline = deadline
+        self.breaker = breaker or CircuitBreaker()
+        self.budget = budget or OpenAIBudget()
+
         try:
-            self.client = OpenAI(api_key=api_key)
+            from openai import OpenAI  # SDK тяжёлый — импортируем, только когда клиент действительно нужен
+
+            # Жёсткий дедлайн без внутренних ретраев SDK: медленный ответ хуже быстрого fallback
+            self.client = OpenAI(api_key=api_key, timeout=deadline, max_retries=0)
             logger.info("OpenAI API клиент успешно инициализирован")
         except Exception as e:
             logger.error(f"Ошибка инициализации OpenAI API: {e}")
@@ -25,6 +48,9 @@ class OpenAIClient:
         context: CommentContext = CommentContext.REPORT,
         fallback: bool = True,
         system_prompt: Optional[str] = None,
+        use_cache: bool = True,
+        deadline: Optional[float] = None,
+        priority: Optional[RequestPriority] = None,
     ) -> str:
         """
         Генерация короткого комментария или анализа на основе промпта пользователя.
@@ -33,29 +59,87 @@ class OpenAIClient:
         :param context: контекст генерации (персональный, групповой, отчётный)
         :param fallback: возвращать ли заглушку в случае ошибки
         :param system_prompt: override — если указан, будет использоваться вместо шаблона по context
+        :param use_cache: брать ли ответ из кеша (False — для ответов, которым нужна свежесть)
+        :param deadline: дедлайн вызова в секундах (по умолчанию — общий дедлайн клиента)
+        :param priority: класс приоритета для квоты (по умолчанию выводится из context)
         :return: строка с ответом
         """
 
         system_prompt = system_prompt or self._get_system_prompt(context)
 
+        cache_key = None
+        if self.cache is not None and use_cache:
+            cache_key = ResponseCache.make_key(self.model, context.value, system_prompt, user_prompt)
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                logger.debug("Ответ OpenAI взят из кеша")
+                return cached
+
+        priority = priority or self._default_priority(context)
+        max_tokens = self.budget.max_tokens(priority, MAX_TOKENS)
+        estimated_tokens = (len(system_prompt) + len(user_prompt)) // 2 + max_tokens
+
+        # Breaker проверяется первым: при открытом breaker квота не тратится и не искажает статистику
+        if not self.breaker.allow_request():
+            logger.debug("Circuit breaker открыт — запрос к OpenAI пропущен")
+            if fallback:
+                return FALLBACK_COMMENT
+            raise CircuitOpenError("OpenAI временно недоступен (circuit breaker открыт)")
+
+        if not self.budget.acquire(priority, estimated_tokens):
+            self.breaker.cancel_request()
+            if fallback:
+                return FALLBACK_COMMENT
+            raise BudgetExceededError(f"Квота OpenAI исчерпана для класса {priority.value}")
+
+        client = self.client if deadline is None else self.client.with_options(timeout=deadline)
+        started = time.monotonic()
         try:
-            response = self.client.chat.completions.create(
-                model="gpt-3.5-turbo",
+            response = client.chat.completions.create(
+                model=self.model,
                 messages=[
                     {"role": "system", "content": system_prompt},
                     {"role": "user", "content": user_prompt}
                 ],
                 temperature=0.7,
-                max_tokens=100
+                max_tokens=max_tokens
             )
-            return response.choices[0].message.content.strip()
+            text = response.choices[0].message.content.strip()
+            usage = getattr(response, "usage", None)
+            self.budget.settle(priority, estimated_tokens, usage.total_tokens if usage else estimated_tokens)
 
         except Exception as e:
+            self.budget.settle(priority, estimated_tokens, estimated_tokens)
+            self.breaker.record_failure(time.monotonic() - started)
             logger.error(f"Ошибка генерации с OpenAI: {e}")
             if fallback:
-                return "Сила в постоянстве."
+                return FALLBACK_COMMENT
             raise
 
+        self.breaker.record_success(time.monotonic() - started)
+
+        if cache_key is not None:
+            self.cache.put(cache_key, text)
+        return text
+
+    def is_available(self) -> bool:
+        """False, пока breaker открыт — вызывающим сразу идти в детерминированный fallback"""
+        return not self.breaker.is_open()
+
+    def health(self) -> Dict[str, object]:
+        """Состояние клиента для мониторинга"""
+        return {
+            "breaker": self.breaker.snapshot(),
+            "cache": self.cache.stats() if self.cache is not None else None,
+            "budget": self.budget.snapshot(),
+        }
+
+    @staticmethod
+    def _default_priority(context: CommentContext) -> RequestPriority:
+        if context == CommentContext.DAILY_STATS:
+            return RequestPriority.DAILY_SUMMARY
+        return RequestPriority.COMMENT
+
     @staticmethod
     def _get_system_prompt(context: CommentContext) -> str:
         """
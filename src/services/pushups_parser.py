@@ -1,17 +1,37 @@
+import json
 import re
-from typing import Tuple, Optional
+from collections import Counter
+from typing import List, Tuple, Optional
 
 from services.openai_service import OpenAIClient
-from models.bot_models import CommentContext
+from services.report_classifier import ReportClassifier
+from models.bot_models import CommentContext, RequestPriority
 from utils.logger import get_named_logger
 
 logger = get_named_logger()
 
+_DAILY_TOTAL_RE = re.compile(r'за день|за сегодня|всего|сегодня')
+_SIMPLE_RE = re.compile(r'=(\d+)')
+
+# Сообщений в одном пакетном запросе к LLM
+LLM_BATCH_SIZE = 20
+
 
 class PushupsParser:
-    def __init__(self, openai_client: Optional[OpenAIClient] = None):
+    def __init__(
+        self,
+        openai_client: Optional[OpenAIClient] = None,
+        classifier: Optional[ReportClassifier] = None,
+        classifier_threshold: float = 0.9,
+        corpus_path: Optional[str] = None,
+    ):
         self.openai_client = openai_client
+        self.classifier = classifier
+        self.classifier_threshold = classifier_threshold
+        self.corpus_path = corpus_path
         self.api_calls_cache = {}
+        # Каким уровнем разрешено сообщение: cache, regex, classifier, llm, fallback
+        self.stats: Counter = Counter()
 
     def extract_pushups_count(self, text: str) -> Tuple[int, bool]:
         """
@@ -24,40 +44,114 @@ class PushupsParser:
         text_lower = text.lower()
 
         if text in self.api_calls_cache:
+            self.stats["cache"] += 1
             return self.api_calls_cache[text]
 
-        is_daily_total = bool(re.search(r'за день|за сегодня|всего|сегодня', text_lower))
-
-        # Простые и очевидные форматы
-        simple_match = re.search(r'=(\d+)', text)
-        if simple_match:
-            result = int(simple_match.group(1))
+        result, is_daily_total = self.extract_local(text)
+        if result is not None:
             self.api_calls_cache[text] = (result, is_daily_total)
             return result, is_daily_total
 
-        # Использование OpenAI для сложных случаев
-        if self.openai_client:
+        # Использование OpenAI для сложных случаев (пока breaker открыт — сразу резервный метод)
+        if self.openai_client and self.openai_client.is_available():
             try:
                 prompt = f"Извлеки количество отжиманий из текста: '{text}'. Отвечай только числом. Если не уверен — 0."
                 result_text = self.openai_client.generate_comment(
                     user_prompt=prompt,
                     context=CommentContext.REPORT,
-                    fallback=False
+                    fallback=False,
+                    priority=RequestPriority.EXTRACTION
                 )
 
                 match = re.search(r'\d+', result_text)
                 if match:
                     result = int(match.group())
+                    self.stats["llm"] += 1
                     self.api_calls_cache[text] = (result, is_daily_total)
+                    self._record_label(text, result)
                     return result, is_daily_total
             except Exception as e:
                 logger.error(f"Ошибка извлечения данных с OpenAI: {e}")
 
         # Резервный метод
         result = self.fallback_extract_pushups_count(text_lower)
+        self.stats["fallback"] += 1
         self.api_calls_cache[text] = (result, is_daily_total)
         return result, is_daily_total
 
+    def extract_local(self, text: str) -> Tuple[Optional[int], bool]:
+        """
+        Детерминированные уровни без сети: regex и локальный классификатор.
+        Количество None — сообщение нужно отдать LLM (или резервному методу).
+        """
+        is_daily_total = bool(_DAILY_TOTAL_RE.search(text.lower()))
+
+        # Простые и очевидные форматы
+        simple_match = _SIMPLE_RE.search(text)
+        if simple_match:
+            self.stats["regex"] += 1
+            return int(simple_match.group(1)), is_daily_total
+
+        # Локальная модель, обученная на прошлых ответах LLM
+        if self.classifier:
+            result, confidence = self.classifier.predict(text)
+            if confidence >= self.classifier_threshold:
+                logger.debug(f"Классификатор: {result} (уверенность {confidence:.2f})")
+                self.stats["classifier"] += 1
+                return result, is_daily_total
+
+        return None, is_daily_total
+
+    def extract_batch_llm(self, texts: List[str]) -> List[Optional[int]]:
+        """
+        Один запрос к LLM на пачку сообщений (для импорта истории).
+        Пачка — не больше LLM_BATCH_SIZE: ответ должен уложиться в MAX_TOKENS.
+        None — для сообщений, которые извлечь не удалось.
+        """
+        if not texts or not self.openai_client or not self.openai_client.is_available():
+            return [None] * len(texts)
+
+        numbered = "\n".join(f"{i}. {json.dumps(t, ensure_ascii=False)}" for i, t in enumerate(texts, 1))
+        prompt = (
+            "Для каждого сообщения извлеки количество отжиманий. "
+            f"Ответь только JSON-массивом из {len(texts)} целых чисел в том же порядке, 0 — если не отчёт.\n"
+            f"{numbered}"
+        )
+        try:
+            answer = self.openai_client.generate_comment(
+                user_prompt=prompt,
+                context=CommentContext.REPORT,
+                fallback=False,
+                priority=RequestPriority.EXTRACTION,
+            )
+            values = json.loads(answer[answer.index("["):answer.rindex("]") + 1])
+        except Exception as e:
+            logger.error(f"Ошибка пакетного извлечения с OpenAI: {e}")
+            return [None] * len(texts)
+
+        if len(values) != len(texts):
+            logger.warning(f"LLM вернула {len(values)} значений на {len(texts)} сообщений — пачка отброшена")
+            return [None] * len(texts)
+
+        results: List[Optional[int]] = []
+        for text, value in zip(texts, values):
+            count = value if isinstance(value, int) and value >= 0 else None
+            if count is not None:
+                self.stats["llm"] += 1
+                self._record_label(text, count)
+            results.append(count)
+        return results
+
+    def _record_label(self, text: str, count: int) -> None:
+        """Дописывает метку LLM в корпус для офлайн-обучения классификатора"""
+        if not self.corpus_path:
+            return
+        try:
+            with open(self.corpus_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps({"text": text, "count": count}, ensure_ascii=False) + "\n")
+        except OSError as e:
+            logger.warning(f"Не удалось записать метку в корпус: {e}")
+
     @staticmethod
     def fallback_extract_pushups_count(text: str) -> int:
         """Резервный метод, если OpenAI недоступен."""
@@ -0,0 +1,85 @@
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Dict, Hashable, List, Optional, Tuple
+
+from utils.logger import get_named_logger
+
+logger = get_named_logger()
+
+
+@dataclass(slots=True)
+class _Entry:
+    version: Hashable
+    text: str
+    rendered_at: float
+
+
+def command_key(command: str, args: List[str], user_id: int) -> str:
+    """Ключ кеша команды: /mystats — на пользователя, /stats week — с учётом периода"""
+    if command == "mystats":
+        return f"mystats:{user_id}"
+    return ":".join([command, *(arg.lower() for arg in args)])
+
+
+class RenderCache:
+    """
+    Кеш отрендеренных ответов /stats, /adminstats и /mystats.
+
+    Ключ — (chat_id, команда). Запись валидна, пока не изменилась версия
+    (счётчик мутаций репозитория + дата). Повтор в пределах cooldown отдаётся
+    из кеша даже при новой версии — защищает от спама командами.
+    """
+
+    def __init__(self, cooldown: float = 3.0, max_age: float = 300.0, max_entries: int = 1024):
+        self.cooldown = cooldown
+        self.max_age = max_age
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[int, str], _Entry]" = OrderedDict()
+        self.hits = 0
+        self.cooldown_hits = 0
+        self.renders = 0
+
+    def get_or_render(self, chat_id: int, command: str, version: Hashable, render: Callable[[], str]) -> str:
+        key = (chat_id, command)
+        now = time.monotonic()
+        entry = self._entries.get(key)
+
+        if entry is not None:
+            age = now - entry.rendered_at
+            if age < self.cooldown:
+                self.cooldown_hits += 1
+                self._entries.move_to_end(key)
+                return entry.text
+            if entry.version == version and age < self.max_age:
+                self.hits += 1
+                self._entries.move_to_end(key)
+                return entry.text
+
+        text = render()
+        self.renders += 1
+        self._entries[key] = _Entry(version=version, text=text, rendered_at=now)
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+        logger.debug(f"Рендер {command} для чата {chat_id} | {self.stats()}")
+        return text
+
+    def peek(self, chat_id: int, command: str) -> Optional[str]:
+        """Последний ответ без проверки версии — для ответа на запрос сверх лимита частоты"""
+        entry = self._entries.get((chat_id, command))
+        if entry is None or time.monotonic() - entry.rendered_at >= self.max_age:
+            return None
+        return entry.text
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "cooldown_hits": self.cooldown_hits,
+            "renders": self.renders,
+            "entries": len(self._entries),
+        }
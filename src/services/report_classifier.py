@@ -0,0 +1,166 @@
+import json
+import math
+import random
+import re
+import zlib
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from utils.logger import get_named_logger
+
+logger = get_named_logger()
+
+_NUMBER_RE = re.compile(r"\d+")
+_DIGITS_RE = re.compile(r"\d")
+_CONTEXT = 6
+
+
+class ReportClassifier:
+    """
+    Лёгкая локальная модель извлечения количества отжиманий.
+
+    Ранжирует кандидатов — «не отчёт» (0), каждое число в тексте и сумму всех
+    чисел — линейной моделью над хешированными символьными n-граммами
+    контекста и простыми числовыми признаками. Уверенность — softmax по
+    кандидатам. Обучается офлайн на метках, полученных от LLM (train_classifier.py).
+    """
+
+    def __init__(self, weights: Optional[Dict[int, float]] = None, buckets: int = 1 << 18):
+        self.weights: Dict[int, float] = weights or {}
+        self.buckets = buckets
+
+    # --- признаки ---
+
+    def _hash(self, feature: str) -> int:
+        return zlib.crc32(feature.encode("utf-8")) % self.buckets
+
+    @staticmethod
+    def _ngrams(text: str, prefix: str, sizes=(2, 3, 4)) -> List[str]:
+        return [f"{prefix}{text[i:i + n]}" for n in sizes for i in range(len(text) - n + 1)]
+
+    def candidates(self, text: str) -> List[Tuple[int, List[int]]]:
+        """Кандидаты (значение, хеши признаков); значения не повторяются"""
+        text = text.lower()
+        masked = _DIGITS_RE.sub("0", text)
+        matches = list(_NUMBER_RE.finditer(text))
+        values = [int(m.group()) for m in matches]
+        count_bucket = f"n={min(len(values), 5)}"
+        text_grams = self._ngrams(f"^{masked[:120]}$", "", sizes=(3,))
+
+        result: Dict[int, List[str]] = {0: ["kind=none", f"none|{count_bucket}"] + [f"none|{g}" for g in text_grams]}
+
+        for index, match in enumerate(matches):
+            value = values[index]
+            if value in result:
+                continue
+            left = masked[max(0, match.start() - _CONTEXT):match.start()]
+            right = masked[match.end():match.end() + _CONTEXT]
+            features = [
+                "kind=num",
+                f"num|{count_bucket}",
+                f"num|mag={len(match.group())}",
+                f"num|pos={'first' if index == 0 else 'last' if index == len(matches) - 1 else 'mid'}",
+                f"num|max={value == max(values)}",
+                f"num|l1={left[-1:]}",
+                f"num|r1={right[:1]}",
+            ]
+            features += self._ngrams(f"^{left}", "L:") + self._ngrams(f"{right}$", "R:")
+            result[value] = features
+
+        if len(values) > 1:
+            total = sum(values)
+            if total not in result:
+                features = ["kind=sum", f"sum|{count_bucket}"] + [f"sum|{g}" for g in text_grams]
+                result[total] = features
+
+        return [(value, [self._hash(f) for f in features]) for value, features in result.items()]
+
+    # --- предсказание ---
+
+    def _score(self, hashes: List[int]) -> float:
+        weights = self.weights
+        return sum(weights.get(h, 0.0) for h in hashes)
+
+    def _probabilities(self, candidates: List[Tuple[int, List[int]]]) -> List[float]:
+        scores = [self._score(hashes) for _, hashes in candidates]
+        top = max(scores)
+        exps = [math.exp(s - top) for s in scores]
+        norm = sum(exps)
+        return [e / norm for e in exps]
+
+    def predict(self, text: str) -> Tuple[int, float]:
+        """
+        Возвращает (количество, уверенность).
+        Без чисел в тексте выбирать не из чего («сделал сто») — уверенность 0,
+        такие сообщения разбирают следующие уровни.
+        """
+        candidates = self.candidates(text)
+        if len(candidates) < 2:
+            return 0, 0.0
+        probabilities = self._probabilities(candidates)
+        best = max(range(len(candidates)), key=probabilities.__getitem__)
+        return candidates[best][0], probabilities[best]
+
+    # --- обучение ---
+
+    def fit(
+        self,
+        examples: Iterable[Tuple[str, int]],
+        epochs: int = 8,
+        learning_rate: float = 0.2,
+        l2: float = 1e-6,
+        seed: int = 13,
+    ) -> int:
+        """
+        SGD по log-loss условного логита над кандидатами.
+        Примеры, чья метка не среди кандидатов, пропускаются. Возвращает число использованных.
+        """
+        prepared = []
+        for text, count in examples:
+            candidates = self.candidates(text)
+            target = next((i for i, (value, _) in enumerate(candidates) if value == count), None)
+            if target is not None:
+                prepared.append((candidates, target))
+
+        rng = random.Random(seed)
+        weights = self.weights
+        for epoch in range(epochs):
+            rng.shuffle(prepared)
+            rate = learning_rate / (1 + epoch)
+            for candidates, target in prepared:
+                probabilities = self._probabilities(candidates)
+                for i, (_, hashes) in enumerate(candidates):
+                    gradient = probabilities[i] - (1.0 if i == target else 0.0)
+                    if abs(gradient) < 1e-4:
+                        continue
+                    for h in hashes:
+                        w = weights.get(h, 0.0)
+                        weights[h] = w - rate * (gradient + l2 * w)
+
+        # Почти нулевые веса не храним — модель остаётся компактной
+        self.weights = {h: w for h, w in weights.items() if abs(w) > 1e-4}
+        return len(prepared)
+
+    # --- сериализация ---
+
+    def save(self, path: str) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"version": 1, "buckets": self.buckets, "weights": self.weights}, f)
+
+    @classmethod
+    def load(cls, path: str) -> "ReportClassifier":
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        weights = {int(h): w for h, w in data["weights"].items()}
+        logger.info(f"Локальный классификатор отчётов загружен: {len(weights)} весов")
+        return cls(weights=weights, buckets=data["buckets"])
+
+
+def read_corpus(path: str) -> List[Tuple[str, int]]:
+    """Читает корпус меток parser'а (JSONL: {"text": ..., "count": ...})"""
+    examples = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                row = json.loads(line)
+                examples.append((row["text"], int(row["count"])))
+    return examples
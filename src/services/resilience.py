@@ -0,0 +1,133 @@
+import threading
+import time
+from collections import deque
+from typing import Dict, Optional
+
+from models.bot_models import BreakerState
+from utils.logger import get_named_logger
+
+logger = get_named_logger()
+
+
+class CircuitOpenError(RuntimeError):
+    """Вызов отклонён без обращения к API — circuit breaker открыт"""
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker со скользящим окном последних вызовов.
+
+    Открывается после failure_threshold ошибок подряд или когда доля ошибок
+    в окне достигает error_rate_threshold (при не менее min_calls вызовах).
+    Через reset_timeout пропускает один пробный вызов (half-open):
+    успех закрывает breaker, ошибка открывает его снова.
+    """
+
+    def __init__(
+        self,
+        name: str = "openai",
+        failure_threshold: int = 3,
+        error_rate_threshold: float = 0.5,
+        window: int = 20,
+        min_calls: int = 5,
+        reset_timeout: float = 30.0,
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.error_rate_threshold = error_rate_threshold
+        self.min_calls = min_calls
+        self.reset_timeout = reset_timeout
+
+        self._lock = threading.Lock()
+        self._outcomes: deque = deque(maxlen=window)  # (успех, латентность)
+        self._state = BreakerState.CLOSED
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._consecutive_failures = 0
+        self.rejected = 0
+        self.opened_count = 0
+
+    @property
+    def state(self) -> BreakerState:
+        return self._state
+
+    def is_open(self) -> bool:
+        """Открыт и пробный вызов ещё не положен — вызывающим сразу идти в fallback"""
+        with self._lock:
+            if self._state == BreakerState.OPEN:
+                return time.monotonic() - self._opened_at < self.reset_timeout
+            return self._state == BreakerState.HALF_OPEN and self._probe_in_flight
+
+    def allow_request(self) -> bool:
+        with self._lock:
+            if self._state == BreakerState.CLOSED:
+                return True
+            if self._state == BreakerState.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self._transition(BreakerState.HALF_OPEN)
+            if self._state == BreakerState.HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            self.rejected += 1
+            return False
+
+    def cancel_request(self) -> None:
+        """Допущенный вызов не состоялся (сброшен квотой): освобождает место пробного вызова"""
+        with self._lock:
+            if self._state == BreakerState.HALF_OPEN:
+                self._probe_in_flight = False
+
+    def record_success(self, latency: float) -> None:
+        with self._lock:
+            self._outcomes.append((True, latency))
+            self._consecutive_failures = 0
+            if self._state == BreakerState.HALF_OPEN:
+                self._probe_in_flight = False
+                self._outcomes.clear()
+                self._transition(BreakerState.CLOSED)
+
+    def record_failure(self, latency: float) -> None:
+        with self._lock:
+            self._outcomes.append((False, latency))
+            self._consecutive_failures += 1
+            if self._state == BreakerState.HALF_OPEN:
+                self._probe_in_flight = False
+                self._open()
+            elif self._state == BreakerState.CLOSED and (
+                self._consecutive_failures >= self.failure_threshold
+                or (len(self._outcomes) >= self.min_calls and self._error_rate() >= self.error_rate_threshold)
+            ):
+                self._open()
+
+    def _open(self) -> None:
+        self._opened_at = time.monotonic()
+        self.opened_count += 1
+        self._transition(BreakerState.OPEN)
+
+    def _transition(self, state: BreakerState) -> None:
+        if state != self._state:
+            logger.warning(f"Circuit breaker {self.name}: {self._state.value} → {state.value}")
+            self._state = state
+
+    def _error_rate(self) -> float:
+        if not self._outcomes:
+            return 0.0
+        return sum(1 for ok, _ in self._outcomes if not ok) / len(self._outcomes)
+
+    def _latency_percentile(self, q: float) -> Optional[float]:
+        latencies = sorted(latency for _, latency in self._outcomes)
+        if not latencies:
+            return None
+        return round(latencies[min(len(latencies) - 1, int(q * len(latencies)))], 3)
+
+    def snapshot(self) -> Dict[str, object]:
+        with self._lock:
+            return {
+                "state": self._state.value,
+                "calls_in_window": len(self._outcomes),
+                "error_rate": round(self._error_rate(), 3),
+                "latency_p50": self._latency_percentile(0.5),
+                "latency_p95": self._latency_percentile(0.95),
+                "consecutive_failures": self._consecutive_failures,
+                "rejected": self.rejected,
+                "opened_count": self.opened_count,
+            }
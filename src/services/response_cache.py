@@ -0,0 +1,104 @@
+import hashlib
+import json
+import os
+import re
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from utils.logger import get_named_logger
+
+logger = get_named_logger()
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+class ResponseCache:
+    """
+    LRU-кеш ответов модели с TTL и сохранением на диск.
+
+    Ключ — точное совпадение (модель, контекст, системный промпт, нормализованный
+    пользовательский промпт). Файл переписывается атомарно раз в flush_every
+    новых записей и при явном flush().
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        max_entries: int = 2000,
+        ttl: float = 86400.0,
+        flush_every: int = 20,
+    ):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.flush_every = flush_every
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._dirty = 0
+        self.hits = 0
+        self.misses = 0
+        self._load()
+
+    @staticmethod
+    def make_key(model: str, context: str, system_prompt: str, user_prompt: str) -> str:
+        normalized = _WHITESPACE_RE.sub(" ", user_prompt).strip().casefold()
+        raw = "\x1f".join((model, context, system_prompt.strip(), normalized))
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        created_at, text = entry
+        if time.time() - created_at > self.ttl:
+            del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return text
+
+    def put(self, key: str, text: str) -> None:
+        self._entries[key] = (time.time(), text)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        self._dirty += 1
+        if self._dirty >= self.flush_every:
+            self.flush()
+
+    def flush(self) -> None:
+        if not self.path or not self._dirty:
+            return
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump([[key, created_at, text] for key, (created_at, text) in self._entries.items()], f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+            self._dirty = 0
+            logger.debug(f"Кеш ответов OpenAI сохранён: {len(self._entries)} записей")
+        except OSError as e:
+            logger.error(f"Не удалось сохранить кеш ответов OpenAI: {e}")
+
+    def _load(self) -> None:
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                rows = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Кеш ответов OpenAI не прочитан, начинаем с пустого: {e}")
+            return
+
+        now = time.time()
+        for key, created_at, text in rows[-self.max_entries:]:
+            if now - created_at <= self.ttl:
+                self._entries[key] = (created_at, text)
+        logger.info(f"Кеш ответов OpenAI загружен: {len(self._entries)} записей")
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries)}
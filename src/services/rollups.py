@@ -0,0 +1,273 @@
+import bisect
+import datetime
+import heapq
+import json
+import os
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from utils.logger import get_named_logger
+
+logger = get_named_logger()
+
+# Сколько диапазонов дней держим в памяти (они обновляются при каждой записи)
+_RANGE_CACHE_SIZE = 64
+# Длина поддерживаемого топа периода (по умолчанию — размер лидерборда)
+_TOP_SIZE = 10
+# Сколько записей копится в памяти, прежде чем дописаться в журнал
+_JOURNAL_EVERY = 20
+
+
+def day_key(day: datetime.date) -> str:
+    return f"d:{day.isoformat()}"
+
+
+def week_key(day: datetime.date) -> str:
+    year, week, _ = day.isocalendar()
+    return f"w:{year}-W{week:02d}"
+
+
+def month_key(day: datetime.date) -> str:
+    return f"m:{day.year}-{day.month:02d}"
+
+
+def period_keys(day: datetime.date) -> Tuple[str, str, str]:
+    return day_key(day), week_key(day), month_key(day)
+
+
+class _RankedCounter:
+    """
+    Счётчики пользователей периода + топ-K, который поддерживается при записи за O(K)
+    независимо от числа участников. Полный пересчёт (heapq за O(n log K)) —
+    только когда участник топа теряет отжимания или запрошен топ длиннее K.
+    """
+
+    __slots__ = ("counts", "total", "_top", "_top_size")
+
+    def __init__(self, top_size: int = _TOP_SIZE):
+        self.counts: Dict[int, int] = {}
+        self.total = 0
+        self._top: Optional[List[Tuple[int, int]]] = None  # (-количество, user_id) по возрастанию
+        self._top_size = top_size
+
+    @classmethod
+    def merged(cls, counters: Iterable["_RankedCounter"]) -> "_RankedCounter":
+        result = cls()
+        counts = result.counts
+        for counter in counters:
+            result.total += counter.total
+            for user_id, count in counter.counts.items():
+                counts[user_id] = counts.get(user_id, 0) + count
+        return result
+
+    def add(self, user_id: int, delta: int) -> None:
+        new = self.counts.get(user_id, 0) + delta
+        if new:
+            self.counts[user_id] = new
+        else:
+            self.counts.pop(user_id, None)
+        self.total += delta
+
+        top = self._top
+        if top is None:
+            return
+        position = next((i for i, (_, uid) in enumerate(top) if uid == user_id), None)
+        if delta < 0:
+            if position is not None:
+                self._top = None  # место мог занять кто-то вне топа — пересчитаем при чтении
+            return
+        if position is not None:
+            del top[position]
+        entry = (-new, user_id)
+        if new > 0 and (len(top) < self._top_size or entry < top[-1]):
+            bisect.insort(top, entry)
+            if len(top) > self._top_size:
+                top.pop()
+
+    def top(self, limit: int) -> List[Tuple[int, int]]:
+        if limit > self._top_size:
+            self._top_size = limit
+            self._top = None
+        if self._top is None:
+            self._top = heapq.nsmallest(
+                self._top_size, ((-count, user_id) for user_id, count in self.counts.items() if count > 0)
+            )
+        return [(user_id, -negative) for negative, user_id in self._top[:limit]]
+
+
+class RollupStore:
+    """
+    Инкрементальные сводки по дням, ISO-неделям и месяцам.
+
+    Каждый отчёт добавляет дельту в три ключа (день, неделя, месяц) — лидерборды
+    периода читаются без просмотра истории. Запрошенные диапазоны дней
+    собираются один раз и дальше обновляются той же дельтой. Изменения копятся
+    в памяти и дописываются в журнал пачками по journal_every, а также при flush
+    (закрытие дня, остановка бота); при закрытии дня журнал сворачивается в снимок.
+    Записи, потерянные при аварийной остановке, восстанавливает сверка
+    дневных итогов в BotService.rollover.
+    """
+
+    def __init__(self, path: Optional[str] = None, journal_every: int = _JOURNAL_EVERY):
+        self.path = path
+        self.journal_path = f"{path}.journal" if path else None
+        self.journal_every = journal_every
+        self._counters: Dict[str, _RankedCounter] = {}
+        self.closed_until: Optional[datetime.date] = None
+        self._ranges: Dict[Tuple[datetime.date, datetime.date], _RankedCounter] = {}
+        self._pending: List[str] = []
+        if path:
+            self._load()
+
+    # --- запись ---
+
+    def record(self, user_id: int, day: datetime.date, delta: int) -> None:
+        if not delta:
+            return
+        if self.closed_until is None or day - datetime.timedelta(days=1) > self.closed_until:
+            # Первый отчёт нового дня закрывает предыдущие
+            self.close_day(day - datetime.timedelta(days=1))
+        self._apply(user_id, day, delta)
+        if self.journal_path:
+            self._pending.append(f'["{day.isoformat()}",{user_id},{delta}]\n')
+            if len(self._pending) >= self.journal_every:
+                self.flush_journal()
+
+    def record_many(self, deltas: Iterable[Tuple[int, datetime.date, int]]) -> None:
+        """Пакетная запись (импорт истории): журнал не пишется, сразу снимок"""
+        self._ranges.clear()
+        for user_id, day, delta in deltas:
+            if delta:
+                self._apply(user_id, day, delta)
+        self.flush()
+
+    def _apply(self, user_id: int, day: datetime.date, delta: int) -> None:
+        for key in period_keys(day):
+            counter = self._counters.get(key)
+            if counter is None:
+                counter = self._counters[key] = _RankedCounter()
+            counter.add(user_id, delta)
+        for (start, end), counter in self._ranges.items():
+            if start <= day <= end:
+                counter.add(user_id, delta)
+
+    def reset(self) -> None:
+        """Удаляет все сводки (пересчёт истории с нуля)"""
+        self._counters.clear()
+        self._ranges.clear()
+        self.closed_until = None
+        self.flush()
+
+    def close_day(self, day: datetime.date) -> None:
+        """Закрывает дни до day включительно: журнал сворачивается в снимок"""
+        if self.closed_until is not None and day <= self.closed_until:
+            return
+        self.closed_until = day
+        self.flush()
+        logger.info(f"Сводки закрыты по {day}")
+
+    # --- чтение ---
+
+    def value(self, key: str, user_id: int) -> int:
+        counter = self._counters.get(key)
+        return counter.counts.get(user_id, 0) if counter is not None else 0
+
+    def top(self, key: str, limit: int) -> Tuple[List[Tuple[int, int]], int]:
+        """(топ-N [(user_id, количество)], сумма по периоду)"""
+        counter = self._counters.get(key)
+        if counter is None:
+            return [], 0
+        return counter.top(limit), counter.total
+
+    def days(self) -> List[Tuple[datetime.date, int, int]]:
+        """Итоги по дням: [(день, участников, отжиманий)] по возрастанию дат"""
+        return sorted(
+            (datetime.date.fromisoformat(key[2:]), sum(1 for c in counter.counts.values() if c > 0), counter.total)
+            for key, counter in self._counters.items() if key.startswith("d:")
+        )
+
+    def top_range(self, start: datetime.date, end: datetime.date, limit: int) -> Tuple[List[Tuple[int, int]], int]:
+        """Топ за диапазон дней [start, end]: собирается один раз, дальше обновляется при записи"""
+        counter = self._ranges.pop((start, end), None)
+        if counter is None:
+            counter = _RankedCounter.merged(
+                self._counters[day_key(day)]
+                for day in (start + datetime.timedelta(days=i) for i in range((end - start).days + 1))
+                if day_key(day) in self._counters
+            )
+            if len(self._ranges) >= _RANGE_CACHE_SIZE:
+                self._ranges.pop(next(iter(self._ranges)))
+        self._ranges[(start, end)] = counter  # в конец — вытесняются давно не запрошенные
+        return counter.top(limit), counter.total
+
+    # --- резервное копирование ---
+
+    def dump(self) -> Tuple[Optional[datetime.date], Dict[str, Dict[int, int]]]:
+        """(дни закрыты по, {период: {user_id: количество}})"""
+        return self.closed_until, {key: dict(counter.counts) for key, counter in self._counters.items()}
+
+    def restore(self, closed_until: Optional[datetime.date], periods: Dict[str, Dict[int, int]]) -> None:
+        """Заменяет все сводки данными из резервной копии"""
+        self._counters.clear()
+        self._ranges.clear()
+        self.closed_until = closed_until
+        for key, counts in periods.items():
+            self._fill(key, counts)
+        self.flush()
+
+    def _fill(self, key: str, counts: Dict[int, int]) -> None:
+        counter = self._counters[key] = _RankedCounter()
+        for user_id, count in counts.items():
+            counter.add(int(user_id), count)
+
+    # --- хранение ---
+
+    def flush_journal(self) -> None:
+        """Дописывает накопленные записи в журнал"""
+        if not self._pending:
+            return
+        with open(self.journal_path, "a", encoding="utf-8") as f:
+            f.writelines(self._pending)
+        self._pending.clear()
+
+    def flush(self) -> None:
+        """Атомарно пишет снимок и очищает журнал"""
+        if not self.path:
+            return
+        self._pending.clear()  # уже учтены в снимке
+        data = {
+            "closed_until": self.closed_until.isoformat() if self.closed_until else None,
+            "keys": {key: counter.counts for key, counter in self._counters.items()},
+        }
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, separators=(",", ":"))
+        os.replace(tmp_path, self.path)
+        if os.path.exists(self.journal_path):
+            os.remove(self.journal_path)
+
+    def _load(self) -> None:
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                closed = data.get("closed_until")
+                self.closed_until = datetime.date.fromisoformat(closed) if closed else None
+                for key, counts in data.get("keys", {}).items():
+                    self._fill(key, counts)
+            except Exception as e:
+                logger.error(f"Ошибка при загрузке сводок {self.path}: {e}")
+
+        replayed = 0
+        if os.path.exists(self.journal_path):
+            with open(self.journal_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        day, user_id, delta = json.loads(line)
+                    except ValueError:
+                        continue  # недописанная строка после аварийной остановки
+                    self._apply(user_id, datetime.date.fromisoformat(day), delta)
+                    replayed += 1
+        logger.info(f"Сводки загружены: {len(self._counters)} периодов, из журнала {replayed} записей")
+
+    def __len__(self) -> int:
+        return len(self._counters)
@@ -0,0 +1,440 @@
+import datetime
+import json
+import sqlite3
+import threading
+import time
+from typing import Callable, Dict, Iterable, Iterator, List, MutableMapping, Optional, Tuple, TypeVar
+
+from models.bot_models import BotConfig, UserRecord
+from services.data_service import Storage, _USER_RECORD_ADAPTER
+from services.rollups import day_key, period_keys
+from utils.logger import get_named_logger
+
+logger = get_named_logger()
+
+T = TypeVar("T")
+
+# Файлы с этими суффиксами открываются как общее SQLite-хранилище
+SQLITE_SUFFIXES = (".sqlite", ".sqlite3", ".db")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS users (user_id INTEGER PRIMARY KEY, body TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS leases (name TEXT PRIMARY KEY, owner TEXT NOT NULL, expires_at REAL NOT NULL);
+CREATE TABLE IF NOT EXISTS rollups (
+    period TEXT NOT NULL, user_id INTEGER NOT NULL, pushups INTEGER NOT NULL,
+    PRIMARY KEY (period, user_id)
+);
+CREATE INDEX IF NOT EXISTS rollups_rank ON rollups (period, pushups DESC);
+CREATE TABLE IF NOT EXISTS rollup_totals (period TEXT PRIMARY KEY, pushups INTEGER NOT NULL);
+"""
+
+
+class SqliteUserMap(MutableMapping):
+    """
+    Пользователи в общей SQLite-базе: каждое чтение видит записи других воркеров,
+    каждая запись — отдельная транзакция.
+    """
+
+    def __init__(self, store: "SqliteStorage"):
+        self._store = store
+
+    def __getitem__(self, user_id: int) -> UserRecord:
+        row = self._store.execute("SELECT body FROM users WHERE user_id = ?", (user_id,)).fetchone()
+        if row is None:
+            raise KeyError(user_id)
+        return _USER_RECORD_ADAPTER.validate_json(row[0])
+
+    def __setitem__(self, user_id: int, user: UserRecord) -> None:
+        self._store.write_users({user_id: user})
+
+    def __delitem__(self, user_id: int) -> None:
+        with self._store.transaction() as conn:
+            if conn.execute("DELETE FROM users WHERE user_id = ?", (user_id,)).rowcount == 0:
+                raise KeyError(user_id)
+            self._store.bump(conn, "users_version")
+
+    def __contains__(self, user_id: object) -> bool:
+        return self._store.execute("SELECT 1 FROM users WHERE user_id = ?", (user_id,)).fetchone() is not None
+
+    def __iter__(self) -> Iterator[int]:
+        return iter([row[0] for row in self._store.execute("SELECT user_id FROM users")])
+
+    def __len__(self) -> int:
+        return self._store.execute("SELECT COUNT(*) FROM users").fetchone()[0]
+
+    def items(self) -> Iterator[Tuple[int, UserRecord]]:
+        # Один SELECT вместо запроса на каждого пользователя
+        rows = self._store.execute("SELECT user_id, body FROM users").fetchall()
+        return iter([(uid, _USER_RECORD_ADAPTER.validate_json(body)) for uid, body in rows])
+
+    def values(self) -> Iterator[UserRecord]:
+        return (user for _, user in self.items())
+
+    def update(self, users: MutableMapping[int, UserRecord]) -> None:
+        # Пакетная запись одной транзакцией (сброс дневных счётчиков, импорт)
+        if users:
+            self._store.write_users(dict(users))
+
+    def modify(self, user_id: int, create: Callable[[], UserRecord], change: Callable[[UserRecord], T]) -> Tuple[UserRecord, T]:
+        """
+        Чтение, изменение и запись под BEGIN IMMEDIATE: отчёты, пришедшие
+        в разные воркеры одновременно, применяются по очереди, а не затирают друг друга.
+        """
+        with self._store.transaction() as conn:
+            row = conn.execute("SELECT body FROM users WHERE user_id = ?", (user_id,)).fetchone()
+            user = _USER_RECORD_ADAPTER.validate_json(row[0]) if row else create()
+            result = change(user)
+            self._store.upsert_users(conn, {user_id: user})
+        return user, result
+
+    def counters(self) -> "SqliteUserCounters":
+        return SqliteUserCounters(self._store)
+
+    @property
+    def version(self) -> int:
+        """Счётчик изменений пользователей во всех воркерах"""
+        return self._store.read_counter("users_version")
+
+
+class SqliteUserCounters:
+    """
+    Итоги по пользователям (интерфейс UserCounters) агрегатами SQLite над JSON-телами:
+    записи не разбираются в Python, а итоги учитывают изменения других воркеров.
+    """
+
+    _REPORTED = "json_extract(body, '$.last_report_date')"
+    _DIRTY = "(json_extract(body, '$.reported_today') OR json_extract(body, '$.pushups_today'))"
+
+    def __init__(self, store: "SqliteStorage"):
+        self._store = store
+
+    @property
+    def total_all(self) -> int:
+        return self._store.execute(
+            "SELECT COALESCE(SUM(json_extract(body, '$.total_pushups')), 0) FROM users"
+        ).fetchone()[0]
+
+    def today(self) -> Tuple[int, int]:
+        reporters, pushups = self._store.execute(
+            f"SELECT COUNT(*), COALESCE(SUM(json_extract(body, '$.pushups_today')), 0) FROM users WHERE {self._DIRTY}"
+        ).fetchone()
+        return reporters, pushups
+
+    def reporters(self) -> List[int]:
+        rows = self._store.execute(f"SELECT user_id FROM users WHERE {self._DIRTY}")
+        return [row[0] for row in rows]
+
+    def stale(self, today: datetime.date) -> List[int]:
+        rows = self._store.execute(
+            f"SELECT user_id FROM users WHERE {self._DIRTY} AND {self._REPORTED} IS NOT ?", (today.isoformat(),)
+        )
+        return [row[0] for row in rows]
+
+    def top_total(self, limit: int) -> List[int]:
+        rows = self._store.execute(
+            "SELECT user_id FROM users ORDER BY json_extract(body, '$.total_pushups') DESC LIMIT ?", (limit,)
+        )
+        return [row[0] for row in rows]
+
+
+class SqliteStorage:
+    """
+    Общее хранилище для нескольких воркеров: SQLite в режиме WAL.
+
+    Повторяет интерфейс Storage (load/save), но пользователи пишутся построчно
+    в момент изменения, а конфиг — только когда он действительно поменялся,
+    чтобы воркер со старой копией не затирал чужие правки.
+    Здесь же — аренды (leases) для выбора лидера планировщика.
+    """
+
+    def __init__(self, path: str, busy_timeout: float = 5.0):
+        self.path = path
+        self.compact = False
+        self.busy_timeout = busy_timeout
+        self._local = threading.local()
+        self._config_seen: Optional[str] = None
+        self._connection().executescript(_SCHEMA)
+
+    @staticmethod
+    def handles(path: str) -> bool:
+        return path.endswith(SQLITE_SUFFIXES)
+
+    # --- соединение ---
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # autocommit: транзакции открываем явно через BEGIN IMMEDIATE
+            conn = sqlite3.connect(self.path, timeout=self.busy_timeout, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def execute(self, sql: str, params: tuple = ()) -> sqlite3.Cursor:
+        return self._connection().execute(sql, params)
+
+    def transaction(self) -> "_Transaction":
+        return _Transaction(self._connection())
+
+    @staticmethod
+    def bump(conn: sqlite3.Connection, key: str) -> None:
+        conn.execute(
+            "INSERT INTO meta (key, value) VALUES (?, '1') "
+            "ON CONFLICT(key) DO UPDATE SET value = CAST(value AS INTEGER) + 1",
+            (key,),
+        )
+
+    def read_counter(self, key: str) -> int:
+        row = self.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return int(row[0]) if row else 0
+
+    # --- интерфейс Storage ---
+
+    def load(self) -> Dict:
+        """Конфиг из базы (или по умолчанию) и живое отображение пользователей"""
+        row = self.execute("SELECT value FROM meta WHERE key = 'config'").fetchone()
+        config = None
+        if row:
+            try:
+                config = BotConfig.model_validate_json(row[0])
+                self._config_seen = row[0]
+            except Exception as e:
+                logger.error(f"Ошибка при загрузке конфига из {self.path}: {e}")
+        users = SqliteUserMap(self)
+        logger.info(f"Общее хранилище {self.path}: {len(users)} пользователей")
+        return {
+            "config": config or Storage.default_config(),
+            "user_data": users,
+        }
+
+    def save(self, config: BotConfig, user_data: MutableMapping[int, UserRecord]) -> None:
+        try:
+            config_json = config.model_dump_json()
+            with self.transaction() as conn:
+                if config_json != self._config_seen:
+                    conn.execute(
+                        "INSERT INTO meta (key, value) VALUES ('config', ?) "
+                        "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+                        (config_json,),
+                    )
+                    self.bump(conn, "config_version")
+                if not isinstance(user_data, SqliteUserMap):
+                    # Импорт/миграция из обычного словаря; живая карта пишет себя сама
+                    self.upsert_users(conn, user_data)
+            self._config_seen = config_json
+            logger.info("Данные успешно сохранены")
+        except Exception as e:
+            logger.error(f"Ошибка при сохранении данных: {e}")
+
+    def iter_raw_users(self, header: Optional[Dict] = None) -> Iterator[Tuple[int, dict]]:
+        """Как Storage.iter_raw_users: конфиг — в header, затем сырые записи пользователей"""
+        header = header if header is not None else {}
+        row = self.execute("SELECT value FROM meta WHERE key = 'config'").fetchone()
+        if row:
+            header["config"] = json.loads(row[0])
+        for uid, body in self.execute("SELECT user_id, body FROM users ORDER BY user_id"):
+            yield uid, json.loads(body)
+
+    def change_marker(self) -> Tuple[int, ...]:
+        """Счётчики изменений пользователей, конфига и сводок — как Storage.change_marker"""
+        keys = ("users_version", "config_version", "rollups_version")
+        values = dict(self.execute(
+            f"SELECT key, value FROM meta WHERE key IN ({', '.join('?' * len(keys))})", keys
+        ).fetchall())
+        return tuple(int(values.get(key, 0)) for key in keys)
+
+    def reload_config_if_changed(self) -> Optional[BotConfig]:
+        """Новый конфиг, если его поменял другой воркер, иначе None"""
+        row = self.execute("SELECT value FROM meta WHERE key = 'config'").fetchone()
+        if row is None or row[0] == self._config_seen:
+            return None
+        self._config_seen = row[0]
+        return BotConfig.model_validate_json(row[0])
+
+    def write_users(self, users: Dict[int, UserRecord]) -> None:
+        with self.transaction() as conn:
+            self.upsert_users(conn, users)
+
+    def upsert_users(self, conn: sqlite3.Connection, users: MutableMapping[int, UserRecord]) -> None:
+        conn.executemany(
+            "INSERT INTO users (user_id, body) VALUES (?, ?) "
+            "ON CONFLICT(user_id) DO UPDATE SET body = excluded.body",
+            [(uid, _USER_RECORD_ADAPTER.dump_json(user).decode()) for uid, user in users.items()],
+        )
+        self.bump(conn, "users_version")
+
+    def open_rollups(self) -> "SqliteRollupStore":
+        return SqliteRollupStore(self)
+
+    # --- аренда лидера ---
+
+    def try_acquire_lease(self, name: str, owner: str, ttl: float) -> bool:
+        """
+        Захватывает или продлевает аренду name на ttl секунд.
+        Удаётся, если аренда свободна, истекла или уже принадлежит owner.
+        """
+        now = time.time()
+        with self.transaction() as conn:
+            conn.execute(
+                "INSERT INTO leases (name, owner, expires_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(name) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at "
+                "WHERE leases.owner = excluded.owner OR leases.expires_at < ?",
+                (name, owner, now + ttl, now),
+            )
+            row = conn.execute("SELECT owner FROM leases WHERE name = ?", (name,)).fetchone()
+        return row is not None and row[0] == owner
+
+    def release_lease(self, name: str, owner: str) -> None:
+        with self.transaction() as conn:
+            conn.execute("DELETE FROM leases WHERE name = ? AND owner = ?", (name, owner))
+
+    def lease_holder(self, name: str) -> Optional[Tuple[str, float]]:
+        row = self.execute("SELECT owner, expires_at FROM leases WHERE name = ?", (name,)).fetchone()
+        return (row[0], row[1]) if row else None
+
+
+class SqliteRollupStore:
+    """
+    Сводки по периодам в общей базе (интерфейс RollupStore).
+    Топ периода читается по индексу (period, pushups DESC) — O(N) строк.
+    """
+
+    def __init__(self, store: SqliteStorage):
+        self._store = store
+
+    @property
+    def closed_until(self) -> Optional[datetime.date]:
+        row = self._store.execute("SELECT value FROM meta WHERE key = 'rollups_closed_until'").fetchone()
+        return datetime.date.fromisoformat(row[0]) if row else None
+
+    def record(self, user_id: int, day: datetime.date, delta: int) -> None:
+        if delta:
+            self.record_many([(user_id, day, delta)])
+
+    def record_many(self, deltas: Iterable[Tuple[int, datetime.date, int]]) -> None:
+        rows = [(key, user_id, delta) for user_id, day, delta in deltas if delta for key in period_keys(day)]
+        with self._store.transaction() as conn:
+            conn.executemany(
+                "INSERT INTO rollups (period, user_id, pushups) VALUES (?, ?, ?) "
+                "ON CONFLICT(period, user_id) DO UPDATE SET pushups = pushups + excluded.pushups",
+                rows,
+            )
+            conn.executemany(
+                "INSERT INTO rollup_totals (period, pushups) VALUES (?, ?) "
+                "ON CONFLICT(period) DO UPDATE SET pushups = pushups + excluded.pushups",
+                [(key, delta) for key, _, delta in rows],
+            )
+            self._store.bump(conn, "rollups_version")
+
+    def reset(self) -> None:
+        with self._store.transaction() as conn:
+            conn.execute("DELETE FROM rollups")
+            conn.execute("DELETE FROM rollup_totals")
+            conn.execute("DELETE FROM meta WHERE key = 'rollups_closed_until'")
+            self._store.bump(conn, "rollups_version")
+
+    def close_day(self, day: datetime.date) -> None:
+        with self._store.transaction() as conn:
+            conn.execute(
+                "INSERT INTO meta (key, value) VALUES ('rollups_closed_until', ?) "
+                "ON CONFLICT(key) DO UPDATE SET value = MAX(value, excluded.value)",
+                (day.isoformat(),),
+            )
+            self._store.bump(conn, "rollups_version")
+
+    def value(self, key: str, user_id: int) -> int:
+        row = self._store.execute(
+            "SELECT pushups FROM rollups WHERE period = ? AND user_id = ?", (key, user_id)
+        ).fetchone()
+        return row[0] if row else 0
+
+    def top(self, key: str, limit: int) -> Tuple[List[Tuple[int, int]], int]:
+        rows = self._store.execute(
+            "SELECT user_id, pushups FROM rollups WHERE period = ? AND pushups > 0 "
+            "ORDER BY pushups DESC LIMIT ?",
+            (key, limit),
+        ).fetchall()
+        total = self._store.execute("SELECT pushups FROM rollup_totals WHERE period = ?", (key,)).fetchone()
+        return [(user_id, pushups) for user_id, pushups in rows], total[0] if total else 0
+
+    def days(self) -> List[Tuple[datetime.date, int, int]]:
+        rows = self._store.execute(
+            "SELECT t.period, "
+            "(SELECT COUNT(*) FROM rollups r WHERE r.period = t.period AND r.pushups > 0), t.pushups "
+            "FROM rollup_totals t WHERE t.period LIKE 'd:%' ORDER BY t.period"
+        ).fetchall()
+        return [(datetime.date.fromisoformat(period[2:]), reporters, pushups) for period, reporters, pushups in rows]
+
+    def top_range(self, start: datetime.date, end: datetime.date, limit: int) -> Tuple[List[Tuple[int, int]], int]:
+        bounds = (day_key(start), day_key(end))
+        rows = self._store.execute(
+            "SELECT user_id, SUM(pushups) AS s FROM rollups WHERE period BETWEEN ? AND ? "
+            "GROUP BY user_id HAVING s > 0 ORDER BY s DESC LIMIT ?",
+            (*bounds, limit),
+        ).fetchall()
+        total = self._store.execute(
+            "SELECT COALESCE(SUM(pushups), 0) FROM rollup_totals WHERE period BETWEEN ? AND ?", bounds
+        ).fetchone()
+        return [(user_id, pushups) for user_id, pushups in rows], total[0]
+
+    def dump(self) -> Tuple[Optional[datetime.date], Dict[str, Dict[int, int]]]:
+        periods: Dict[str, Dict[int, int]] = {}
+        for period, user_id, pushups in self._store.execute("SELECT period, user_id, pushups FROM rollups"):
+            periods.setdefault(period, {})[user_id] = pushups
+        return self.closed_until, periods
+
+    def restore(self, closed_until: Optional[datetime.date], periods: Dict[str, Dict[int, int]]) -> None:
+        with self._store.transaction() as conn:
+            conn.execute("DELETE FROM rollups")
+            conn.execute("DELETE FROM rollup_totals")
+            conn.execute("DELETE FROM meta WHERE key = 'rollups_closed_until'")
+            conn.executemany(
+                "INSERT INTO rollups (period, user_id, pushups) VALUES (?, ?, ?)",
+                [(key, user_id, count) for key, counts in periods.items() for user_id, count in counts.items()],
+            )
+            conn.executemany(
+                "INSERT INTO rollup_totals (period, pushups) VALUES (?, ?)",
+                [(key, sum(counts.values())) for key, counts in periods.items()],
+            )
+            if closed_until is not None:
+                conn.execute(
+                    "INSERT INTO meta (key, value) VALUES ('rollups_closed_until', ?)", (closed_until.isoformat(),)
+                )
+            self._store.bump(conn, "rollups_version")
+
+    def flush(self) -> None:
+        pass  # каждая запись — уже транзакция
+
+    def __len__(self) -> int:
+        return self._store.execute("SELECT COUNT(*) FROM rollup_totals").fetchone()[0]
+
+
+class _Transaction:
+    """BEGIN IMMEDIATE … COMMIT/ROLLBACK: писатели сериализуются на уровне базы"""
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+
+    def __enter__(self) -> sqlite3.Connection:
+        self.conn.execute("BEGIN IMMEDIATE")
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.conn.execute("ROLLBACK" if exc_type else "COMMIT")
+
+
+def import_json_storage(source: str, target: str) -> int:
+    """Переносит данные из JSON/ndjson-хранилища в SQLite; возвращает число пользователей"""
+    loaded = Storage(source).load()
+    store = SqliteStorage(target)
+    store.save(loaded["config"], loaded["user_data"])
+    return len(loaded["user_data"])
+
+
+def open_storage(path: str, lazy: bool = False):
+    """Storage для файлов JSON/ndjson, SqliteStorage — для .sqlite/.db"""
+    if SqliteStorage.handles(path):
+        return SqliteStorage(path)
+    return Storage(path, lazy=lazy)
@@ -0,0 +1,164 @@
+import time
+from collections import Counter, OrderedDict
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+from aiogram import BaseMiddleware, Bot
+from aiogram.types import Message
+
+from models.bot_models import ThrottleKind
+from services.message_filter import MessageFilter
+from services.render_cache import RenderCache, command_key
+from utils.logger import get_named_logger
+from utils.token_bucket import TokenBucket
+
+logger = get_named_logger()
+
+# Команды статистики, ограничиваемые лимитом stats
+_STATS_COMMANDS = {"stats", "mystats", "adminstats"}
+# Сверх лимита отвечаем последним отрендеренным ответом — только там, где нет проверки прав:
+# ответ из кеша не проходит _check_admin, и /adminstats отдал бы чужую админскую сводку
+_CACHED_COMMANDS = {"stats", "mystats"}
+
+
+@dataclass(frozen=True, slots=True)
+class ThrottleRule:
+    burst: float
+    per_minute: float
+
+    def bucket(self, now: float) -> TokenBucket:
+        return TokenBucket(self.burst, self.per_minute / 60, now=now)
+
+    @property
+    def refill_seconds(self) -> float:
+        """За сколько опустевший bucket наполняется целиком"""
+        return self.burst / (self.per_minute / 60) if self.per_minute > 0 else float("inf")
+
+
+class RateLimiter:
+    """
+    Token bucket'ы на пользователя и на чат для каждого класса запросов.
+
+    Память ограничена: bucket'ы лежат в LRU не больше max_entries, а простаивающие
+    дольше idle_ttl (к этому моменту они заведомо полны) вытесняются — удаление
+    полного bucket'а ничего не меняет в поведении.
+    """
+
+    def __init__(
+        self,
+        user_rules: Dict[ThrottleKind, ThrottleRule],
+        chat_rules: Dict[ThrottleKind, ThrottleRule],
+        max_entries: int = 50_000,
+        idle_ttl: float = 600.0,
+    ):
+        self.user_rules = user_rules
+        self.chat_rules = chat_rules
+        self.max_entries = max_entries
+        slowest = max((r.refill_seconds for r in (*user_rules.values(), *chat_rules.values())), default=0.0)
+        self.idle_ttl = max(idle_ttl, slowest)
+        self._buckets: "OrderedDict[Hashable, TokenBucket]" = OrderedDict()
+        self.stats: Counter = Counter()
+
+    def allow(self, kind: ThrottleKind, user_id: int, chat_id: int, now: Optional[float] = None) -> bool:
+        """Списывает по токену из bucket'ов пользователя и чата; False — запрос сверх лимита"""
+        now = time.monotonic() if now is None else now
+        self._evict_idle(now)
+
+        user_bucket = self._bucket(("user", kind, user_id), self.user_rules.get(kind), now)
+        chat_bucket = self._bucket(("chat", kind, chat_id), self.chat_rules.get(kind), now)
+
+        # Сначала проверяем оба, потом списываем — отказ не тратит токен второго bucket'а
+        if user_bucket is not None and user_bucket.available(now) < 1:
+            self.stats[f"{kind.value}:user"] += 1
+            return False
+        if chat_bucket is not None and chat_bucket.available(now) < 1:
+            self.stats[f"{kind.value}:chat"] += 1
+            return False
+        for bucket in (user_bucket, chat_bucket):
+            if bucket is not None:
+                bucket.try_consume(1, now=now)
+        self.stats[f"{kind.value}:allowed"] += 1
+        return True
+
+    def _bucket(self, key: Tuple, rule: Optional[ThrottleRule], now: float) -> Optional[TokenBucket]:
+        if rule is None:
+            return None
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = rule.bucket(now)
+            self._buckets[key] = bucket
+            if len(self._buckets) > self.max_entries:
+                self._buckets.popitem(last=False)
+                self.stats["evicted_lru"] += 1
+        else:
+            self._buckets.move_to_end(key)
+        return bucket
+
+    def _evict_idle(self, now: float) -> None:
+        # Самые давние — в начале; bucket.updated обновляется при каждом обращении
+        while self._buckets:
+            key, bucket = next(iter(self._buckets.items()))
+            if now - bucket.updated < self.idle_ttl:
+                break
+            del self._buckets[key]
+            self.stats["evicted_idle"] += 1
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+class ThrottlingMiddleware(BaseMiddleware):
+    """
+    Лимит частоты входящих сообщений до хендлеров.
+
+    Отчёты и упоминания сверх лимита молча отбрасываются, /stats и /mystats
+    получают последний отрендеренный ответ из RenderCache (если он есть),
+    /adminstats — отбрасывается.
+    Прочие команды не ограничиваются. Болтовня, которую всё равно отсеет
+    префильтр, лимит отчётов не расходует.
+    """
+
+    def __init__(
+        self,
+        limiter: RateLimiter,
+        render_cache: Optional[RenderCache] = None,
+        prefilter: Optional[MessageFilter] = None,
+    ):
+        self.limiter = limiter
+        self.render_cache = render_cache
+        self.prefilter = prefilter
+
+    async def __call__(
+        self,
+        handler: Callable[[Message, Dict[str, Any]], Awaitable[Any]],
+        event: Message,
+        data: Dict[str, Any],
+    ) -> Any:
+        if event.from_user is None:
+            return await handler(event, data)
+
+        kind, command = await self._classify(event, data.get("bot"))
+        if kind is ThrottleKind.REPORT and self.prefilter is not None and self.prefilter.reason(event):
+            return await handler(event, data)
+        if kind is None or self.limiter.allow(kind, event.from_user.id, event.chat.id):
+            return await handler(event, data)
+
+        logger.debug(f"Лимит {kind.value}: @{event.from_user.username} ({event.from_user.id}) в чате {event.chat.id}")
+        if command in _CACHED_COMMANDS and self.render_cache is not None:
+            args = (event.text or "").split()[1:]
+            cached = self.render_cache.peek(event.chat.id, command_key(command, args, event.from_user.id))
+            if cached is not None:
+                await event.answer(cached)
+        return None
+
+    @staticmethod
+    async def _classify(message: Message, bot: Optional[Bot]) -> Tuple[Optional[ThrottleKind], Optional[str]]:
+        text = message.text or message.caption or ""
+        if text.startswith("/"):
+            command = text.split(maxsplit=1)[0][1:].split("@", 1)[0].lower()
+            return (ThrottleKind.STATS, command) if command in _STATS_COMMANDS else (None, command)
+        if bot is not None and "@" in text:
+            me = await bot.me()
+            if me.username and f"@{me.username}" in text:
+                return ThrottleKind.MENTION, None
+        return ThrottleKind.REPORT, None
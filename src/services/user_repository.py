@@ -1,32 +1,93 @@
 import datetime
-from typing import Dict, Optional
+from typing import Callable, MutableMapping, Optional, Tuple, TypeVar
 
-from models.bot_models import UserInfo
+from models.bot_models import UserRecord
+
+T = TypeVar("T")
 
 
 class UserRepository:
-    def __init__(self, user_data: Optional[Dict[int, UserInfo]] = None):
-        self.users: Dict[int, UserInfo] = user_data or {}
+    def __init__(self, user_data: Optional[MutableMapping[int, UserRecord]] = None):
+        self.users: MutableMapping[int, UserRecord] = user_data if user_data is not None else {}
+        # Растёт на каждую мутацию — по нему инвалидируются кеши отрендеренной статистики
+        self._version = 0
+
+    @property
+    def version(self):
+        # Общее хранилище ведёт свой счётчик — он учитывает изменения других воркеров
+        shared = getattr(self.users, "version", None)
+        return self._version if shared is None else (self._version, shared)
 
-    def get(self, user_id: int) -> Optional[UserInfo]:
+    def get(self, user_id: int) -> Optional[UserRecord]:
         return self.users.get(user_id)
 
-    def add_or_update(self, user_id: int, user: UserInfo):
+    def add_or_update(self, user_id: int, user: UserRecord):
         self.users[user_id] = user
+        self._version += 1
+
+    def modify(self, user_id: int, create: Callable[[], UserRecord], change: Callable[[UserRecord], T]) -> Tuple[UserRecord, T]:
+        """
+        Читает пользователя (или создаёт через create), применяет change и записывает —
+        в общем хранилище одной транзакцией. Возвращает запись и результат change.
+        """
+        modify = getattr(self.users, "modify", None)
+        if modify is not None:
+            user, result = modify(user_id, create, change)
+        else:
+            user = self.users.get(user_id) or create()
+            result = change(user)
+            self.users[user_id] = user
+        self._version += 1
+        return user, result
 
     def remove(self, user_id: int):
         if user_id in self.users:
             del self.users[user_id]
+            self._version += 1
 
-    def all(self) -> Dict[int, UserInfo]:
+    def all(self) -> MutableMapping[int, UserRecord]:
         return self.users
 
-    def get_active_today(self, today: Optional[datetime.date] = None):
-        today = today or datetime.date.today()
-        return {
-            uid: u for uid, u in self.users.items()
-            if u.last_report_date == today
-        }
+    def _counters(self):
+        # Ленивое хранилище ведёт бегущие итоги (UserCounters) — тогда всех не перебираем
+        counters = getattr(self.users, "counters", None)
+        return counters() if counters is not None else None
+
+    def get_active_today(self):
+        # Дневные счётчики относятся к config.counters_date: прошедший день
+        # закрывает BotService.ensure_day до чтения — дату по каждому не сверяем
+        counters = self._counters()
+        if counters is not None:
+            return {uid: self.users[uid] for uid in counters.reporters()}
+        return {uid: u for uid, u in self.users.items() if u.reported_today or u.pushups_today}
+
+    def count_active_today(self) -> int:
+        counters = self._counters()
+        if counters is not None:
+            return counters.today()[0]
+        return len(self.get_active_today())
+
+    def reset_daily(self, today: datetime.date):
+        """
+        Обнуляет дневные счётчики всех, кто отчитывался не сегодня, одной записью.
+        Возвращает их состояние до сброса: {user_id: (день отчёта, отжиманий за день)}.
+        """
+        counters = self._counters()
+        if counters is not None:
+            stale = {uid: self.users[uid] for uid in counters.stale(today)}
+        else:
+            stale = {
+                uid: u for uid, u in self.users.items()
+                if (u.reported_today or u.pushups_today) and not u.reported_on(today)
+            }
+        closed = {uid: (u.last_report_date, u.pushups_today) for uid, u in stale.items()}
+        for user in stale.values():
+            user.pushups_today = 0
+            user.reported_today = False
+        if stale:
+            self.users.update(stale)
+            self._version += 1
+        return closed
 
     def get_inactive_for_days(self, days: int, now: Optional[datetime.datetime] = None):
         now = now or datetime.datetime.now()
@@ -35,22 +96,32 @@ class UserRepository:
             if (now - u.last_activity).days >= days
         }
 
-    def total_pushups_today(self, today: Optional[datetime.date] = None) -> int:
-        return sum(u.pushups_today for u in self.get_active_today(today).values())
+    def total_pushups_today(self) -> int:
+        counters = self._counters()
+        if counters is not None:
+            return counters.today()[1]
+        return sum(u.pushups_today for u in self.users.values())
 
     def total_pushups_all_time(self) -> int:
+        counters = self._counters()
+        if counters is not None:
+            return counters.total_all
         return sum(u.total_pushups for u in self.users.values())
 
-    def sorted_by_pushups_today(self, today: Optional[datetime.date] = None):
+    def sorted_by_pushups_today(self):
         return sorted(
-            self.get_active_today(today).items(),
+            self.get_active_today().items(),
             key=lambda x: x[1].pushups_today,
             reverse=True
         )
 
-    def sorted_by_total_pushups(self):
-        return sorted(
+    def sorted_by_total_pushups(self, limit: Optional[int] = None):
+        counters = self._counters()
+        if counters is not None and limit is not None:
+            return [(uid, self.users[uid]) for uid in counters.top_total(limit)]
+        ranked = sorted(
             self.users.items(),
             key=lambda x: x[1].total_pushups,
             reverse=True
         )
+        return ranked if limit is None else ranked[:limit]
@@ -0,0 +1,35 @@
+import datetime
+
+import pytest
+
+import backup as backup_cli
+from models.bot_models import BotConfig, UserRecord
+from services.backup import BackupManager
+from services.shared_store import open_storage
+
+DAY = datetime.date(2026, 3, 10)
+CONFIG = BotConfig(challenge_start_date=DAY, challenge_end_date=DAY + datetime.timedelta(days=30))
+
+
+@pytest.mark.parametrize("name", ["data.json", "data.sqlite"])
+def test_backup_restores_users_and_rollups(tmp_path, name):
+    storage = open_storage(str(tmp_path / name))
+    storage.save(CONFIG, {1: UserRecord(username="a", total_pushups=40)})
+    rollups = storage.open_rollups()
+    rollups.record(1, DAY, 40)
+    rollups.flush()
+    manager = BackupManager(storage, str(tmp_path / "backups"))
+
+    assert manager.run_once() is not None
+    assert manager.run_once() is None  # ничего не менялось — копия пропущена
+
+    rollups.record(2, DAY, 15)
+    rollups.flush()
+    assert manager.run_once() is not None  # дельта только со сводками
+
+    out = str(tmp_path / f"restored-{name}")
+    backup_cli._restore(manager, out, None, False)
+
+    restored = open_storage(out)
+    assert dict(restored.load()["user_data"].items()) == {1: UserRecord(username="a", total_pushups=40)}
+    assert restored.open_rollups().top("d:2026-03-10", 10) == ([(1, 40), (2, 15)], 55)
@@ -0,0 +1,49 @@
+import datetime
+
+from analytics import build_report
+from bot import BotService
+from models.bot_models import BotConfig, UserRecord
+from services.data_service import Storage
+from services.rollups import day_key
+from services.user_repository import UserRepository
+
+DAY = datetime.date(2026, 3, 10)
+NEXT_DAY = DAY + datetime.timedelta(days=1)
+
+
+def _reported(pushups: int, day: datetime.date) -> UserRecord:
+    user = UserRecord(username="u", last_activity=datetime.datetime.combine(day, datetime.time(12)))
+    user.apply_report(pushups, False, day)
+    return user
+
+
+def test_stale_day_is_closed_before_today_is_read(tmp_path):
+    config = BotConfig(
+        challenge_start_date=DAY, challenge_end_date=DAY + datetime.timedelta(days=30), counters_date=DAY
+    )
+    users = UserRepository({1: _reported(40, DAY), 2: _reported(25, NEXT_DAY)})
+    service = BotService(config, users, Storage(str(tmp_path / "data.json")))
+
+    service.ensure_day(NEXT_DAY)
+
+    assert config.counters_date == NEXT_DAY
+    assert users.total_pushups_today() == 25
+    assert list(users.get_active_today()) == [2]
+    assert service.rollups.value(day_key(DAY), 1) == 40
+
+
+def test_analytics_reads_closed_days_from_rollups(tmp_path):
+    storage = Storage(str(tmp_path / "data.json"))
+    config = BotConfig(challenge_start_date=DAY, challenge_end_date=DAY + datetime.timedelta(days=30))
+    users = UserRepository({1: _reported(40, DAY), 2: _reported(60, DAY)})
+    rollups = storage.open_rollups()
+    rollups.record(1, DAY, 40)
+    rollups.record(2, DAY, 60)
+    rollups.flush()
+
+    users.reset_daily(NEXT_DAY)
+    storage.save(config, users.all())
+
+    report = build_report(storage, 5, datetime.datetime.combine(DAY, datetime.time.max))
+    assert report.daily_rows() == [(DAY, 1, 2, 100)]
+    assert [(count, uid) for count, uid, _ in report.top_day()] == [(60, 2), (40, 1)]
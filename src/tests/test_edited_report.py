@@ -0,0 +1,84 @@
+import asyncio
+import datetime
+from types import SimpleNamespace
+
+from bot import BotService
+from models.bot_models import BotConfig
+from services.data_service import Storage
+from services.user_repository import UserRepository
+
+
+class FakeMessage:
+    def __init__(self, text, message_id=1):
+        self.text = text
+        self.message_id = message_id
+        self.from_user = SimpleNamespace(id=1, username="bob", first_name="bob", is_bot=False)
+        self.chat = SimpleNamespace(id=-100, type="supergroup")
+        self.reply_to_message = None
+        self.is_topic_message = None
+        self.message_thread_id = None
+        self.answers = []
+
+    async def answer(self, text, **kwargs):
+        self.answers.append(text)
+
+
+def _service(tmp_path):
+    config = BotConfig(challenge_start_date=datetime.date(2026, 1, 1), challenge_end_date=datetime.date(2026, 12, 31))
+    return BotService(config, UserRepository(), Storage(str(tmp_path / "data.json")))
+
+
+def test_edit_replaces_contribution_of_the_original_report(tmp_path):
+    service = _service(tmp_path)
+
+    async def scenario():
+        await service.handle_message(FakeMessage("сделал 20", message_id=1))
+        await service.handle_message(FakeMessage("сделал 30", message_id=2))
+        await service.handle_edited_message(FakeMessage("сделал 25", message_id=1))
+        await service.handle_edited_message(FakeMessage("сделал 40", message_id=99))  # не отчёт — пропуск
+
+    asyncio.run(scenario())
+    user = service.users.get(1)
+    assert (user.pushups_today, user.total_pushups) == (55, 55)
+    assert service.rollups.value(f"d:{datetime.date.today().isoformat()}", 1) == 55
+
+
+def _run(service, *steps):
+    async def scenario():
+        for handler, text, message_id in steps:
+            await getattr(service, handler)(FakeMessage(text, message_id=message_id))
+
+    asyncio.run(scenario())
+    user = service.users.get(1)
+    return user.pushups_today, user.total_pushups, service.rollups.value(f"d:{datetime.date.today().isoformat()}", 1)
+
+
+def test_edit_of_a_day_total_reverses_its_applied_delta(tmp_path):
+    result = _run(
+        _service(tmp_path),
+        ("handle_message", "сделал 10", 1),
+        ("handle_message", "сделал 50 за день", 2),
+        ("handle_edited_message", "сделал 40", 2),
+    )
+    assert result == (50, 50, 50)
+
+
+def test_edit_of_an_additive_report_into_a_day_total(tmp_path):
+    result = _run(
+        _service(tmp_path),
+        ("handle_message", "сделал 10", 1),
+        ("handle_message", "сделал 20", 2),
+        ("handle_edited_message", "сделал 50 за день", 2),
+    )
+    assert result == (50, 50, 50)
+
+
+def test_repeated_edits_of_a_day_total(tmp_path):
+    result = _run(
+        _service(tmp_path),
+        ("handle_message", "сделал 10", 1),
+        ("handle_message", "сделал 50 за день", 2),
+        ("handle_edited_message", "сделал 70 за день", 2),
+        ("handle_edited_message", "сделал 30 за день", 2),
+    )
+    assert result == (30, 30, 30)
@@ -0,0 +1,13 @@
+import json
+
+from services.history_import import iter_export_messages
+
+
+def test_export_names_follow_the_bot_convention(tmp_path):
+    export = tmp_path / "result.json"
+    export.write_text(json.dumps({"messages": [
+        {"type": "message", "from": "Иван Петров", "from_id": "user1", "date": "2026-03-10T10:00:00", "text": "50"},
+        {"type": "message", "from": None, "from_id": "user2", "date": "2026-03-10T11:00:00", "text": "30"},
+    ]}), encoding="utf-8")
+
+    assert [message.name for message in iter_export_messages(str(export))] == ["Иван", "user2"]
@@ -0,0 +1,63 @@
+import asyncio
+import datetime
+from types import SimpleNamespace
+
+from models.bot_models import BotConfig, UserRecord
+from scheduler.reminder import check_inactive_users, check_inactivity_warnings
+from services.user_repository import UserRepository
+
+MAIN_CHAT = -100
+OTHER_CHAT = -200
+
+
+class FakeBot:
+    def __init__(self):
+        self.sent = []
+        self.banned = []
+
+    async def send_message(self, chat_id, text):
+        self.sent.append(chat_id)
+
+    async def ban_chat_member(self, chat_id, user_id):
+        self.banned.append((chat_id, user_id))
+
+    async def unban_chat_member(self, chat_id, user_id):
+        pass
+
+
+def _service(users):
+    config = BotConfig(
+        chat_id=MAIN_CHAT,
+        challenge_start_date=datetime.date(2026, 1, 1),
+        challenge_end_date=datetime.date(2026, 12, 31),
+    )
+    storage = SimpleNamespace(save=lambda config, users: None)
+    return SimpleNamespace(config=config, users=UserRepository(users), storage=storage)
+
+
+def _idle(days: int, chat_ids) -> UserRecord:
+    return UserRecord(
+        username="u",
+        last_activity=datetime.datetime.now() - datetime.timedelta(days=days),
+        chat_ids=list(chat_ids),
+    )
+
+
+def test_warnings_go_only_to_members_of_the_chat():
+    bot = FakeBot()
+    service = _service({1: _idle(2, [MAIN_CHAT]), 2: _idle(2, [OTHER_CHAT]), 3: _idle(2, [])})
+
+    asyncio.run(check_inactivity_warnings(bot, service, OTHER_CHAT))
+
+    assert bot.sent == [OTHER_CHAT]
+
+
+def test_kick_keeps_user_who_is_still_in_another_chat():
+    bot = FakeBot()
+    service = _service({1: _idle(5, [MAIN_CHAT, OTHER_CHAT]), 2: _idle(5, [MAIN_CHAT]), 3: _idle(5, [])})
+
+    asyncio.run(check_inactive_users(bot, service, OTHER_CHAT))
+
+    assert bot.banned == [(OTHER_CHAT, 1)]
+    assert service.users.get(1).chat_ids == [MAIN_CHAT]
+    assert service.users.get(2) is not None and service.users.get(3) is not None
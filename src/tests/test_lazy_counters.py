@@ -0,0 +1,63 @@
+import datetime
+import json
+
+import pytest
+from pydantic import ValidationError
+
+from services.data_service import LazyUserMap
+from services.user_repository import UserRepository
+
+TODAY = datetime.date(2026, 3, 11)
+YESTERDAY = TODAY - datetime.timedelta(days=1)
+
+
+def _raw(total, today=0, day=None):
+    return json.dumps({
+        "username": "u",
+        "total_pushups": total,
+        "pushups_today": today,
+        "reported_today": bool(today),
+        "last_report_date": day.isoformat() if day else None,
+    })
+
+
+def test_totals_come_from_running_counters_without_hydration():
+    users = LazyUserMap({1: _raw(100, 30, TODAY), 2: _raw(50), 3: _raw(500)})
+    repo = UserRepository(users)
+
+    assert repo.total_pushups_today() == 30
+    assert repo.count_active_today() == 1
+    assert repo.total_pushups_all_time() == 650
+    assert [uid for uid, _ in repo.sorted_by_total_pushups(1)] == [3]
+    assert users.hydrated_count == 1  # только пользователь из топа
+
+
+def test_counters_follow_writes_and_daily_reset():
+    users = LazyUserMap({1: _raw(100, 30, TODAY), 2: _raw(50, 20, YESTERDAY)})
+    repo = UserRepository(users)
+    assert list(repo.reset_daily(TODAY)) == [2]
+    assert repo.total_pushups_today() == 30
+
+    user = repo.get(2)
+    user.apply_report(15, False, TODAY)
+    repo.add_or_update(2, user)
+    assert repo.total_pushups_today() == 45
+    assert repo.total_pushups_all_time() == 165
+
+    repo.reset_daily(TODAY + datetime.timedelta(days=1))
+    assert repo.total_pushups_today() == 0
+    assert repo.get_active_today() == {}
+
+    repo.remove(1)
+    assert repo.total_pushups_all_time() == 65
+
+
+def test_invalid_record_is_kept_after_failed_hydration():
+    broken = json.dumps({"username": "u", "total_pushups": "много"})
+    users = LazyUserMap({1: broken, 2: _raw(10)})
+
+    with pytest.raises(ValidationError):
+        users[1]
+    assert 1 in users
+    assert users._raw[1] == broken
+    assert users[2].total_pushups == 10
@@ -0,0 +1,28 @@
+from types import SimpleNamespace
+
+from services.message_filter import MessageFilter
+
+AUTHOR = SimpleNamespace(id=1, is_bot=False)
+OTHER = SimpleNamespace(id=2, is_bot=False)
+
+
+def _message(reply=None, thread_id=None):
+    return SimpleNamespace(
+        text="сделал 50",
+        from_user=AUTHOR,
+        reply_to_message=reply,
+        is_topic_message=thread_id is not None or None,
+        message_thread_id=thread_id,
+    )
+
+
+def test_report_in_forum_topic_is_not_a_reply_to_other():
+    topic_root = SimpleNamespace(message_id=77, from_user=OTHER)
+
+    assert MessageFilter().reason(_message(reply=topic_root, thread_id=77)) is None
+
+
+def test_reply_to_other_inside_topic_is_still_filtered():
+    answer = SimpleNamespace(message_id=90, from_user=OTHER)
+
+    assert MessageFilter().reason(_message(reply=answer, thread_id=77)) == "reply_to_other"
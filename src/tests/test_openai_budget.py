@@ -0,0 +1,20 @@
+import asyncio
+import time
+
+from models.bot_models import RequestPriority
+from services.openai_budget import OpenAIBudget
+
+
+def test_acquire_does_not_sleep_inside_event_loop():
+    budget = OpenAIBudget(requests_per_minute=1, tokens_per_minute=1000)
+    assert budget.acquire(RequestPriority.EXTRACTION, 10)
+
+    async def handler():
+        started = time.monotonic()
+        granted = budget.acquire(RequestPriority.EXTRACTION, 10)
+        return granted, time.monotonic() - started
+
+    granted, elapsed = asyncio.run(handler())
+    assert not granted
+    assert elapsed < 0.1
+    assert budget.metrics[RequestPriority.EXTRACTION].dropped == 1
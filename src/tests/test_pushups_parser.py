@@ -0,0 +1,15 @@
+from services.pushups_parser import PushupsParser
+from services.report_classifier import ReportClassifier
+
+
+def test_classifier_has_no_confidence_without_numbers():
+    classifier = ReportClassifier()
+    assert classifier.predict("сделал сто отжиманий сегодня") == (0, 0.0)
+    assert classifier.predict("двадцать пять") == (0, 0.0)
+
+
+def test_report_in_words_passes_classifier_to_next_tier():
+    parser = PushupsParser(None, classifier=ReportClassifier(), classifier_threshold=0.9)
+    count, _ = parser.extract_local("сделал сто отжиманий сегодня")
+    assert count is None
+    assert parser.stats["classifier"] == 0
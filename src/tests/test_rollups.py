@@ -0,0 +1,56 @@
+import datetime
+import random
+
+from bot import BotService
+from models.bot_models import BotConfig
+from services.data_service import Storage
+from services.rollups import RollupStore, _RankedCounter
+from services.user_repository import UserRepository
+
+DAY = datetime.date(2026, 3, 10)
+
+
+def test_ranked_counter_matches_full_sort():
+    rng = random.Random(7)
+    counter = _RankedCounter(top_size=5)
+    counts = {}
+    for _ in range(2000):
+        user_id, delta = rng.randrange(50), rng.randint(-20, 60)
+        counter.add(user_id, delta)
+        counts[user_id] = counts.get(user_id, 0) + delta
+        if rng.random() < 0.1:
+            expected = sorted(((-c, u) for u, c in counts.items() if c > 0))[:5]
+            assert counter.top(5) == [(u, -n) for n, u in expected]
+
+
+def test_open_range_is_updated_incrementally():
+    store = RollupStore()
+    store.record(1, DAY, 10)
+    end = DAY + datetime.timedelta(days=6)
+    assert store.top_range(DAY, end, 3) == ([(1, 10)], 10)
+
+    store.record(2, DAY + datetime.timedelta(days=1), 25)
+    store.record(1, DAY + datetime.timedelta(days=8), 100)  # вне диапазона
+    assert store.top_range(DAY, end, 3) == ([(2, 25), (1, 10)], 35)
+
+
+def test_journal_is_written_in_batches(tmp_path):
+    path = str(tmp_path / "rollups.json")
+    store = RollupStore(path, journal_every=3)
+    store.record(1, DAY, 5)  # закрывает предыдущий день — снимок
+    store.record(1, DAY, 5)
+    assert not (tmp_path / "rollups.json.journal").exists()
+
+    store.record(1, DAY, 5)
+    assert RollupStore(path).value("d:2026-03-10", 1) == 15
+
+
+def test_stats_day_arguments_are_limited_to_the_challenge(tmp_path):
+    config = BotConfig(challenge_start_date=datetime.date(2026, 1, 1), challenge_end_date=datetime.date(2026, 12, 31))
+    service = BotService(config, UserRepository(), Storage(str(tmp_path / "data.json")))
+    today = datetime.date(2026, 3, 1)
+
+    assert service._period_renderer(["day", "365"], today) is not None
+    assert service._period_renderer(["days", "1-365"], today) is not None
+    for args in (["day", "0"], ["day", "366"], ["day", "99999999"], ["days", "1-2900000"], ["days", "5-3"]):
+        assert service._period_renderer(args, today) is None, args
@@ -0,0 +1,40 @@
+import datetime
+import threading
+
+from models.bot_models import UserRecord
+from services.shared_store import SqliteStorage, SqliteUserMap
+from services.user_repository import UserRepository
+
+TODAY = datetime.date(2026, 3, 11)
+
+
+def test_concurrent_reports_are_not_lost(tmp_path):
+    path = str(tmp_path / "data.sqlite")
+    SqliteStorage(path)
+
+    def worker():
+        # Отдельное хранилище — как у отдельного процесса-воркера
+        users = UserRepository(SqliteUserMap(SqliteStorage(path)))
+        for _ in range(25):
+            users.modify(1, lambda: UserRecord(username="u"), lambda u: u.apply_report(1, False, TODAY))
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    user = SqliteUserMap(SqliteStorage(path))[1]
+    assert (user.pushups_today, user.total_pushups) == (100, 100)
+
+
+def test_totals_are_computed_in_sqlite(tmp_path):
+    users = UserRepository(SqliteUserMap(SqliteStorage(str(tmp_path / "data.sqlite"))))
+    for uid, (pushups, day) in {1: (30, TODAY), 2: (20, TODAY - datetime.timedelta(days=1))}.items():
+        users.modify(uid, lambda: UserRecord(username="u"), lambda u: u.apply_report(pushups, False, day))
+
+    assert users.total_pushups_today() == 50
+    assert users.total_pushups_all_time() == 50
+    assert list(users.reset_daily(TODAY)) == [2]
+    assert users.total_pushups_today() == 30
+    assert users.count_active_today() == 1
@@ -0,0 +1,14 @@
+import time
+
+from utils.startup_timer import StartupTimer
+
+
+def test_total_is_frozen_when_startup_is_reported():
+    timer = StartupTimer()
+    with timer.phase("storage"):
+        pass
+    timer.report()
+    total = timer.as_dict()["total"]
+
+    time.sleep(0.01)
+    assert timer.as_dict()["total"] == total
@@ -0,0 +1,51 @@
+import asyncio
+from types import SimpleNamespace
+
+from models.bot_models import ThrottleKind
+from services.render_cache import RenderCache, command_key
+from services.throttling import RateLimiter, ThrottleRule, ThrottlingMiddleware
+
+CHAT = -100
+
+
+class FakeMessage:
+    def __init__(self, text, user_id):
+        self.text = text
+        self.caption = None
+        self.from_user = SimpleNamespace(id=user_id, username="u")
+        self.chat = SimpleNamespace(id=CHAT)
+        self.answers = []
+
+    async def answer(self, text, **kwargs):
+        self.answers.append(text)
+
+
+def _middleware(cache):
+    rules = {ThrottleKind.STATS: ThrottleRule(burst=1, per_minute=1)}
+    return ThrottlingMiddleware(RateLimiter(rules, {}), render_cache=cache)
+
+
+async def _handled(event, data):
+    return "handled"
+
+
+def test_throttled_adminstats_is_dropped_not_served_from_cache():
+    cache = RenderCache()
+    cache.get_or_render(CHAT, "adminstats", 1, lambda: "админская сводка")
+    middleware = _middleware(cache)
+
+    first, second = FakeMessage("/adminstats", 2), FakeMessage("/adminstats", 2)
+    assert asyncio.run(middleware(_handled, first, {})) == "handled"
+    assert asyncio.run(middleware(_handled, second, {})) is None
+    assert second.answers == []
+
+
+def test_throttled_stats_is_answered_from_cache():
+    cache = RenderCache()
+    cache.get_or_render(CHAT, command_key("stats", [], 2), 1, lambda: "статистика")
+    middleware = _middleware(cache)
+
+    asyncio.run(middleware(_handled, FakeMessage("/stats", 2), {}))
+    throttled = FakeMessage("/stats", 2)
+    assert asyncio.run(middleware(_handled, throttled, {})) is None
+    assert throttled.answers == ["статистика"]
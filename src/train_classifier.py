@@ -0,0 +1,74 @@
+"""
+Офлайн-обучение локального классификатора отчётов по меткам LLM из корпуса парсера.
+
+    python train_classifier.py --corpus parser_corpus.jsonl --out report_classifier.json
+"""
+import argparse
+import logging
+import os
+import random
+import time
+
+from config import load_env_file
+from services.report_classifier import ReportClassifier, read_corpus
+from utils.logger import setup_logger, get_named_logger, LogMode
+
+logger = get_named_logger()
+
+
+def evaluate(model: ReportClassifier, examples, threshold: float) -> dict:
+    correct = accepted = accepted_correct = 0
+    started = time.perf_counter()
+    for text, count in examples:
+        predicted, confidence = model.predict(text)
+        correct += predicted == count
+        if confidence >= threshold:
+            accepted += 1
+            accepted_correct += predicted == count
+    elapsed = time.perf_counter() - started
+    total = len(examples) or 1
+    return {
+        "examples": len(examples),
+        "accuracy": correct / total,
+        "coverage": accepted / total,
+        "precision_at_threshold": accepted_correct / accepted if accepted else 0.0,
+        "predict_us": elapsed / total * 1e6,
+    }
+
+
+def main() -> None:
+    load_env_file()
+    parser = argparse.ArgumentParser(description="Обучение локального классификатора отчётов")
+    parser.add_argument("--corpus", default=os.getenv("PARSER_CORPUS_PATH", "parser_corpus.jsonl"))
+    parser.add_argument("--out", default=os.getenv("CLASSIFIER_MODEL_PATH", "report_classifier.json"))
+    parser.add_argument("--epochs", type=int, default=8)
+    parser.add_argument("--threshold", type=float, default=float(os.getenv("CLASSIFIER_THRESHOLD", "0.9")))
+    parser.add_argument("--holdout", type=float, default=0.1, help="доля примеров для проверки")
+    args = parser.parse_args()
+
+    setup_logger(mode=LogMode.NAMED, level=logging.INFO)
+
+    # Дубли из корпуса схлопываем: последняя метка для текста побеждает
+    examples = list(dict(read_corpus(args.corpus)).items())
+    random.Random(7).shuffle(examples)
+    split = int(len(examples) * (1 - args.holdout))
+    train, holdout = examples[:split], examples[split:]
+
+    model = ReportClassifier()
+    used = model.fit(train, epochs=args.epochs)
+    logger.info(f"Обучено на {used} из {len(train)} примеров, весов: {len(model.weights)}")
+
+    for name, subset in (("train", train), ("holdout", holdout)):
+        metrics = evaluate(model, subset, args.threshold)
+        logger.info(
+            f"{name}: {metrics['examples']} прим. | точность {metrics['accuracy']:.1%} | "
+            f"покрытие при {args.threshold} — {metrics['coverage']:.1%} "
+            f"(точность {metrics['precision_at_threshold']:.1%}) | {metrics['predict_us']:.0f} мкс/текст"
+        )
+
+    model.save(args.out)
+    logger.info(f"Модель сохранена: {args.out}")
+
+
+if __name__ == "__main__":
+    main()
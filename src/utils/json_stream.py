@@ -0,0 +1,111 @@
+import json
+from typing import Any, Dict, Iterator, Optional, TextIO
+
+_DECODER = json.JSONDecoder()
+_WHITESPACE = " \t\n\r"
+
+
+class _ChunkReader:
+    """Буфер поверх файла: читает кусками и декодирует значения по одному"""
+
+    def __init__(self, fp: TextIO, chunk_size: int):
+        self.fp = fp
+        self.chunk_size = chunk_size
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self) -> bool:
+        if self.eof:
+            return False
+        chunk = self.fp.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                return ""
+
+    def expect(self, char: str) -> None:
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"Ожидался '{char}', найдено '{found or 'EOF'}' (позиция {self.pos})")
+        self.pos += 1
+
+    def accept(self, char: str) -> bool:
+        if self.peek() == char:
+            self.pos += 1
+            return True
+        return False
+
+    def value(self) -> Any:
+        self.peek()
+        while True:
+            try:
+                obj, end = _DECODER.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if self._fill():
+                    continue
+                raise
+            # Число на границе буфера могло оборваться — дочитываем и декодируем заново
+            if end == len(self.buf) and self._fill():
+                continue
+            self.pos = end
+            return obj
+
+
+def stream_container(
+    fp: TextIO,
+    key: str,
+    header: Optional[Dict[str, Any]] = None,
+    chunk_size: int = 1 << 16,
+) -> Iterator[Any]:
+    """
+    Потоково разбирает JSON-документ вида {...} и отдаёт элементы контейнера
+    под ключом верхнего уровня key: пары (ключ, значение) для объекта
+    и значения для массива. Остальные ключи верхнего уровня декодируются
+    целиком и складываются в header.
+    """
+    reader = _ChunkReader(fp, chunk_size)
+    header = header if header is not None else {}
+
+    reader.expect("{")
+    if reader.accept("}"):
+        return
+
+    while True:
+        name = reader.value()
+        reader.expect(":")
+
+        if name != key:
+            header[name] = reader.value()
+        elif reader.accept("{"):
+            if not reader.accept("}"):
+                while True:
+                    item_key = reader.value()
+                    reader.expect(":")
+                    yield item_key, reader.value()
+                    if not reader.accept(","):
+                        reader.expect("}")
+                        break
+        else:
+            reader.expect("[")
+            if not reader.accept("]"):
+                while True:
+                    yield reader.value()
+                    if not reader.accept(","):
+                        reader.expect("]")
+                        break
+
+        if not reader.accept(","):
+            reader.expect("}")
+            return
@@ -1,18 +1,15 @@
-import inspect
 import logging
 import pathlib
+import sys
 import textwrap
 import re
 from enum import Enum
 from datetime import datetime, timedelta
 from pathlib import Path
 
-from colorlog import ColoredFormatter
 
-
-# 🧭 Путь к logs рядом с файлом
+# 🧭 Путь к logs рядом с файлом (каталог создаётся в setup_logger, не при импорте)
 LOGS_DIR = Path(__file__).resolve().parent / "logs"
-LOGS_DIR.mkdir(exist_ok=True)
 
 
 # --- 🧠 Разрешённые модули ---
@@ -48,9 +45,9 @@ class WrappedFormatter(logging.Formatter):
 
 
 def get_named_logger(level=logging.DEBUG) -> logging.Logger:
-    frame = inspect.stack()[1]
-    module = inspect.getmodule(frame[0])
-    filename = pathlib.Path(module.__file__).stem if module and module.__file__ else "__main__"
+    # sys._getframe вместо inspect.stack(): тот читает исходники всего стека и тормозит импорт
+    module_file = sys._getframe(1).f_globals.get("__file__")
+    filename = pathlib.Path(module_file).stem if module_file else "__main__"
 
     _allowed_named_loggers.add(filename)
     logger = logging.getLogger(filename)
@@ -76,6 +73,7 @@ def setup_logger(mode: LogMode = LogMode.NAMED, log_file: str = None, level=logg
     today_str = datetime.now().strftime("%Y-%m-%d")
     log_filename = log_file or f"bot_{today_str}.log"
     log_path = LOGS_DIR / log_filename
+    LOGS_DIR.mkdir(exist_ok=True)
 
     cleanup_old_logs(days=30)
 
@@ -84,6 +82,8 @@ def setup_logger(mode: LogMode = LogMode.NAMED, log_file: str = None, level=logg
         datefmt="%m-%d %H:%M:%S"
     )
 
+    from colorlog import ColoredFormatter  # нужен только консольному выводу
+
     console_formatter = ColoredFormatter(
         fmt="%(log_color)s%(asctime)s | %(levelname)-8s | %(name)s:%(lineno)d | %(message)s",
         datefmt="%m-%d %H:%M:%S",
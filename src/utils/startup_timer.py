@@ -0,0 +1,42 @@
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from utils.logger import get_named_logger
+
+logger = get_named_logger()
+
+
+class StartupTimer:
+    """Длительность фаз старта: импорты, настройки, хранилище, клиенты, диспетчер…"""
+
+    def __init__(self, started: Optional[float] = None):
+        # started — perf_counter() самого начала процесса (до импортов)
+        self.started = time.perf_counter() if started is None else started
+        self.phases: List[Tuple[str, float]] = []
+        # Фиксируется в report(): иначе /diag показывал бы время работы вместо времени старта
+        self.total: Optional[float] = None
+
+    def record(self, name: str, seconds: float) -> None:
+        self.phases.append((name, seconds))
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        began = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - began)
+
+    def as_dict(self) -> Dict[str, float]:
+        result = {name: round(seconds * 1000, 1) for name, seconds in self.phases}
+        total = self.total if self.total is not None else time.perf_counter() - self.started
+        result["total"] = round(total * 1000, 1)
+        return result
+
+    def report(self) -> None:
+        self.total = time.perf_counter() - self.started
+        timings = self.as_dict()
+        total = timings.pop("total")
+        phases = ", ".join(f"{name} {ms:.0f}" for name, ms in timings.items())
+        logger.info(f"Старт за {total:.0f} мс: {phases}")
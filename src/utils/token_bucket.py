@@ -0,0 +1,51 @@
+import time
+from typing import Optional
+
+
+class TokenBucket:
+    """
+    Классический token bucket: ёмкость capacity, пополнение refill_rate токенов в секунду.
+    Не потокобезопасен — синхронизацию обеспечивает владелец.
+    """
+
+    __slots__ = ("capacity", "refill_rate", "tokens", "updated")
+
+    def __init__(self, capacity: float, refill_rate: float, now: Optional[float] = None):
+        self.capacity = capacity
+        self.refill_rate = refill_rate
+        self.tokens = capacity
+        self.updated = time.monotonic() if now is None else now
+
+    def _refill(self, now: float) -> None:
+        if now > self.updated:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.refill_rate)
+            self.updated = now
+
+    def available(self, now: Optional[float] = None) -> float:
+        self._refill(time.monotonic() if now is None else now)
+        return self.tokens
+
+    def try_consume(self, amount: float = 1.0, reserve: float = 0.0, now: Optional[float] = None) -> bool:
+        """Списывает amount, если после списания в bucket останется не меньше reserve"""
+        self._refill(time.monotonic() if now is None else now)
+        if self.tokens - amount >= reserve:
+            self.tokens -= amount
+            return True
+        return False
+
+    def time_until(self, amount: float = 1.0, reserve: float = 0.0, now: Optional[float] = None) -> float:
+        """Сколько секунд ждать, пока try_consume(amount, reserve) станет возможным"""
+        self._refill(time.monotonic() if now is None else now)
+        missing = amount + reserve - self.tokens
+        if missing <= 0:
+            return 0.0
+        if amount + reserve > self.capacity or self.refill_rate <= 0:
+            return float("inf")
+        return missing / self.refill_rate
+
+    def adjust(self, delta: float) -> None:
+        """Возврат (delta > 0) или доначисление расхода (delta < 0) после факта"""
+        self.tokens = min(self.capacity, self.tokens + delta)
+
+    def is_full(self, now: Optional[float] = None) -> bool:
+        return self.available(now) >= self.capacity